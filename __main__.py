@@ -1,55 +1,228 @@
 """
 UI with some logging settings
+
+Heavy modules (pygame, httpx, bs4, evdev, loguru) are imported inside main()
+so splash hits the screen before we pay for the rest.
 """
 
+import signal
 import pathlib
 from argparse import ArgumentParser
 
 import trio
-from loguru import logger
-
-from framebuffer_driver import FramebufferDriver, framebuffer_init
-from touch_driver import TouchDriver
-from basic_ui_framework import ui_framework_init
-from api import ACManager
-# from async_task_manager import AsyncTaskManager
-from app import ACApp
 
+from startup_profiler import StartupProfiler
 
-# TODO: add loguru settings
 
-async def main(args):
+async def main(args, profiler: StartupProfiler):
 
     # check buffer param
     buffer = pathlib.Path(args.buffer) if args.buffer else None
 
+    with profiler.phase("imports (framebuffer)"):
+        from framebuffer_driver import FramebufferDriver, framebuffer_init
+
     # task_manager = AsyncTaskManager()
-    framebuffer_init()
-    fb_d = FramebufferDriver(buffer)
-    fb_d.show_splash()
-    fb_d.update_sync()
+    with profiler.phase("fb init"):
+        if args.headless:
+            framebuffer_init(buffer, headless=True)
+            fb_d = FramebufferDriver(double_buffer=args.double_buffer)
+        else:
+            framebuffer_init()
+            fb_d = FramebufferDriver(buffer, args.double_buffer)
+
+    with profiler.phase("splash frame"):
+        fb_d.show_splash()
+        fb_d.update_sync()
+
+    profiler.mark("splash")
+
+    with profiler.phase("imports (app)"):
+        from loguru import logger
+        from log_config import setup_logging
+        from tracing import TRACER
+
+        from touch_driver import TouchDriver, ScriptedTouchSource
+        from basic_ui_framework import ui_framework_init
+        from api import ACManager
+        # from async_task_manager import AsyncTaskManager
+        from app import ACApp
+
+    setup_logging(args.log_level, args.log_json, args.log_file)
+    TRACER.enabled = bool(args.trace)
+
+    # driver's own messages from fb init went out before logging was set up
+    logger.debug(
+        "Framebuffer via {}, double buffering {}", fb_d.backend, "on" if fb_d.double_buffer else "off"
+    )
 
     # init touch driver
-    touch_d = TouchDriver("LCD35", "event0")
+    with profiler.phase("touch init"):
+        if args.touch_trace:
+            source = ScriptedTouchSource.from_file(args.touch_trace)
+            touch_d = TouchDriver("LCD35", "scripted", source)
+        else:
+            touch_d = TouchDriver("LCD35", "event0")
+
+    ac_metrics = panel_metrics = None
+    if args.metrics_port:
+        from metrics import ACMetrics, PanelMetrics, serve_metrics
+
+        panel_metrics = PanelMetrics(fb_d, touch_d)
+
+        # requests are made in worker process, so ac_* series would stay at zero
+        if args.worker:
+            logger.warning("Controller request metrics aren't available with --worker")
+        else:
+            ac_metrics = ACMetrics()
+
+    if args.rooms:
+        from dashboard import load_rooms
+
+        logins = {
+            name: {
+                "ip": login.get("ip", args.ip),
+                "id": login.get("id", args.id),
+                "pw": login.get("pw", args.pw),
+            }
+            for name, login in load_rooms(args.rooms).items()
+        }
+    else:
+        logins = {"default": {"ip": args.ip, "id": args.id, "pw": args.pw}}
+
+    history = worker = None
+
+    if args.worker:
+        from ac_worker import ACWorker
+
+        # history is recorded by worker
+        worker = ACWorker(
+            logins,
+            args.history,
+            args.worker_nice,
+            args.log_level,
+            args.log_json,
+            log_changes_only=args.log_changes_only,
+        )
+        rooms = dict(worker.managers)
+
+    else:
+        if args.history:
+            from history import HistoryStore
+
+            history = HistoryStore(args.history)
+
+        rooms = {
+            name: ACManager(
+                login["ip"],
+                login["id"],
+                login["pw"],
+                metrics=ac_metrics,
+                log_changes_only=args.log_changes_only,
+                history=history.room(name) if history else None,
+            )
+            for name, login in logins.items()
+        }
+
+    # with rooms, thermostat & local API drive the first one
+    ac_mgr = next(iter(rooms.values()))
+
+    pool = None
+    if args.rooms:
+        from dashboard import RoomPool
+
+        pool = RoomPool(rooms, args.rooms_parallel)
+
+    scheduler = None
+    if args.schedule:
+        from scheduler import Scheduler
+
+        scheduler = Scheduler(rooms, args.schedule)
+
+    thermostat = None
+    if args.thermostat is not None:
+        from thermostat import Thermostat
+
+        thermostat = Thermostat(ac_mgr, args.thermostat)
+
+    try:
+        async with trio.open_nursery() as nursery:
+            # worker has to be up before login
+            if worker:
+                with profiler.phase("worker start"):
+                    await nursery.start(worker.run)
+
+            # init ui framework, font paths come from FONTS disk cache after first boot
+            with profiler.phase("fonts"):
+                ui_framework_init(fb_d.screen)
+                app = ACApp(ac_mgr, touch_d, fb_d, panel_metrics, scheduler, pool)
+
+            # init app
+            with profiler.phase("login"):
+                await app.init()
+
+            with profiler.phase("first frame"):
+                await app.draw_ui()
+
+            profiler.mark("first frame")
+
+            for line in profiler.report():
+                logger.info(line)
+
+            # load loops
+            # nursery.start_soon(ac_mgr.keep_alive_power)
+            # nursery.start_soon(task_manager.run_executor)
+            nursery.start_soon(app.poll_touch)
+            nursery.start_soon(app.update_temp_loop)
+            nursery.start_soon(app.watch_changes)
+            nursery.start_soon(app.run_animations)
+
+            if args.trace:
+                nursery.start_soon(dump_trace_on_signal, args.trace)
+
+            if args.metrics_port:
+                nursery.start_soon(serve_metrics, args.metrics_port)
+
+            if scheduler:
+                nursery.start_soon(scheduler.run)
+
+            if args.api_port:
+                from local_api import LocalAPI
+
+                nursery.start_soon(LocalAPI(ac_mgr).serve, args.api_port, args.api_host)
+
+            if thermostat:
+                nursery.start_soon(thermostat.run)
 
-    # init ui framework
-    ui_framework_init(fb_d.screen)
+            logger.debug("Startup complete")
 
-    ac_mgr = ACManager(args.ip, args.id, args.pw)
+    finally:
+        if args.trace:
+            dump_trace(args.trace)
 
-    app = ACApp(ac_mgr, touch_d, fb_d)
+        if history:
+            history.close()
 
-    # init app
-    await app.init()
 
-    async with trio.open_nursery() as nursery:
-        # load loops
-        # nursery.start_soon(ac_mgr.keep_alive_power)
-        # nursery.start_soon(task_manager.run_executor)
-        nursery.start_soon(app.ui.poll_touch, touch_d)
-        nursery.start_soon(app.update_temp_loop)
+def dump_trace(path):
+    """Writes chrome trace & logs span summary"""
 
-        logger.debug("Startup complete")
+    from loguru import logger
+    from tracing import TRACER
+
+    TRACER.dump(path)
+    logger.info("Trace written to {}", path)
+
+    for line in TRACER.summary():
+        logger.info(line)
+
+
+async def dump_trace_on_signal(path):
+    """Dumps trace every time SIGUSR1 is received"""
+
+    with trio.open_signal_receiver(signal.SIGUSR1) as signals:
+        async for _ in signals:
+            dump_trace(path)
 
 
 if __name__ == "__main__":
@@ -62,5 +235,102 @@ if __name__ == "__main__":
         "-b", "--buffer", type=str, default="", help="Web remote controller password"
     )
     parser.add_argument("-t", "--temp", type=int, default=26, help="Target temperature")
+    parser.add_argument(
+        "--double-buffer",
+        action="store_true",
+        help="Flush snapshots of back surface instead of live surface, avoids tearing",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Use in-memory framebuffer, --buffer becomes file to mirror frames to",
+    )
+    parser.add_argument(
+        "--touch-trace",
+        type=str,
+        default="",
+        help="Replay touch events from json trace instead of touch device",
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default="",
+        help="Record latency spans, written as chrome trace json here on exit or SIGUSR1",
+    )
+    parser.add_argument(
+        "-m",
+        "--metrics-port",
+        type=int,
+        default=0,
+        help="Serve prometheus metrics on this local port. 0 to disable",
+    )
+    parser.add_argument("--log-level", type=str, default="INFO", help="Minimum log level")
+    parser.add_argument(
+        "--log-file", type=str, default=None, help="Also log to this size-rotated file"
+    )
+    parser.add_argument("--log-json", action="store_true", help="Log serialized json records")
+    parser.add_argument(
+        "--log-changes-only", action="store_true", help="Log AC state only when it changes"
+    )
+    parser.add_argument(
+        "--schedule",
+        type=str,
+        default=None,
+        help="Run AC actions from this schedule json, edit it with scheduler.py - also while running",
+    )
+    parser.add_argument(
+        "--api-port",
+        type=int,
+        default=0,
+        help="Serve local control API & websocket on this port. 0 to disable",
+    )
+    parser.add_argument(
+        "--api-host",
+        type=str,
+        default="127.0.0.1",
+        help="Address local API binds to, i.e. 0.0.0.0 for other devices on LAN",
+    )
+    parser.add_argument(
+        "--history",
+        type=str,
+        default=None,
+        help="Record AC state history into this directory",
+    )
+    parser.add_argument(
+        "--thermostat",
+        type=float,
+        default=None,
+        help="Hold room at this temp by switching AC on/off",
+    )
+    parser.add_argument(
+        "--rooms",
+        type=str,
+        default=None,
+        help="Show dashboard of rooms in this json file, see dashboard.py",
+    )
+    parser.add_argument(
+        "--rooms-parallel",
+        type=int,
+        default=4,
+        help="Max rooms polled at once in dashboard mode",
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Run controller requests & page parsing in separate process, away from UI",
+    )
+    parser.add_argument(
+        "--worker-nice",
+        type=int,
+        default=5,
+        help="Niceness added to worker process, so UI gets CPU first",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Report time spent on each startup phase, until first frame",
+    )
+
+    args_ = parser.parse_args()
 
-    trio.run(main, parser.parse_args())
+    trio.run(main, args_, StartupProfiler(args_.profile_startup))
@@ -0,0 +1,600 @@
+"""
+ACManagers in a separate process.
+
+On single core Pi, parsing controller's page with BeautifulSoup and httpx's
+request handling take tens of ms at a time, during which trio loop can't
+handle touch or redraw. With worker, ACManagers live in a child process -
+niced, so kernel preempts it in favor of the UI - and UI process only holds
+RemoteACManager proxies exchanging small messages with it over a socketpair:
+
+    UI -> worker   {"id": 1, "room": "default", "call": "set_temp", "args": [26]}
+    worker -> UI   {"id": 1, "room": "default", "state": {...}}               reply
+                   {"id": 1, "room": "default", "error": "...", "message": "..."}
+                   {"room": "default", "state": {...}}                        on change
+
+Each message is 4 byte big endian length followed by json. State is a few
+hundred bytes of parsed values, image sources and hidden fields instead of
+the page itself. Replies carry state too, so proxy is up-to-date as soon as
+call returns, same as with ACManager.
+
+Logins are passed in first message rather than command line, so they don't show
+in process list. Worker exits when socket closes, and is restarted - logging
+in rooms that were logged in - if it dies.
+"""
+
+import os
+import sys
+import json
+import base64
+import signal
+import socket
+import struct
+from argparse import ArgumentParser
+from typing import Any, Dict, List, Union
+
+import trio
+from loguru import logger
+
+from api import (
+    ACManager,
+    ACSnapshot,
+    ACState,
+    ACTempOutOfBound,
+    ACRequestFailed,
+    ACPermissionDenied,
+    NotLoggedIn,
+)
+
+
+__all__ = ["MessageStream", "RemoteState", "RemoteACManager", "ACWorker"]
+
+
+_LENGTH = struct.Struct("!I")
+
+# anything bigger is a broken stream, not a message
+MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+
+# ACManager methods worker runs on request
+CALLS = frozenset(
+    {
+        "login",
+        "update",
+        "power_on",
+        "power_off",
+        "set_temp",
+        "set_wind_speed",
+        "set_wind_angle",
+        "temp_up",
+        "temp_down",
+        "fetch_image",
+        "recent_temps",
+    }
+)
+
+# raised as same type on UI side, anything else becomes ACRequestFailed
+ERRORS = {
+    error.__name__: error
+    for error in (ACTempOutOfBound, ACRequestFailed, ACPermissionDenied, NotLoggedIn)
+}
+
+# seconds to wait before starting worker again after it died
+RESTART_DELAY_SEC = 2
+
+WORKER_PATH = os.path.abspath(__file__)
+
+
+class MessageStream:
+    def __init__(self, stream: trio.abc.Stream):
+        """Length prefixed json messages over stream. Sending is safe from many tasks."""
+
+        self.stream = stream
+
+        self._buffer = bytearray()
+        self._send_lock = trio.Lock()
+
+    async def send(self, message: Dict[str, Any]):
+        data = json.dumps(message, separators=(",", ":")).encode()
+
+        async with self._send_lock:
+            await self.stream.send_all(_LENGTH.pack(len(data)) + data)
+
+    async def receive(self) -> Union[Dict[str, Any], None]:
+        """Returns next message, None once other end is closed.
+
+        Raises:
+            ValueError: On oversized or malformed message.
+        """
+
+        buffer = self._buffer
+
+        while True:
+            if len(buffer) >= _LENGTH.size:
+                (length,) = _LENGTH.unpack_from(buffer)
+
+                if length > MAX_MESSAGE_BYTES:
+                    raise ValueError(f"Message of {length} bytes")
+
+                end = _LENGTH.size + length
+
+                if len(buffer) >= end:
+                    data = bytes(buffer[_LENGTH.size:end])
+                    del buffer[:end]
+                    return json.loads(data)
+
+            chunk = await self.stream.receive_some()
+            if not chunk:
+                return None
+
+            buffer += chunk
+
+    async def aclose(self):
+        await self.stream.aclose()
+
+
+def encode_state(manager: ACManager) -> Dict[str, Any]:
+    """Manager's settings & parsed page, as sent to UI process."""
+
+    state = manager.state
+
+    return {
+        "version": manager.version,
+        "updated_at": manager.updated_at,
+        "powered": manager.is_powered,
+        "target_temp": manager.target_temp,
+        "speed": manager.speed,
+        "angle": manager.angle,
+        "bounds": [manager.lower_bound, manager.upper_bound],
+        "page": None
+        if state is None
+        else {
+            "snapshot": list(state.snapshot),
+            "images": state.images,
+            "hidden": state.hidden,
+        },
+    }
+
+
+class RemoteState:
+    def __init__(self, snapshot: ACSnapshot, images: Dict[str, str], hidden: Dict[str, int]):
+        """ACState's parsed values without the page. Has everything ACState has but viewstate."""
+
+        self.snapshot = snapshot
+        self.images = images
+        self.hidden = hidden
+
+    # these only read self.hidden, so ACState's own logic applies as-is
+    powered = ACState.powered
+    can_power_on = ACState.can_power_on
+    can_power_off = ACState.can_power_off
+
+    @property
+    def operation_mode(self) -> str:
+        return self.snapshot.operation_mode
+
+    @property
+    def current_temp(self) -> int:
+        return self.snapshot.current_temp
+
+    @property
+    def target_temp(self) -> int:
+        return self.snapshot.target_temp
+
+    @property
+    def wind_speed(self) -> str:
+        return self.snapshot.wind_speed
+
+    @property
+    def wind_angle(self) -> str:
+        return self.snapshot.wind_angle
+
+
+class RemoteACManager:
+    def __init__(self, worker: "ACWorker", room: str, temp=26, angle=0, speed=0):
+        """Stand-in for ACManager running in worker. Get it from ACWorker.managers.
+
+        Attributes read by app, dashboard, thermostat and local API are kept from
+        worker's messages, commands are forwarded and raise same exceptions.
+        """
+
+        self.room = room
+        self._worker = worker
+
+        self.state: Union[RemoteState, None] = None
+
+        self.is_powered = False
+        self.target_temp = temp
+        self.speed = speed
+        self.angle = angle
+
+        self.upper_bound = ACManager.base_state["hdnNo_12"]
+        self.lower_bound = ACManager.base_state["hdnNo_13"]
+
+        # recorded & measured in worker
+        self.history = None
+        self.metrics = None
+        self.in_flight = 0
+
+        # counted here rather than taken from worker, which starts over on restart
+        self.version = 0
+        self.updated_at = 0.0
+        self._remote_version: Union[int, None] = None
+        self._changed = trio.Event()
+
+        # to log in again after worker restart
+        self.logged_in = False
+
+    def _apply(self, data: Dict[str, Any]):
+        """Takes state sent by worker."""
+
+        self.is_powered = data["powered"]
+        self.target_temp = data["target_temp"]
+        self.speed = data["speed"]
+        self.angle = data["angle"]
+        self.lower_bound, self.upper_bound = data["bounds"]
+        self.updated_at = data["updated_at"]
+
+        page = data["page"]
+        if page is not None:
+            self.state = RemoteState(ACSnapshot(*page["snapshot"]), page["images"], page["hidden"])
+
+        if data["version"] != self._remote_version:
+            self._remote_version = data["version"]
+
+            self.version += 1
+            self._changed.set()
+            self._changed = trio.Event()
+
+    async def wait_changed(self, version: int) -> int:
+        """Same as ACManager.wait_changed."""
+
+        while self.version == version:
+            await self._changed.wait()
+
+        return self.version
+
+    async def _call(self, call: str, *args) -> Dict[str, Any]:
+        self.in_flight += 1
+
+        try:
+            return await self._worker.request(self.room, call, args)
+        finally:
+            self.in_flight -= 1
+
+    async def login(self):
+        await self._call("login")
+        self.logged_in = True
+
+    async def update(self, resp=None) -> RemoteState:
+        await self._call("update")
+        return self.state
+
+    async def get_temp(self) -> int:
+        await self._call("update")
+        return self.state.current_temp
+
+    async def power_on(self, temp: int = None):
+        await self._call("power_on", temp)
+
+    async def power_off(self):
+        await self._call("power_off")
+
+    async def set_temp(self, temp: int):
+        await self._call("set_temp", temp)
+
+    async def set_wind_speed(self, speed: int):
+        await self._call("set_wind_speed", speed)
+
+    async def set_wind_angle(self, angle: int):
+        await self._call("set_wind_angle", angle)
+
+    async def temp_up(self):
+        await self._call("temp_up")
+
+    async def temp_down(self):
+        await self._call("temp_down")
+
+    async def fetch_image(self, src: str) -> bytes:
+        reply = await self._call("fetch_image", src)
+        return base64.b64decode(reply["data"])
+
+    async def recent_temps(self, count: int) -> List[float]:
+        reply = await self._call("recent_temps", count)
+        return reply["temps"]
+
+
+class _Pending:
+    def __init__(self):
+        self.done = trio.Event()
+        self.reply: Union[Dict[str, Any], None] = None
+
+
+class ACWorker:
+    def __init__(
+        self,
+        rooms: Dict[str, Dict[str, Any]],
+        history: Union[str, None] = None,
+        nice: int = 5,
+        log_level: str = "INFO",
+        log_json: bool = False,
+        **manager_kwargs,
+    ):
+        """Supervises worker process running ACManagers of given rooms.
+
+        Args:
+            rooms: Room name -> ACManager arguments, ip, id & pw and optionally temp,
+                angle & speed.
+            history: Directory worker records state history into.
+            nice: Niceness added to worker, so UI process gets the CPU first.
+            log_level: Worker's minimum log level. It logs to stderr only.
+            log_json: Worker logs serialized json records.
+            manager_kwargs: Passed to every ACManager, i.e. log_changes_only, rate_limit.
+        """
+
+        self.nice = nice
+
+        self._config = {
+            "rooms": rooms,
+            "history": history,
+            "log_level": log_level,
+            "log_json": log_json,
+            "manager": manager_kwargs,
+        }
+
+        self.managers: Dict[str, RemoteACManager] = {
+            name: RemoteACManager(
+                self,
+                name,
+                **{key: spec[key] for key in ("temp", "angle", "speed") if key in spec},
+            )
+            for name, spec in rooms.items()
+        }
+
+        self._stream: Union[MessageStream, None] = None
+        self._pending: Dict[int, _Pending] = {}
+        self._next_id = 0
+
+        # stats
+        self.restarts = 0
+
+    async def request(self, room: str, call: str, args: tuple) -> Dict[str, Any]:
+        """Runs call on room's manager in worker, returns reply once room's state is applied.
+
+        Raises:
+            ACRequestFailed: If worker isn't running or dies meanwhile, or call raised
+                anything ACManager doesn't raise itself.
+        """
+
+        if self._stream is None:
+            raise ACRequestFailed("AC worker is not running")
+
+        self._next_id += 1
+        request_id = self._next_id
+
+        pending = self._pending[request_id] = _Pending()
+
+        try:
+            await self._stream.send({"id": request_id, "room": room, "call": call, "args": args})
+            await pending.done.wait()
+
+        except (trio.BrokenResourceError, trio.ClosedResourceError):
+            raise ACRequestFailed("AC worker connection lost") from None
+
+        finally:
+            del self._pending[request_id]
+
+        reply = pending.reply
+
+        if reply is None:
+            raise ACRequestFailed("AC worker exited")
+
+        if "error" in reply:
+            error = ERRORS.get(reply["error"])
+
+            if error is None:
+                raise ACRequestFailed(f"{reply['error']}: {reply['message']}")
+
+            raise error(reply["message"])
+
+        return reply
+
+    async def _read(self, stream: MessageStream):
+        """Applies states & completes requests until worker closes connection."""
+
+        while True:
+            message = await stream.receive()
+            if message is None:
+                return
+
+            manager = self.managers.get(message.get("room"))
+            if manager is not None and "state" in message:
+                manager._apply(message["state"])
+
+            pending = self._pending.get(message.get("id"))
+            if pending is not None:
+                pending.reply = message
+                pending.done.set()
+
+    async def _relogin(self):
+        """Logs rooms back in after restart, worker's managers start out logged out."""
+
+        for manager in self.managers.values():
+            if not manager.logged_in:
+                continue
+
+            try:
+                await manager.login()
+            except ACRequestFailed as err:
+                logger.warning("Room {} login after worker restart failed - {}", manager.room, err)
+
+    async def _spawn(self) -> trio.Process:
+        parent, child = socket.socketpair()
+
+        with child:
+            # our copy of child's end is closed once it's inherited
+            process = await trio.lowlevel.open_process(
+                [sys.executable, WORKER_PATH, "--fd", str(child.fileno()), "--nice", str(self.nice)],
+                pass_fds=(child.fileno(),),
+            )
+
+        self._stream = MessageStream(trio.SocketStream(trio.socket.from_stdlib_socket(parent)))
+        await self._stream.send(self._config)
+
+        logger.debug("AC worker {} started", process.pid)
+        return process
+
+    async def _stop(self, process: trio.Process):
+        stream, self._stream = self._stream, None
+
+        # waiters would otherwise never wake up
+        for pending in self._pending.values():
+            pending.done.set()
+
+        with trio.CancelScope(shield=True):
+            if stream is not None:
+                await stream.aclose()
+
+            # worker exits on its own once socket is closed
+            with trio.move_on_after(2):
+                await process.wait()
+
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+    async def run(self, *, task_status=trio.TASK_STATUS_IGNORED):
+        """Keeps worker running, starting it again if it dies.
+        Run with nursery.start() - returns once worker is up."""
+
+        while True:
+            process = await self._spawn()
+
+            try:
+                async with trio.open_nursery() as nursery:
+                    if self.restarts:
+                        nursery.start_soon(self._relogin)
+
+                    task_status.started()
+                    task_status = trio.TASK_STATUS_IGNORED
+
+                    await self._read(self._stream)
+                    nursery.cancel_scope.cancel()
+
+            except (trio.BrokenResourceError, ValueError) as err:
+                logger.warning("AC worker connection broken - {}", err)
+
+            finally:
+                await self._stop(process)
+
+            self.restarts += 1
+            logger.warning(
+                "AC worker exited with {}, restarting in {} s", process.returncode, RESTART_DELAY_SEC
+            )
+
+            await trio.sleep(RESTART_DELAY_SEC)
+
+
+async def _push_changes(stream: MessageStream, name: str, manager: ACManager):
+    version = manager.version
+
+    while True:
+        version = await manager.wait_changed(version)
+        await stream.send({"room": name, "state": encode_state(manager)})
+
+
+async def _handle(stream: MessageStream, managers: Dict[str, ACManager], message: Dict[str, Any]):
+    name, call = message.get("room"), message.get("call")
+    manager = managers.get(name)
+
+    reply = {"id": message.get("id"), "room": name}
+
+    try:
+        if manager is None or call not in CALLS:
+            raise ValueError(f"No call {call} for room {name}")
+
+        result = await getattr(manager, call)(*message.get("args", ()))
+
+    except Exception as err:
+        reply["error"] = type(err).__name__
+        reply["message"] = str(err)
+
+    else:
+        if call == "fetch_image":
+            reply["data"] = base64.b64encode(result).decode()
+        elif call == "recent_temps":
+            reply["temps"] = result
+
+    if manager is not None:
+        reply["state"] = encode_state(manager)
+
+    await stream.send(reply)
+
+
+async def serve_worker(sock: socket.socket):
+    """Worker side. Runs managers described by first message until socket closes."""
+
+    stream = MessageStream(trio.SocketStream(trio.socket.from_stdlib_socket(sock)))
+
+    config = await stream.receive()
+    if config is None:
+        return
+
+    from log_config import setup_logging
+
+    setup_logging(config["log_level"], config["log_json"])
+
+    history = None
+    if config["history"]:
+        from history import HistoryStore
+
+        history = HistoryStore(config["history"])
+
+    managers = {
+        name: ACManager(
+            spec["ip"],
+            spec["id"],
+            spec["pw"],
+            **{key: spec[key] for key in ("temp", "angle", "speed") if key in spec},
+            history=history.room(name) if history else None,
+            **config["manager"],
+        )
+        for name, spec in config["rooms"].items()
+    }
+
+    try:
+        async with trio.open_nursery() as nursery:
+            for name, manager in managers.items():
+                nursery.start_soon(_push_changes, stream, name, manager)
+
+            while True:
+                message = await stream.receive()
+                if message is None:
+                    break
+
+                nursery.start_soon(_handle, stream, managers, message)
+
+            nursery.cancel_scope.cancel()
+
+    except (trio.BrokenResourceError, trio.ClosedResourceError):
+        # UI process is gone
+        pass
+
+    finally:
+        if history:
+            history.close()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser("ACManager worker process, started by ACWorker")
+
+    parser.add_argument("--fd", type=int, required=True, help="Socket inherited from UI process")
+    parser.add_argument("--nice", type=int, default=0, help="Niceness to add")
+
+    args = parser.parse_args()
+
+    # ctrl+c reaches whole process group - UI shuts down and closing socket stops us
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    if args.nice:
+        os.nice(args.nice)
+
+    trio.run(serve_worker, socket.socket(fileno=args.fd))
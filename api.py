@@ -11,10 +11,12 @@ https://developer.mozilla.org/docs/Learn/Forms/Sending_and_retrieving_form_data
 """
 
 import re
+import time
 import functools
 import argparse
 from random import randint
-from typing import Dict, Any, Union
+from urllib.parse import quote_plus, urlencode
+from typing import Awaitable, Callable, Dict, Any, Hashable, List, Sequence, Union, NamedTuple
 
 import trio
 import httpx
@@ -30,6 +32,9 @@ WIND_SPEED_MODE = ["Auto", "Max", "medium", "low"]
 WIND_DIRECTION_MODE = ["Swing", "Horizontal", "Vertical"]
 
 
+FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+
 class ACTempOutOfBound(Exception):
     pass
 
@@ -38,11 +43,126 @@ class ACRequestFailed(Exception):
     pass
 
 
+class ACPermissionDenied(Exception):
+    pass
+
+
 # TODO: find way to determine if we're still logged in or not
 class NotLoggedIn(Exception):
     pass
 
 
+class TokenBucket:
+    def __init__(self, rate: float, burst: int, clock: Callable[[], float] = trio.current_time):
+        """Request rate limiter - rate per second on average, up to burst at once.
+        Waiters are let through in arrival order.
+
+        Args:
+            rate: Tokens refilled per second.
+            burst: Bucket size.
+            clock: Time source, must match trio.sleep's.
+        """
+
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+
+        self._tokens = float(burst)
+        self._stamp: Union[float, None] = None
+        self._lock = trio.Lock()
+
+    def _refill(self, now: float):
+        if self._stamp is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+
+        self._stamp = now
+
+    async def acquire(self) -> float:
+        """Takes a token, waiting for one if empty. Returns seconds waited."""
+
+        # trio.Lock is fair, so this queues callers
+        async with self._lock:
+            self._refill(self.clock())
+
+            waited = 0.0
+            if self._tokens < 1:
+                waited = (1 - self._tokens) / self.rate
+                await trio.sleep(waited)
+                self._refill(self.clock())
+
+            self._tokens -= 1
+            return waited
+
+
+class FormTemplate:
+    def __init__(self, fields: Dict[str, Any], variable: Sequence[str]):
+        """url-encoded form body with fixed fields encoded once.
+        Only variable fields are encoded per request, spliced between fixed bytes.
+
+        Args:
+            fields: All fields in order, with values of fixed ones.
+            variable: Names of fields that are given on each encode, in that order.
+        """
+
+        self.variable = tuple(variable)
+
+        # alternating fixed bytes & index into encode()'s values, fixed ones end with "name="
+        self._parts = []
+        fixed = []
+
+        for name, value in fields.items():
+            if name not in self.variable:
+                fixed.append(urlencode({name: value}))
+                continue
+
+            fixed.append(f"{quote_plus(name)}=")
+            self._parts.append("&".join(fixed).encode())
+            self._parts.append(self.variable.index(name))
+            fixed = [""]
+
+        if fixed:
+            self._parts.append("&".join(fixed).encode())
+
+    def encode(self, values: Sequence[Union[int, str]], tail: bytes = b"") -> bytes:
+        """Returns form body.
+
+        Args:
+            values: Values of variable fields, in order given on init.
+            tail: Already encoded fields to append, starting with '&'.
+        """
+
+        return b"".join(
+            part if isinstance(part, bytes) else _encode_value(values[part])
+            for part in self._parts
+        ) + tail
+
+
+def _encode_value(value: Union[int, str]) -> bytes:
+    if isinstance(value, int):
+        return b"%d" % value
+
+    return quote_plus(value).encode()
+
+
+class _Flight:
+    """Request in flight. Identical calls wait on it instead of sending their own."""
+
+    def __init__(self):
+        self.done = trio.Event()
+        self.result = None
+        self.error: Union[Exception, None] = None
+
+
+class ACSnapshot(NamedTuple):
+    """Plain values of ACState, cheap to compare and pass around."""
+
+    operation_mode: str
+    current_temp: int
+    target_temp: int
+    wind_speed: str
+    wind_angle: str
+
+
 # TODO: Check if we need target temp here
 class ACState:
     """
@@ -85,6 +205,7 @@ class ACState:
     # regex to find ID in temp image's name
 
     pattern = re.compile(r"\d+")
+    hidden_pattern = re.compile(r"^hdnNo_\d+$")
 
     def __init__(self, resp: httpx.Response):
         self.soup = bs(resp.content.decode(), "html.parser")
@@ -104,6 +225,43 @@ class ACState:
             for id_ in ("__VIEWSTATE", "__VIEWSTATEGENERATOR", "__EVENTVALIDATION")
         }
 
+    @functools.cached_property
+    def hidden(self) -> Dict[str, int]:
+        """Numeric hidden fields, i.e. hdnNo_1 -> 1. See ACManager's memo for meanings."""
+
+        fields = {}
+
+        for tag in self.soup.find_all("input", id=self.hidden_pattern):
+            try:
+                fields[tag["id"]] = int(tag.attrs.get("value", ""))
+            except ValueError:
+                continue
+
+        return fields
+
+    @property
+    def powered(self) -> Union[bool, None]:
+        """Whether unit is on. None if page doesn't say."""
+
+        value = self.hidden.get("hdnNo_1")
+        return None if value is None else bool(value)
+
+    @property
+    def can_power_on(self) -> bool:
+        # hdnNo_6 = 0: On/Off perm, 2: Off perm, else: No perm. Missing means no restriction.
+        return self.hidden.get("hdnNo_6", 0) == 0
+
+    @property
+    def can_power_off(self) -> bool:
+        return self.hidden.get("hdnNo_6", 0) in (0, 2)
+
+    @functools.cached_property
+    def encoded_states(self) -> bytes:
+        """states url-encoded, starting with '&'. Viewstate can be large, so it's done
+        once per page rather than on every request built from it."""
+
+        return b"&" + urlencode(self.states).encode()
+
     @functools.cached_property
     def operation_mode(self) -> str:
         """Determines operation mode"""
@@ -139,7 +297,23 @@ class ACState:
         img_src = self.soup.find("img", {"id": "Image_5"})["src"]
         return WIND_DIRECTION_MODE[self._pattern_match(img_src)]
 
-    # TODO: add permission checks
+    @functools.cached_property
+    def images(self) -> Dict[str, str]:
+        """State image sources by element id, i.e. Image_1 -> images/nn_1.gif"""
+
+        return {img["id"]: img["src"] for img in self.soup.find_all("img", id=True)}
+
+    @functools.cached_property
+    def snapshot(self) -> ACSnapshot:
+        """All parsed values at once."""
+
+        return ACSnapshot(
+            self.operation_mode,
+            self.current_temp,
+            self.target_temp,
+            self.wind_speed,
+            self.wind_angle,
+        )
 
 
 class ACManager:
@@ -147,7 +321,6 @@ class ACManager:
     AC controller class.
     """
 
-    # TODO: validate effect of hdrNo12 & 13 and update temp_up & temp_down.
     """
     <MEMO>
     Guessed from html source & images
@@ -187,6 +360,9 @@ class ACManager:
         "other": (55, 16),
     }
 
+    # taken from attributes on every send, rest of base_state follows controller page
+    variable_fields = ("hdnNo_1", "hdnNo_4", "hdnNo_10", "hdnNo_11", "btnSubmit.x", "btnSubmit.y")
+
     # TODO: move base_state and associated to ACState
     base_state = {
         "hdnNo_1": 0,
@@ -212,9 +388,55 @@ class ACManager:
         "btnSubmit.y": 16,
     }
 
-    def __init__(self, ip: str, id_: str, password: str, temp=26, angle=0, speed=0):
+    def __init__(
+        self,
+        ip: str,
+        id_: str,
+        password: str,
+        temp=26,
+        angle=0,
+        speed=0,
+        metrics=None,
+        log_changes_only=False,
+        history=None,
+        rate_limit: float = 2.0,
+        burst: int = 4,
+    ):
+        """
+        Args:
+            rate_limit: Max requests per second to controller on average. 0 to disable.
+            burst: Requests allowed at once before rate_limit kicks in.
+        """
+
         self.client = httpx.AsyncClient()
 
+        # controller is fragile - whoever calls, requests are spaced out here
+        self._limiter = TokenBucket(rate_limit, burst) if rate_limit else None
+
+        # identical requests in flight, by key
+        self._flights: Dict[Hashable, _Flight] = {}
+
+        # held by login, update and commands - settings & viewstate are only changed
+        # by one of them at a time, so payloads are never built from half-applied state
+        # or viewstate a concurrent login just invalidated.
+        self._lock = trio.Lock()
+
+        # key of last command queued, see _command
+        self._last_command: Union[Hashable, None] = None
+
+        # only log state when it differs from last one, to spare SD card on long runs
+        self.log_changes_only = log_changes_only
+        self._last_snapshot: Union[ACSnapshot, None] = None
+
+        # metrics.ACMetrics if reporting is wanted. Optional, api.py runs standalone without it.
+        self.metrics = metrics
+        self.in_flight = 0
+        self.coalesced = 0
+        self.throttled = 0
+
+        # history.RoomHistory to record every update into. Optional as well.
+        self.history = history
+
         self._url = f"http://{ip}/"
         self._url_remote = self._url + "webremo"
 
@@ -227,9 +449,9 @@ class ACManager:
 
         # overrides class's
         self.base_state = {k: v for k, v in self.base_state.items()}
-        self.base_state["hdnNo_4"] = temp
-        self.base_state["hdnNo_10"] = speed
-        self.base_state["hdnNo_11"] = angle
+
+        self._form = FormTemplate(self.base_state, self.variable_fields)
+        self._credentials = urlencode({"txtId": id_, "txtPwd": password}).encode()
 
         # AC states to keep track of
         self.state: Union[ACState, None] = None
@@ -237,30 +459,192 @@ class ACManager:
         self.is_powered = False
         self.action = "other"
 
-    @functools.cached_property
+        # bumped whenever state or sent settings change, see wait_changed
+        self.version = 0
+        self.updated_at = 0.0
+        self._changed = trio.Event()
+
+    @property
     def upper_bound(self) -> int:
-        """Upper temp boundary"""
+        """Upper temp boundary, exclusive. From controller page once it's fetched."""
 
         return self.base_state["hdnNo_12"]
 
-    @functools.cached_property
+    @property
     def lower_bound(self) -> int:
-        """Lower temp boundary"""
+        """Lower temp boundary, inclusive. From controller page once it's fetched."""
 
         return self.base_state["hdnNo_13"]
 
-    @property
-    def payload(self) -> Dict[str, Any]:
-        """Creates payload."""
+    def _check_temp(self, temp: int):
+        """Raises ACTempOutOfBound if controller wouldn't accept temp."""
+
+        if not self.lower_bound <= temp < self.upper_bound:
+            raise ACTempOutOfBound(
+                f"Target temp must be {self.lower_bound} ~ {self.upper_bound - 1}, got {temp}"
+            )
+
+    def _check_power(self, on: bool):
+        """Raises ACPermissionDenied if page says power can't be switched that way."""
+
+        if self.state is None:
+            return
+
+        if on and not self.state.can_power_on:
+            raise ACPermissionDenied("No permission to power on")
+
+        if not on and not self.state.can_power_off:
+            raise ACPermissionDenied("No permission to power off")
+
+    def _sync_fields(self, fields: Dict[str, int]):
+        """Takes fixed hidden fields - bounds, permissions etc - from page, like browser
+        would post them back. Form template is only rebuilt when they change."""
+
+        changed = {
+            key: value
+            for key, value in fields.items()
+            if key in self.base_state
+            and key not in self.variable_fields
+            and self.base_state[key] != value
+        }
+
+        if not changed:
+            return
+
+        logger.debug("Controller fields changed: {}", changed)
+
+        self.base_state.update(changed)
+        self._form = FormTemplate(self.base_state, self.variable_fields)
+
+    def _payload(self) -> bytes:
+        """Encodes command form body from current settings & viewstate."""
+
+        x, y = self.btn_action[self.action]
+
+        return self._form.encode(
+            (int(self.is_powered), self.target_temp, self.speed, self.angle, x, y),
+            self.state.encoded_states,
+        )
+
+    async def _request(self, operation: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Sends request once rate limit allows, recording latency & failures when metrics is set.
+
+        Raises:
+            ACRequestFailed: If request couldn't be made - connection, timeout etc.
+        """
+
+        if self._limiter is not None:
+            waited = await self._limiter.acquire()
+
+            if waited:
+                self.throttled += 1
+                if self.metrics:
+                    self.metrics.throttled.inc(operation)
+                    self.metrics.throttle_seconds.observe(waited)
+
+        start = time.perf_counter()
+        self.in_flight += 1
+
+        if self.metrics:
+            self.metrics.in_flight.inc()
+
+        try:
+            resp = await self.client.request(method, url, follow_redirects=True, **kwargs)
+
+        except httpx.HTTPError as err:
+            if self.metrics:
+                self.metrics.failures.inc(operation)
+
+            # callers only need to know one failure type
+            raise ACRequestFailed(f"{type(err).__name__}: {err}") from err
+
+        finally:
+            self.in_flight -= 1
+            if self.metrics:
+                self.metrics.in_flight.inc(amount=-1)
+                self.metrics.http_seconds.observe(time.perf_counter() - start, operation)
+
+        if resp.is_error and self.metrics:
+            self.metrics.failures.inc(operation)
+
+        return resp
+
+    def _parse(self, resp: httpx.Response) -> ACState:
+        """Parses response into ACState, recording parse time when metrics is set."""
+
+        if not self.metrics:
+            return ACState(resp)
+
+        with self.metrics.parse_seconds.time():
+            return ACState(resp)
+
+    async def _single_flight(self, key: Hashable, func: Callable[[], Awaitable], share=True):
+        """Runs func, unless call with same key is already running - then shares its outcome.
+
+        Args:
+            key: Identity of call, first item being operation name for metrics.
+            func: Async function to run.
+            share: False to run anyway. Later calls then share this one.
+        """
+
+        flight = self._flights.get(key) if share else None
+
+        if flight is not None:
+            self.coalesced += 1
+            if self.metrics:
+                self.metrics.coalesced.inc(key[0])
 
-        payload = {k: v for k, v in self.base_state.items()}
-        payload["hdnNo_4"] = self.target_temp
-        payload["hdnNo_1"] = 1 if self.is_powered else 0
+            await flight.done.wait()
 
-        payload["btnSubmit.x"], payload["btnSubmit.y"] = self.btn_action[self.action]
-        payload.update(self.state.states)
+            if flight.error is not None:
+                # own instance per waiter - raising shared one would mix up tracebacks.
+                # Refusals keep their type, callers handle them differently.
+                error = flight.error
+                if isinstance(error, (ACTempOutOfBound, ACPermissionDenied, NotLoggedIn)):
+                    raise type(error)(*error.args) from error
 
-        return payload
+                raise ACRequestFailed(f"Shared {key[0]} request failed") from error
+
+            return flight.result
+
+        flight = self._flights[key] = _Flight()
+
+        try:
+            flight.result = await func()
+            return flight.result
+
+        except Exception as err:
+            flight.error = err
+            raise
+
+        except BaseException:
+            # cancelled, waiters shouldn't hang or get cancelled along
+            flight.error = ACRequestFailed(f"Shared {key[0]} request was cancelled")
+            raise
+
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+            flight.done.set()
+
+    def _notify(self):
+        self.version += 1
+        self._changed.set()
+        self._changed = trio.Event()
+
+    async def wait_changed(self, version: int) -> int:
+        """Waits until state changes past given version, then returns current version.
+        Passing returned value back in means changes in between aren't missed.
+
+        Args:
+            version: Last version caller has seen.
+        """
+
+        while self.version == version:
+            await self._changed.wait()
+
+        return self.version
 
     async def login(self):
         """
@@ -268,40 +652,89 @@ class ACManager:
 
         Note:
             There's no login failure tolerance. I'm lazy.
+
+        Raises:
+            ACRequestFailed: If request was failed
         """
 
-        # initial update
-        if self.state is None:
-            resp = await self.client.get(self._url, follow_redirects=True)
-            self.state = ACState(resp)
+        async with self._lock:
+            # initial update
+            if self.state is None:
+                resp = await self._request("page", "GET", self._url)
+                self.state = self._parse(resp)
 
-        payloads = self.state.states
+            # proceed login & update state
+            resp = await self._request(
+                "login",
+                "POST",
+                self._url,
+                content=self._credentials + self.state.encoded_states,
+                headers=FORM_HEADERS,
+            )
 
-        # adding login data
-        payloads["txtId"] = self._id
-        payloads["txtPwd"] = self._pw
+            try:
+                resp.raise_for_status()
+            except httpx.HTTPStatusError as err:
+                raise ACRequestFailed(f"Login failed - {err}") from err
 
-        # proceed login & update state
-        resp = await self.client.post(self._url, data=payloads, follow_redirects=True)
+            logger.info("Login successful")
 
-        resp.raise_for_status()
-        logger.info(f"Login successful")
+            if self.metrics:
+                self.metrics.logins.inc()
 
-        await self.update(resp)
+            await self.update(resp)
 
     async def update(self, resp: httpx.Response = None) -> ACState:
-        """Manually trigger update & returns state."""
+        """Manually trigger update & returns state.
+        Concurrent calls share one request and its result."""
 
         if resp is None:
-            resp = await self.client.get(self._url, follow_redirects=True)
+            return await self._single_flight(("update",), self._fetch_update)
+
+        return self._apply(resp)
+
+    async def _fetch_update(self) -> ACState:
+        async with self._lock:
+            return self._apply(await self._request("update", "GET", self._url))
 
-        self.state = ACState(resp)
+    def _apply(self, resp: httpx.Response) -> ACState:
+        """Parses response into current state."""
+
+        self.state = self._parse(resp)
         self.target_temp = self.state.target_temp
+        self.updated_at = time.time()
+
+        # unit can be turned off centrally, page knows better than what was last sent
+        was_powered = self.is_powered
+        if self.state.powered is not None:
+            self.is_powered = self.state.powered
+
+        # same for wind, which can be changed from other remotes
+        hidden = self.state.hidden
+        if 0 <= hidden.get("hdnNo_10", -1) < len(WIND_SPEED_MODE):
+            self.speed = hidden["hdnNo_10"]
+        if 0 <= hidden.get("hdnNo_11", -1) < len(WIND_DIRECTION_MODE):
+            self.angle = hidden["hdnNo_11"]
+
+        self._sync_fields(self.state.hidden)
+
+        snapshot = self.state.snapshot
+        prev, self._last_snapshot = self._last_snapshot, snapshot
+
+        if snapshot != prev or self.is_powered != was_powered:
+            self._notify()
+
+        if self.history:
+            self.history.record(snapshot, self.is_powered)
 
-        logger.info(f"Cur. Temp      : {self.state.current_temp}")
-        logger.info(f"Cur. Operation : {self.state.operation_mode}")
-        logger.info(f"Cur. Wind speed: {self.state.wind_speed}")
-        logger.info(f"Cur. Wind angle: {self.state.wind_angle}")
+        if not self.log_changes_only or snapshot != prev:
+            logger.info(
+                "Cur. Temp {} / Operation {} / Wind speed {} / Wind angle {}",
+                snapshot.current_temp,
+                snapshot.operation_mode,
+                snapshot.wind_speed,
+                snapshot.wind_angle,
+            )
 
         return self.state
 
@@ -326,13 +759,15 @@ class ACManager:
 
         while True:
             sleep_duration = interval_sec + randint(0, deviation_max_sec)
-            logger.debug(f"Sleeping for {sleep_duration}")
+            logger.debug("Sleeping for {}", sleep_duration)
 
             await trio.sleep(sleep_duration)
 
             await self.login()
             await trio.sleep(5)
-            await self._send()
+
+            async with self._lock:
+                await self._send()
 
     async def get_temp(self):
         """Run update and get new current temp."""
@@ -340,27 +775,94 @@ class ACManager:
         await self.update()
         return self.state.current_temp
 
-    async def power_on(self):
+    async def recent_temps(self, count: int) -> List[float]:
+        """Last count recorded room temps, oldest first. Empty without history.
+        Async so worker's proxy can answer it too."""
+
+        if self.history is None:
+            return []
+
+        return self.history.temps(count)
+
+    def _settings(self) -> tuple:
+        return self.action, self.is_powered, self.target_temp, self.speed, self.angle
+
+    def _restore(self, settings: tuple):
+        self.action, self.is_powered, self.target_temp, self.speed, self.angle = settings
+
+    async def _command(self, key: Union[Hashable, None], apply: Callable[[], None]):
+        """Applies settings change and sends it, holding the lock. Commands queue up in
+        call order. If change is refused or sending fails, settings are rolled back.
+
+        Args:
+            key: Identity for idempotent commands. Identical one right after another shares
+                its request - only then, as sharing across other command would reorder them.
+                None for relative ones (i.e. temp_up) that must all be sent.
+            apply: Changes settings. May raise to refuse.
+        """
+
+        share = key is not None and key == self._last_command
+        self._last_command = key
+
+        async def run():
+            async with self._lock:
+                saved = self._settings()
+
+                try:
+                    apply()
+                    await self._send()
+
+                except BaseException:
+                    self._restore(saved)
+                    raise
+
+        if key is None:
+            await run()
+        else:
+            await self._single_flight(key, run, share)
+
+    async def power_on(self, temp: int = None):
         """Power On AC.
 
+        Args:
+            temp: Target temp to power on with. Current one if omitted.
+
         Raises:
+            ACTempOutOfBound: If temp is out of bound
+            ACPermissionDenied: If controller doesn't allow powering on
             ACRequestFailed: If request was failed
         """
 
-        self.action = "on"
-        self.is_powered = True
-        await self._send()
+        if temp is not None:
+            self._check_temp(temp)
+
+        def apply():
+            # under the lock, so it's checked against state as of this command's turn
+            self._check_power(True)
+
+            self.action = "on"
+            self.is_powered = True
+
+            if temp is not None:
+                self.target_temp = temp
+
+        await self._command(("power_on", temp), apply)
 
     async def power_off(self):
         """Power Off AC.
 
         Raises:
+            ACPermissionDenied: If controller doesn't allow powering off
             ACRequestFailed: If request was failed
         """
 
-        self.action = "off"
-        self.is_powered = False
-        await self._send()
+        def apply():
+            self._check_power(False)
+
+            self.action = "off"
+            self.is_powered = False
+
+        await self._command(("power_off",), apply)
 
     async def set_temp(self, temp: int):
         """Set specific temp.
@@ -373,11 +875,52 @@ class ACManager:
             ACRequestFailed: If request was failed
         """
 
-        if not(self.lower_bound <= temp < self.upper_bound):
-            raise ACTempOutOfBound()
+        self._check_temp(temp)
 
-        self.target_temp = temp
-        await self._send()
+        def apply():
+            self.target_temp = temp
+
+        await self._command(("set_temp", temp), apply)
+
+    async def set_wind_speed(self, speed: int):
+        """Set wind speed.
+
+        Args:
+            speed: Index of WIND_SPEED_MODE - 0 Auto / 1 High / 2 Mid / 3 Low
+
+        Raises:
+            ValueError: If speed is not one of modes
+            ACRequestFailed: If request was failed
+        """
+
+        if not 0 <= speed < len(WIND_SPEED_MODE):
+            raise ValueError(f"Wind speed must be 0 ~ {len(WIND_SPEED_MODE) - 1}, got {speed}")
+
+        def apply():
+            self.speed = speed
+
+        await self._command(("set_wind_speed", speed), apply)
+
+    async def set_wind_angle(self, angle: int):
+        """Set wind angle.
+
+        Args:
+            angle: Index of WIND_DIRECTION_MODE - 0 Swing / 1 Horizontal / 2 Vertical
+
+        Raises:
+            ValueError: If angle is not one of modes
+            ACRequestFailed: If request was failed
+        """
+
+        if not 0 <= angle < len(WIND_DIRECTION_MODE):
+            raise ValueError(
+                f"Wind angle must be 0 ~ {len(WIND_DIRECTION_MODE) - 1}, got {angle}"
+            )
+
+        def apply():
+            self.angle = angle
+
+        await self._command(("set_wind_angle", angle), apply)
 
     async def temp_down(self):
         """Lower temp by 1.
@@ -387,11 +930,12 @@ class ACManager:
             ACRequestFailed: If request was failed
         """
 
-        if (self.target_temp - 1) <= self.lower_bound:
-            raise ACTempOutOfBound()
+        # checked once it's this call's turn, against target earlier calls left
+        def apply():
+            self._check_temp(self.target_temp - 1)
+            self.target_temp -= 1
 
-        self.target_temp -= 1
-        await self._send()
+        await self._command(None, apply)
 
     async def temp_up(self):
         """Higher temp by 1.
@@ -401,44 +945,100 @@ class ACManager:
             ACRequestFailed: If request was failed
         """
 
-        if self.target_temp >= self.upper_bound:
-            raise ACTempOutOfBound()
+        def apply():
+            self._check_temp(self.target_temp + 1)
+            self.target_temp += 1
+
+        await self._command(None, apply)
+
+    async def fetch_image(self, src: str) -> bytes:
+        """Downloads controller's state image, i.e. images/nn_1.gif.
+
+        Raises:
+            ACRequestFailed: If request was failed
+        """
 
-        self.target_temp += 1
-        await self._send()
+        resp = await self._request("image", "GET", self._url + src.lstrip("./"))
+
+        try:
+            resp.raise_for_status()
+        except httpx.HTTPStatusError as err:
+            raise ACRequestFailed() from err
+
+        return resp.content
 
     async def _send(self):
-        """Sends request.
+        """Sends request. Caller must hold the lock.
 
         Raises:
             ACRequestFailed: If request operation fails
         """
 
-        # TODO: add & raise custom errors (i.e. permission, out of temp range, etc)
+        # permission & temp range are checked before getting here.
         # TODO: Check all possible exceptions from Univ's AC web remote server
 
-        logger.info("Sending request!")
-        logger.debug(f"Power {self.is_powered} / TGT Temp {self.target_temp}")
+        logger.debug(
+            "Sending {} - Power {} / TGT Temp {}", self.action, self.is_powered, self.target_temp
+        )
 
-        resp = await self.client.post(self._url_remote, data=self.payload, follow_redirects=True)
+        resp = await self._request(
+            "send", "POST", self._url_remote, content=self._payload(), headers=FORM_HEADERS
+        )
 
         try:
             resp.raise_for_status()
 
         except Exception as err:
-            logger.warning(f"{type(err).__name__} - {err}")
-            logger.debug(f"Received response:\n{resp.content.decode()}\n")
+            logger.warning("{} - {}", type(err).__name__, err)
+
+            # decoding whole page is costly, only do so when trace level is on.
+            logger.opt(lazy=True).trace("Received response:\n{}\n", lambda: resp.text[:2048])
             raise ACRequestFailed() from err
 
+        else:
+            # power, target & wind are what was just sent
+            self._notify()
+
         finally:
             # reset action
             self.action = "other"
 
 
 async def main(args_):
+    try:
+        from log_config import setup_logging
+    except ImportError:
+        # running api.py alone - keep loguru defaults
+        pass
+    else:
+        setup_logging(args_.log_level, args_.log_json, args_.log_file)
+
     logger.info("Note: This script will automatically stop AC when shutting down by SIGINT")
 
-    ac = ACManager(args_.ip, args_.id, args_.pwd, args_.temp, args_.wind_angle, args_.wind_speed)
+    metrics = None
+    if args_.metrics_port:
+        # only needed for exporting, api.py otherwise works alone
+        from metrics import ACMetrics, serve_metrics
+
+        metrics = ACMetrics()
+
+    history = None
+    if args_.history:
+        from history import HistoryStore
+
+        history = HistoryStore(args_.history)
+
+    ac = ACManager(
+        args_.ip,
+        args_.id,
+        args_.pwd,
+        args_.temp,
+        args_.wind_angle,
+        args_.wind_speed,
+        metrics,
+        args_.log_changes_only,
+        history.room("default") if history else None,
+    )
 
     await ac.login()
     await ac.power_on()
@@ -448,7 +1048,20 @@ async def main(args_):
         nursery.start_soon(ac.keep_alive_power)
         nursery.start_soon(ac.keep_alive_state)
 
+        if metrics:
+            nursery.start_soon(serve_metrics, args_.metrics_port)
+
+        if args_.schedule:
+            # same as metrics, only imported when used
+            from scheduler import Scheduler
+
+            nursery.start_soon(Scheduler({"default": ac}, args_.schedule).run)
+
     await ac.power_off()
+
+    if history:
+        history.close()
+
     logger.info("Shutting down!")
 
 
@@ -500,6 +1113,51 @@ if __name__ == '__main__':
         help="Login PW"
     )
 
+    parser.add_argument(
+        "-m",
+        "--metrics-port",
+        type=int,
+        default=0,
+        help="Serve prometheus metrics on this local port. 0 to disable"
+    )
+
+    parser.add_argument(
+        "--schedule",
+        type=str,
+        default=None,
+        help="Also run actions from this schedule json, edit it with scheduler.py"
+    )
+
+    parser.add_argument(
+        "--history",
+        type=str,
+        default=None,
+        help="Record AC state history into this directory"
+    )
+
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        default="INFO",
+        help="Minimum log level"
+    )
+    parser.add_argument(
+        "--log-file",
+        type=str,
+        default=None,
+        help="Also log to this size-rotated file"
+    )
+    parser.add_argument(
+        "--log-json",
+        action="store_true",
+        help="Log serialized json records"
+    )
+    parser.add_argument(
+        "--log-changes-only",
+        action="store_true",
+        help="Log AC state only when it changes"
+    )
+
     args = parser.parse_args()
 
     trio.run(main, args)
@@ -0,0 +1,143 @@
+"""
+Concurrency stress run of ACManager against stand-in controller.
+
+Fires hundreds of random commands & updates at once while re-logins happen
+in between, like keepalive would. Re-login invalidates viewstate, so any
+request built with state from before it gets rejected by controller.
+At the end manager's settings are compared against controller's.
+
+Not a unit test - needs nothing but a free local port, run it by hand:
+python api_stress_test.py -n 500
+"""
+
+import random
+from argparse import ArgumentParser
+from collections import Counter
+
+import trio
+from loguru import logger
+
+from stand_in_server import StandInController
+from tiny_http import serve
+from api import ACManager, ACTempOutOfBound
+
+
+COMMANDS = [
+    ("set_temp", lambda rng: (rng.randint(25, 28),)),
+    ("temp_up", lambda rng: ()),
+    ("temp_down", lambda rng: ()),
+    ("power_on", lambda rng: ()),
+    ("power_off", lambda rng: ()),
+    ("set_wind_speed", lambda rng: (rng.randint(0, 3),)),
+    ("set_wind_angle", lambda rng: (rng.randint(0, 2),)),
+    ("update", lambda rng: ()),
+]
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    controller = StandInController()
+
+    outcomes = Counter()
+
+    async with trio.open_nursery() as nursery:
+        listeners = await nursery.start(serve, controller.handle, 0)
+        port = listeners[0].socket.getsockname()[1]
+
+        ac_mgr = ACManager(
+            f"127.0.0.1:{port}", controller.id, controller.password, rate_limit=args.rate_limit
+        )
+        await ac_mgr.login()
+
+        async def run_command(delay: float, name: str, cmd_args: tuple):
+            await trio.sleep(delay)
+
+            try:
+                await getattr(ac_mgr, name)(*cmd_args)
+
+            except ACTempOutOfBound:
+                # refused locally, nothing sent
+                outcomes["refused"] += 1
+
+            except Exception as err:
+                outcomes[f"failed ({type(err).__name__})"] += 1
+
+            else:
+                outcomes["ok"] += 1
+
+        async def relogin(delay: float):
+            await trio.sleep(delay)
+
+            try:
+                await ac_mgr.login()
+            except Exception as err:
+                outcomes[f"login failed ({type(err).__name__})"] += 1
+
+        start = trio.current_time()
+
+        async with trio.open_nursery() as workers:
+            for _ in range(args.commands):
+                name, make_args = rng.choice(COMMANDS)
+                workers.start_soon(run_command, rng.uniform(0, args.spread), name, make_args(rng))
+
+            for _ in range(args.logins):
+                workers.start_soon(relogin, rng.uniform(0, args.spread))
+
+        elapsed = trio.current_time() - start
+
+        # what manager believes vs what controller has
+        await ac_mgr.update()
+        fields = controller.fields
+
+        mismatches = {
+            name: (mine, theirs)
+            for name, mine, theirs in (
+                ("target_temp", ac_mgr.target_temp, fields["hdnNo_4"]),
+                ("powered", ac_mgr.is_powered, controller.is_powered),
+                ("wind_speed", ac_mgr.speed, fields["hdnNo_10"]),
+                ("wind_angle", ac_mgr.angle, fields["hdnNo_11"]),
+            )
+            if mine != theirs
+        }
+
+        nursery.cancel_scope.cancel()
+
+    logger.info("{} commands + {} logins in {:.2f} s", args.commands, args.logins, elapsed)
+
+    for outcome, count in sorted(outcomes.items()):
+        logger.info("  {:<28}: {}", outcome, count)
+
+    logger.info("Controller stats         : {}", controller.stats)
+    logger.info("Coalesced / throttled    : {} / {}", ac_mgr.coalesced, ac_mgr.throttled)
+
+    if mismatches:
+        logger.error("Manager out of sync with controller (mine, controller's): {}", mismatches)
+    else:
+        logger.info("Manager in sync with controller")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser("ACManager concurrency stress run")
+
+    parser.add_argument("-n", "--commands", type=int, default=300, help="Commands to fire")
+    parser.add_argument("-l", "--logins", type=int, default=10, help="Re-logins in between")
+    parser.add_argument(
+        "--spread", type=float, default=1.0, help="Seconds commands are spread over"
+    )
+    parser.add_argument(
+        "--rate-limit", type=float, default=0, help="ACManager rate limit, 0 to disable"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--log-level", type=str, default="INFO", help="Minimum log level")
+
+    args_ = parser.parse_args()
+
+    # state line of every update would bury the report
+    logger.remove()
+    logger.add(
+        lambda msg: print(msg, end=""),
+        level=args_.log_level,
+        filter=lambda record: record["name"] != "api" or record["level"].no >= 30,
+    )
+
+    trio.run(main, args_)
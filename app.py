@@ -3,7 +3,10 @@ Application definition. This is just a control class.
 """
 
 import time
+import pathlib
+from contextlib import asynccontextmanager
 from random import randint
+from typing import Union
 
 
 import pygame
@@ -13,57 +16,32 @@ from loguru import logger
 from framebuffer_driver import FramebufferDriver
 from touch_driver import TouchDriver
 from basic_ui_framework import *
-from api import ACManager, ACTempOutOfBound
+from api import (
+    ACManager,
+    ACTempOutOfBound,
+    ACRequestFailed,
+    ACPermissionDenied,
+    WIND_SPEED_MODE,
+    WIND_DIRECTION_MODE,
+)
+from tracing import TRACER
 
 
 __all__ = ["ACApp"]
 
 
-def bake_ui():
-    _trans = (25, 25, 25, 255)
-    symbol_font = pygame.font.SysFont("freeserif", 50)
-    temp_font = pygame.font.SysFont("notosansmono", 50)
-    state_font = pygame.font.SysFont("undotum", 40)
-
-    ui = {
-        "Temp up": TextButton(
-            (10, 10), (70, 70), "▲", color=(255, 0, 0, 255), font=symbol_font
-        ),
-        "Temp down": TextButton(
-            (10, 80), (70, 140), "▼", color=(0, 0, 255, 255), font=symbol_font
-        ),
-        "Power": TextButton(
-            (10, 250), (70, 310), "⚡", color=(100, 100, 100, 255), font=symbol_font
-        ),
-        "Temp target": TextBox(
-            (220, 10),
-            (470, 70),
-            "TGT --°C",
-            color=_trans,
-            text_color=(0, 255, 0, 255),
-            font=temp_font,
-        ),
-        "Temp current": TextBox(
-            (220, 80),
-            (470, 140),
-            "CUR --°C",
-            color=_trans,
-            text_color=(255, 255, 255, 255),
-            font=temp_font,
-        ),
-        # "Wind angle": TextBox((100, 80), (100, 130), "WC", color=_trans, text_color=(255, 255, 255, 255)),
-        # "Wind speed": TextBox((100, 80), (100, 130), "CUR: --'C", color=_trans, text_color=(255, 255, 255, 255)),
-        "Operation Mode": TextBox(
-            (370, 260),
-            (470, 310),
-            "꺼짐",
-            color=_trans,
-            text_color=(255, 255, 255, 255),
-            font=state_font,
-        ),
-    }
-
-    return UIManager(**ui)
+# Layout of all pages, drawn in 480x320 and scaled to actual panel.
+LAYOUT_PATH = pathlib.Path(__file__).parent / "layouts" / "main.json"
+
+# button color while request is in flight
+BUSY_COLOR = (255, 255, 0, 255)
+
+# target temp box flashes these, fading back to normal
+OK_COLOR = (0, 120, 0, 255)
+FAIL_COLOR = (160, 0, 0, 255)
+
+POWER_ON_COLOR = (0, 255, 0, 255)
+POWER_OFF_COLOR = (150, 150, 150, 255)
 
 
 class ACApp:
@@ -72,9 +50,23 @@ class ACApp:
         ac_mgr: ACManager,
         touch_driver: TouchDriver,
         fb_driver: FramebufferDriver,
+        metrics=None,
+        scheduler=None,
+        pool=None,
     ):
+        """
+        Args:
+            metrics: metrics.PanelMetrics to report flush timing into. Optional.
+            scheduler: scheduler.Scheduler to list on schedule page. Optional.
+            pool: dashboard.RoomPool to show as tiles, tapping one opens its controls.
+                ac_mgr is then just the room shown first. Optional.
+        """
+
         super().__init__()
 
+        self._metrics = metrics
+        self._scheduler = scheduler
+
         pygame.font.init()
 
         self._ac_manager = ac_mgr
@@ -84,30 +76,211 @@ class ACApp:
 
         # some common stuffs for rendering
         self.screen = fb_driver.screen
-        self._font = pygame.font.Font(None, 50)
 
-        self.ui = bake_ui()
+        self.ui = load_layout(LAYOUT_PATH, self.screen)
+        self.ui.on_page_switch = self._page_switched
+
+        self.animator = Animator()
+        self._draw_lock = trio.Lock()
+
+        # elements with request in flight, their color is left to the request
+        self._busy_elements = set()
+
+        # cancelled to make watch_changes follow newly opened room
+        self._watch_scope: Union[trio.CancelScope, None] = None
 
         # register callback
-        self.ui["Temp up"].on_click = self.toggle_power_pressed
+        self.ui["Temp up"].on_click = self.temp_up_pressed
         self.ui["Temp down"].on_click = self.temp_down_pressed
-        self.ui["Power"].on_click = self.temp_up_pressed
+        self.ui["Power"].on_click = self.toggle_power_pressed
+
+        for idx in range(len(WIND_SPEED_MODE)):
+            self.ui[f"Speed {idx}"].on_click = self._wind_action("Speed", idx)
 
+        for idx in range(len(WIND_DIRECTION_MODE)):
+            self.ui[f"Angle {idx}"].on_click = self._wind_action("Angle", idx)
+
+        self._pool = pool
+        self._dashboard = None
+
+        if pool is None:
+            # single room, nothing to go back to
+            self.ui.remove_element("Rooms")
+        else:
+            # imported here so single room panel doesn't need it
+            from dashboard import Dashboard
+
+            self._dashboard = Dashboard(self.ui, pool, self._open_room)
+
+        self.started = time.time()
         self.last_update = time.time()
 
     async def init(self):
-        """Init job that requires async"""
-
-        self._fb_driver.show_splash()
+        """Init job that requires async.
+        Splash is expected to be on screen already, so this only logs in
+        and fills texts from the state login fetched - no extra request.
+        With room pool, logs in all rooms and shows their tiles instead."""
+
+        if self._pool is not None:
+            await self._pool.poll_all()
+            self._dashboard.refresh()
+            self.ui.switch_page(self._dashboard.page_name)
+            return
 
-        await self._fb_driver.update()
         await self._ac_manager.login()
+        await self._show_room()
+
+    async def _show_room(self):
+        """Fills controls page from current manager's last known state."""
+
+        self._update_target_temp()
+        self.ui["Temp current"].set_text(f"CUR {self._ac_manager.state.current_temp}°C")
+        self.ui["Power"].set_color(
+            *(POWER_ON_COLOR if self._ac_manager.is_powered else POWER_OFF_COLOR)
+        )
+        await self._update_mode_icon()
+
+        # last update is already recorded, so history has the latest reading too.
+        # With worker, history is read over there.
+        graph = self.ui["Temp graph"]
+
+        try:
+            temps = await self._ac_manager.recent_temps(graph.capacity)
+        except ACRequestFailed as err:
+            logger.warning("Couldn't read temp history - {}", err)
+            temps = []
+
+        graph.set_values(temps or [self._ac_manager.state.current_temp])
+
+    async def _open_room(self, name: str):
+        """Tile action, switches controls page over to room's manager."""
+
+        manager = self._pool.rooms[name]
+
+        if manager.state is None:
+            # never reached, nothing to show
+            self.animator.add(ColorFade(self._dashboard.tiles[name], FAIL_COLOR, duration=1.0))
+            return
+
+        self._ac_manager = manager
+        await self._show_room()
+
+        if self._watch_scope is not None:
+            self._watch_scope.cancel()
+
+        self.ui.switch_page("main")
+        await self._page_switched(self.ui.current)
+
+    async def _pool_round(self):
+        """Shows what last poll round brought - changed tiles, or open room's reading."""
+
+        changed = self._dashboard.refresh()
+
+        if self.ui.current.name == self._dashboard.page_name:
+            if changed:
+                await self.draw_ui()
+            return
+
+        # open room's poll failed, nothing new to show
+        if self._ac_manager.updated_at <= self.last_update:
+            return
+
+        cur_temp = self._ac_manager.state.current_temp
+        self.last_update = time.time()
+        self._update_target_temp()
+        self.ui["Temp current"].set_text(f"CUR {cur_temp}°C")
+        self.ui["Temp graph"].push(cur_temp)
+        await self._update_mode_icon()
+        await self.draw_ui()
+
+    async def watch_changes(self):
+        """Redraws target temp, power & wind of shown room whenever its manager changes -
+        by local API, schedule or thermostat as well as panel itself. Run inside a nursery."""
+
+        while True:
+            manager = self._ac_manager
+
+            with trio.CancelScope() as self._watch_scope:
+                version = manager.version
+
+                while True:
+                    version = await manager.wait_changed(version)
+                    self._show_settings()
+                    await self.draw_ui()
+
+    def _show_settings(self):
+        """Shows current manager's settings, except on buttons with request in flight."""
+
+        self._update_target_temp()
+
+        power = self.ui["Power"]
+        color = POWER_ON_COLOR if self._ac_manager.is_powered else POWER_OFF_COLOR
+
+        if power not in self._busy_elements and power.color != color:
+            power.set_color(*color)
+
+        if self.ui.current.name == "wind":
+            self._update_wind_buttons()
+
+        elif self._dashboard is not None and self.ui.current.name == self._dashboard.page_name:
+            self._dashboard.refresh()
+
+    async def _flush(self):
+        """Writes screen, or its snapshot when double buffered, to framebuffer"""
+
+        start = time.perf_counter()
+
+        with TRACER.span("fb_write"):
+            if self._fb_driver.double_buffer:
+                await self._fb_driver.flush_snapshot()
+            else:
+                await self._fb_driver.update()
+
+        if self._metrics:
+            self._metrics.flush_seconds.observe(time.perf_counter() - start)
 
     async def draw_ui(self):
-        """Draw ui"""
+        """Draws changed part of ui, or whole page right after page switch."""
+
+        # drawing while non-double-buffered flush reads the surface fails, so one at a time.
+        # Double-buffered flush reads a snapshot, so next draw needn't wait for it.
+        async with self._draw_lock:
+            with TRACER.span("draw"):
+                self.ui.draw()
 
-        self.ui.draw_all()
-        await self._fb_driver.update()
+            if not self._fb_driver.double_buffer:
+                await self._flush()
+                return
+
+            self._fb_driver.snapshot()
+
+        await self._flush()
+
+    async def run_animations(self):
+        """Redraws animated elements while any animation runs. Idles otherwise."""
+
+        await self.animator.run(self.draw_ui)
+
+    async def poll_touch(self, interval=0.1):
+        """Polls touch driver and runs click event. Each touch starts new trace,
+        beginning from touch release's event timestamp."""
+
+        logger.debug("Touch polling started")
+
+        while True:
+            await trio.sleep(interval)
+
+            touch = self._touch_driver.receive_touch()
+            if touch is None:
+                continue
+
+            TRACER.new_trace()
+            TRACER.record_since(
+                "touch", self._touch_driver.filter.last_release, self._touch_driver.event_clock
+            )
+
+            with TRACER.span("run_click_event"):
+                await self.ui.run_click_event(touch)
 
     async def graceful_shutdown(self):
         """Attempt graceful shutdown"""
@@ -116,64 +289,201 @@ class ACApp:
             await self._ac_manager.power_off()
             await self.draw_ui()
 
-    async def temp_up_pressed(self, ui_element: Box, *_):
-        """Temp up button action"""
+    @asynccontextmanager
+    async def _busy(self, ui_element: TextButton):
+        """Yellow button with spinner while request is in flight."""
 
-        # Start with Yellow color to indicate we're doing something
-        prev_color = ui_element.color
-        ui_element.set_color(255, 255, 0, 255)
-        ui_element.draw()
-        await self._fb_driver.update()
+        ui_element.set_color(*BUSY_COLOR)
+        self._busy_elements.add(ui_element)
 
         try:
-            await self._ac_manager.temp_up()
-        except ACTempOutOfBound:
-            # make target temp text red for 1 sec
-            return
+            with self.animator.spinning(ui_element):
+                await self.draw_ui()
+                yield
 
-        ui_element.set_color(*prev_color)
-        self._update_target_temp()
-        await self.draw_ui()
-        # else make target temp text green for 1 sec
+        finally:
+            self._busy_elements.discard(ui_element)
 
-    async def temp_down_pressed(self, ui_element: Box, *_):
-        """Temp down button action"""
+    async def _temp_action(self, ui_element: TextButton, action):
+        """Runs temp up/down, flashing target temp box green or red on result."""
 
         prev_color = ui_element.color
-        ui_element.set_color(255, 255, 0, 255)
-        ui_element.draw()
-        await self._fb_driver.update()
 
         try:
-            await self._ac_manager.temp_down()
+            async with self._busy(ui_element):
+                with TRACER.span("http"):
+                    await action()
+
         except ACTempOutOfBound:
-            # make target temp text red for 1 sec
-            return
+            self.animator.add(ColorFade(self.ui["Temp target"], FAIL_COLOR, duration=1.0))
 
-        ui_element.set_color(*prev_color)
-        self._update_target_temp()
-        await self.draw_ui()
-        # else make target temp text green for 1 sec
+        except ACRequestFailed as err:
+            logger.warning("Temp change failed - {}: {}", type(err).__name__, err)
+            self.animator.add(ColorFade(self.ui["Temp target"], FAIL_COLOR, duration=1.0))
+
+        else:
+            self._update_target_temp()
+            self.animator.add(ColorFade(self.ui["Temp target"], OK_COLOR, duration=1.0))
+
+        finally:
+            self.animator.add(ColorFade(ui_element, BUSY_COLOR, prev_color, duration=0.3))
 
-    async def toggle_power_pressed(self, ui_element, *_):
+    async def temp_up_pressed(self, ui_element: TextButton, *_):
+        """Temp up button action"""
+
+        await self._temp_action(ui_element, self._ac_manager.temp_up)
+
+    async def temp_down_pressed(self, ui_element: TextButton, *_):
+        """Temp down button action"""
+
+        await self._temp_action(ui_element, self._ac_manager.temp_down)
+
+    async def toggle_power_pressed(self, ui_element: TextButton, *_):
         """Power button toggle action"""
 
-        ui_element.set_color(255, 255, 0, 255)
-        ui_element.draw()
-        await self._fb_driver.update()
+        start_color = BUSY_COLOR
 
-        if self._ac_manager.is_powered:
-            await self._ac_manager.power_off()
-            ui_element.set_color(150, 150, 150, 255)
-            # disable all display output
-        else:
-            await self._ac_manager.power_on()
-            ui_element.set_color(0, 255, 0, 255)
-            # enable all display output
+        try:
+            async with self._busy(ui_element):
+                with TRACER.span("http"):
+                    if self._ac_manager.is_powered:
+                        await self._ac_manager.power_off()
+                    else:
+                        await self._ac_manager.power_on()
+
+        except ACPermissionDenied as err:
+            # refused before any request, controller doesn't allow it right now
+            logger.warning("Power toggle refused - {}", err)
+            start_color = FAIL_COLOR
+
+        except ACRequestFailed as err:
+            logger.warning("Power toggle failed - {}: {}", type(err).__name__, err)
+            start_color = FAIL_COLOR
+
+        # TODO: enable/disable all display output with power
+        color = POWER_ON_COLOR if self._ac_manager.is_powered else POWER_OFF_COLOR
+        self.animator.add(ColorFade(ui_element, start_color, color, duration=0.3))
+
+    async def _page_switched(self, page: Page):
+        """Fills page's texts that are only kept up-to-date while shown."""
+
+        if page.name == "wind":
+            self._update_wind_buttons()
+
+        elif page.name == "schedule":
+            self._update_schedule()
+
+        elif page.name == "diagnostics":
+            self._update_diagnostics()
+
+        elif self._dashboard is not None and page.name == self._dashboard.page_name:
+            # may have been changed from controls page since last shown
+            self._dashboard.refresh()
 
-        # TODO: change power button color
         await self.draw_ui()
 
+    def _wind_action(self, kind: str, idx: int):
+        """Creates wind speed/angle button action."""
+
+        async def action(ui_element: TextButton, *_):
+            try:
+                async with self._busy(ui_element):
+                    with TRACER.span("http"):
+                        if kind == "Speed":
+                            await self._ac_manager.set_wind_speed(idx)
+                        else:
+                            await self._ac_manager.set_wind_angle(idx)
+
+            except ACRequestFailed as err:
+                # settings were rolled back, so buttons go back to what's still selected
+                logger.warning("Wind {} change failed - {}: {}", kind.lower(), type(err).__name__, err)
+                self._update_wind_buttons()
+                self.animator.add(ColorFade(ui_element, FAIL_COLOR, duration=0.3))
+
+            else:
+                self._update_wind_buttons()
+
+            await self.draw_ui()
+
+        return action
+
+    def _update_wind_buttons(self):
+        """Highlights wind speed & angle that'll be sent"""
+
+        for kind, selected, modes in (
+            ("Speed", self._ac_manager.speed, WIND_SPEED_MODE),
+            ("Angle", self._ac_manager.angle, WIND_DIRECTION_MODE),
+        ):
+            for idx in range(len(modes)):
+                button = self.ui[f"{kind} {idx}"]
+                if button in self._busy_elements:
+                    continue
+
+                color = (0, 150, 0, 255) if idx == selected else (60, 60, 60, 255)
+                button.set_color(*color)
+
+    def _update_schedule(self):
+        """Shows next scheduled action"""
+
+        upcoming = self._scheduler.upcoming(1) if self._scheduler else []
+
+        if not upcoming:
+            self.ui["Schedule list"].set_text("No schedules")
+            return
+
+        at, entry = upcoming[0]
+        value = "" if entry.value is None else f" {entry.value}"
+        self.ui["Schedule list"].set_text(
+            f"Next {time.strftime('%a %H:%M', time.localtime(at))} {entry.action}{value}"
+        )
+
+    def _update_diagnostics(self):
+        """Fills diagnostics page from driver & manager counters"""
+
+        fb_d = self._fb_driver
+        touch_filter = self._touch_driver.filter
+        uptime = int(time.time() - self.started)
+
+        self.ui["Diag frames"].set_text(
+            f"Frames {fb_d.frames_flushed} / {fb_d.bytes_flushed // 1024} KiB"
+            f" / last {fb_d.last_flush_sec * 1000:.1f} ms"
+        )
+        self.ui["Diag touch"].set_text(
+            f"Touch {touch_filter.accepted} ok / {touch_filter.rejected} rejected"
+        )
+        self.ui["Diag http"].set_text(
+            f"HTTP in flight {self._ac_manager.in_flight}"
+            f" / assets {len(ASSETS)}, {ASSETS.bytes_used // 1024} KiB"
+        )
+        self.ui["Diag uptime"].set_text(
+            f"Uptime {uptime // 3600}h {uptime // 60 % 60}m {uptime % 60}s"
+        )
+
+    async def _update_mode_icon(self):
+        """Shows controller's own operation mode image. Each image is downloaded
+        once and kept screen-ready in asset cache."""
+
+        src = self._ac_manager.state.images.get("Image_1")
+        if src is None:
+            return
+
+        icon = self.ui["Mode icon"]
+
+        try:
+            icon.set_image_bytes(src)
+            return
+        except KeyError:
+            pass
+
+        try:
+            data = await self._ac_manager.fetch_image(src)
+        except ACRequestFailed as err:
+            # icon just stays as it was, next update tries again
+            logger.warning("Couldn't fetch mode image {} - {}", src, err)
+            return
+
+        icon.set_image_bytes(src, data)
+
     def _update_target_temp(self):
         """Updates target temp on screen"""
 
@@ -181,14 +491,31 @@ class ACApp:
         self.ui["Temp target"].set_text(f"TGT {tgt_temp}°C")
 
     async def _update_current_temp(self):
-        """Updates current temp on screen"""
+        """Updates current temp on screen. Failure flashes current temp box and is
+        retried a full interval later."""
+
+        try:
+            cur_temp = await self._ac_manager.get_temp()
+
+        except ACRequestFailed as err:
+            logger.warning("Temp update failed - {}: {}", type(err).__name__, err)
+            self.last_update = time.time()
+            self.animator.add(ColorFade(self.ui["Temp current"], FAIL_COLOR, duration=1.0))
+            return
 
-        cur_temp = await self._ac_manager.get_temp()
         self.last_update = time.time()
         self.ui["Temp current"].set_text(f"CUR {cur_temp}°C")
+        self.ui["Temp graph"].push(cur_temp)
+        await self._update_mode_icon()
 
     async def update_temp_loop(self, interval_sec=60, max_deviation_sec=10):
-        """Updates temps continuously with interval"""
+        """Updates temps continuously with interval. With room pool, polls all rooms
+        on pool's own interval instead."""
+
+        if self._pool is not None:
+            logger.debug("Room polling started, {} rooms", len(self._pool.rooms))
+            await self._pool.run(self._pool_round)
+            return
 
         logger.debug("Temp update started")
 
@@ -7,6 +7,10 @@ Almost like non-standard usage lead to reinventing everything.
 from .primitives import *
 from .combined import *
 from .ui_manager import *
+from .fonts import *
+from .assets import *
+from .animation import *
+from .layout import *
 from .global_settings import ui_framework_init
 
 # TODO: add LCD protection using black screen after designated time w/o input.
@@ -0,0 +1,239 @@
+"""
+Time based animations.
+
+Animations only change element's color/text and mark it dirty - drawing is left
+to whoever runs Animator, which then redraws just those elements.
+Animator loop sleeps on event while nothing is animating, so idle panel
+doesn't render a single frame.
+
+Time comes from trio clock, so animations run deterministically under MockClock.
+"""
+
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, List, Sequence, Tuple
+
+import trio
+
+from .primitives import *
+
+
+__all__ = ["Animation", "ColorFade", "Flash", "Spinner", "Animator"]
+
+
+Color = Tuple[int, int, int, int]
+
+
+def _setter(element: Box, attr: str) -> Callable:
+    """Returns element's set_color or set_text_color."""
+
+    return getattr(element, f"set_{attr}")
+
+
+class Animation:
+    def __init__(self, element: Box, duration: float, attr: str = "color"):
+        """Base animation, changing element's attr over duration seconds.
+
+        Animations on same element & attr replace each other.
+        """
+
+        self.element = element
+        self.duration = duration
+        self.attr = attr
+
+        self.start = 0.0
+        self.stopped = False
+
+    @property
+    def key(self):
+        return id(self.element), self.attr
+
+    def begin(self, now: float):
+        """Called when added to animator."""
+
+        self.start = now
+
+    def update(self, progress: float):
+        """Applies state at progress 0.0 ~ 1.0"""
+
+    def finish(self):
+        """Called once when animation ends or is stopped."""
+
+    def step(self, now: float) -> bool:
+        """Advances to now. Returns False when done."""
+
+        if self.stopped:
+            return False
+
+        progress = 1.0 if self.duration <= 0 else min(1.0, (now - self.start) / self.duration)
+        self.update(progress)
+
+        return progress < 1.0
+
+
+class ColorFade(Animation):
+    def __init__(
+        self,
+        element: Box,
+        start_color: Sequence[int],
+        end_color: Sequence[int] = None,
+        duration: float = 0.5,
+        attr: str = "color",
+    ):
+        """Linear fade from start_color to end_color.
+
+        Args:
+            end_color: Color to fade into. Defaults to element's current one.
+        """
+
+        super().__init__(element, duration, attr)
+
+        self.start_color = tuple(start_color)
+        self.end_color = tuple(end_color) if end_color else None
+
+    def begin(self, now: float):
+        super().begin(now)
+
+        if self.end_color is None:
+            self.end_color = tuple(getattr(self.element, self.attr))
+
+        _setter(self.element, self.attr)(*self.start_color)
+
+    def update(self, progress: float):
+        color = tuple(
+            round(start + (end - start) * progress)
+            for start, end in zip(self.start_color, self.end_color)
+        )
+
+        if color != tuple(getattr(self.element, self.attr)):
+            _setter(self.element, self.attr)(*color)
+
+    def finish(self):
+        _setter(self.element, self.attr)(*self.end_color)
+
+
+class Flash(Animation):
+    def __init__(
+        self, element: Box, color: Sequence[int], duration: float = 1.0, attr: str = "color"
+    ):
+        """Shows color for duration seconds, then restores previous one."""
+
+        super().__init__(element, duration, attr)
+
+        self.color = tuple(color)
+        self._restore: Color | None = None
+
+    def begin(self, now: float):
+        super().begin(now)
+
+        self._restore = tuple(getattr(self.element, self.attr))
+        _setter(self.element, self.attr)(*self.color)
+
+    def finish(self):
+        _setter(self.element, self.attr)(*self._restore)
+
+
+class Spinner(Animation):
+    def __init__(self, element: TextBox, frames: Sequence[str] = "|/-\\", interval: float = 0.15):
+        """Cycles element's text through frames until stopped, then restores text."""
+
+        super().__init__(element, float("inf"), "text")
+
+        self.frames = frames
+        self.interval = interval
+        self._restore = ""
+
+    def begin(self, now: float):
+        super().begin(now)
+        self._restore = self.element.text
+
+    def step(self, now: float) -> bool:
+        if self.stopped:
+            return False
+
+        idx = int((now - self.start) / self.interval) % len(self.frames)
+        self.element.set_text(self.frames[idx])
+        return True
+
+    def finish(self):
+        self.element.set_text(self._restore)
+
+
+class Animator:
+    def __init__(self, fps: float = 20, clock: Callable[[], float] = trio.current_time):
+        """Advances active animations and triggers redraw at fixed rate.
+
+        Args:
+            fps: Frames per second while anything is animating.
+            clock: Time source, trio clock by default.
+        """
+
+        self.frame_interval = 1 / fps
+        self.clock = clock
+
+        self._active: Dict[tuple, Animation] = {}
+        self._wake = trio.Event()
+
+        # stats
+        self.frames = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._active)
+
+    def add(self, animation: Animation) -> Animation:
+        """Starts animation, ending one already running on same element & attr."""
+
+        old = self._active.pop(animation.key, None)
+        if old is not None:
+            old.finish()
+
+        animation.begin(self.clock())
+        self._active[animation.key] = animation
+        self._wake.set()
+
+        return animation
+
+    def stop(self, animation: Animation):
+        """Ends animation on next frame."""
+
+        animation.stopped = True
+        self._wake.set()
+
+    @contextmanager
+    def spinning(self, element: TextBox, **kwargs):
+        """Runs Spinner on element during the block."""
+
+        spinner = self.add(Spinner(element, **kwargs))
+        try:
+            yield spinner
+        finally:
+            self.stop(spinner)
+
+    def step(self, now: float) -> List[Animation]:
+        """Advances all animations to now. Returns ones that ended."""
+
+        ended = []
+
+        for key, animation in list(self._active.items()):
+            if not animation.step(now):
+                del self._active[key]
+                animation.finish()
+                ended.append(animation)
+
+        return ended
+
+    async def run(self, on_frame: Callable[[], Awaitable]):
+        """Animation loop. on_frame is awaited after each step to draw changes.
+        Run inside a nursery."""
+
+        while True:
+            if not self._active:
+                self._wake = trio.Event()
+                await self._wake.wait()
+
+            now = self.clock()
+            self.step(now)
+            self.frames += 1
+
+            await on_frame()
+            await trio.sleep_until(now + self.frame_interval)
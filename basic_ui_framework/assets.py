@@ -0,0 +1,182 @@
+"""
+Image asset cache.
+
+Decoding png/gif and scaling it is expensive on 1B+, blitting 8bit or
+alpha image onto 16bit framebuffer surface is converted every single time too.
+Cache does both once: decodes, scales to box size and converts into
+screen's pixel format over the box's background color, so drawing is plain copy.
+
+Same (source, size, format, background) is shared between all ImageBoxes.
+Total size is bounded, least recently used ones are dropped first.
+"""
+
+import io
+import os
+from collections import OrderedDict
+from typing import Dict, Tuple, Union
+
+import pygame
+from pygame import Surface, SurfaceType
+from loguru import logger
+
+
+__all__ = ["AssetCache", "ASSETS"]
+
+
+# (source, size, bits, background color)
+AssetKey = Tuple[str, Union[Tuple[int, int], None], int, Tuple[int, ...]]
+
+
+def _surface_bytes(surface: SurfaceType) -> int:
+    return surface.get_pitch() * surface.get_height()
+
+
+def _fit(src_size: Tuple[int, int], box_size: Tuple[int, int]) -> Tuple[int, int]:
+    """Largest size fitting in box keeping aspect ratio."""
+
+    (sw, sh), (bw, bh) = src_size, box_size
+    scale = min(bw / sw, bh / sh)
+    return max(1, round(sw * scale)), max(1, round(sh * scale))
+
+
+class AssetCache:
+    def __init__(self, max_bytes: int = 2 * 1024 * 1024):
+        """LRU cache of screen-ready image surfaces.
+
+        Args:
+            max_bytes: Upper bound of cached surfaces' pixel memory.
+        """
+
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+
+        self._surfaces: OrderedDict[AssetKey, SurfaceType] = OrderedDict()
+
+        # stats
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    def _prepare(
+        self,
+        image: SurfaceType,
+        size: Union[Tuple[int, int], None],
+        screen: SurfaceType,
+        background: Tuple[int, ...],
+    ) -> SurfaceType:
+        if size is not None:
+            size = _fit(image.get_size(), size)
+
+            # smoothscale only handles 24/32bit
+            if image.get_bitsize() in (24, 32):
+                image = pygame.transform.smoothscale(image, size)
+            else:
+                image = pygame.transform.scale(image, size)
+
+        # blitting onto surface of screen's format converts it without needing display,
+        # and flattens transparency over background so no blending is left for draw.
+        converted = Surface(image.get_size(), 0, screen)
+        converted.fill(background)
+        converted.blit(image, (0, 0))
+
+        return converted
+
+    def _store(self, key: AssetKey, surface: SurfaceType) -> SurfaceType:
+        self._surfaces[key] = surface
+        self.bytes_used += _surface_bytes(surface)
+
+        # always keep at least the one just added
+        while self.bytes_used > self.max_bytes and len(self._surfaces) > 1:
+            _, dropped = self._surfaces.popitem(last=False)
+            self.bytes_used -= _surface_bytes(dropped)
+            self.evictions += 1
+
+        return surface
+
+    def _lookup(self, key: AssetKey) -> Union[SurfaceType, None]:
+        surface = self._surfaces.get(key)
+
+        if surface is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._surfaces.move_to_end(key)
+        return surface
+
+    def get(
+        self,
+        path: Union[str, os.PathLike],
+        screen: SurfaceType,
+        size: Union[Tuple[int, int], None] = None,
+        background: Tuple[int, ...] = (0, 0, 0, 255),
+    ) -> SurfaceType:
+        """Returns image file as surface ready to blit on screen.
+
+        Args:
+            path: Image file path.
+            screen: Surface image will be drawn on, to match pixel format.
+            size: Box to fit image in keeping aspect ratio. None to keep original size.
+            background: Color transparent area is flattened over.
+        """
+
+        source = os.fspath(path)
+        key = (source, size, screen.get_bitsize(), tuple(background))
+
+        surface = self._lookup(key)
+        if surface is not None:
+            return surface
+
+        logger.debug("Loading asset {}", source)
+        return self._store(key, self._prepare(pygame.image.load(source), size, screen, background))
+
+    def get_bytes(
+        self,
+        source: str,
+        data: Union[bytes, None],
+        screen: SurfaceType,
+        size: Union[Tuple[int, int], None] = None,
+        background: Tuple[int, ...] = (0, 0, 0, 255),
+    ) -> SurfaceType:
+        """Same as get, but for image already in memory, i.e. fetched over network.
+
+        Args:
+            source: Name to cache under. File extension hints image format.
+            data: Encoded image. Can be None if it's known to be cached already.
+
+        Raises:
+            KeyError: If data is None and image isn't cached.
+        """
+
+        key = (source, size, screen.get_bitsize(), tuple(background))
+
+        surface = self._lookup(key)
+        if surface is not None:
+            return surface
+
+        if data is None:
+            raise KeyError(source)
+
+        image = pygame.image.load(io.BytesIO(data), source)
+        return self._store(key, self._prepare(image, size, screen, background))
+
+    def clear(self):
+        self._surfaces.clear()
+        self.bytes_used = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._surfaces),
+            "bytes": self.bytes_used,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Shared cache.
+ASSETS = AssetCache()
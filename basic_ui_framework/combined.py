@@ -9,7 +9,7 @@ from pygame.font import FontType
 from .primitives import *
 
 
-__all__ = ["TextButton"]
+__all__ = ["TextButton", "ImageButton"]
 
 
 class TextButton(TextBox, ButtonMixin):
@@ -24,6 +24,7 @@ class TextButton(TextBox, ButtonMixin):
         font: FontType = None,
         antialias: bool = True,
         screen=None,
+        charset: str = None,
     ):
         """The Textbox that clicked, to jokingly say."""
         super().__init__(
@@ -35,4 +36,20 @@ class TextButton(TextBox, ButtonMixin):
             font=font,
             antialias=antialias,
             screen=screen,
+            charset=charset,
         )
+
+
+class ImageButton(ImageBox, ButtonMixin):
+    def __init__(
+        self,
+        p1,
+        p2,
+        image: str = None,
+        /,
+        color: Tuple[int, int, int, int] = (0, 0, 0, 255),
+        scale: bool = True,
+        screen=None,
+    ):
+        """Clickable image."""
+        super().__init__(p1, p2, image, color=color, scale=scale, screen=screen)
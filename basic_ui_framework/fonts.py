@@ -0,0 +1,154 @@
+"""
+Shared font registry and glyph atlas.
+
+SysFont scans every installed font via fontconfig on first call, which takes
+seconds on 1B+. Registry resolves font name to path once and keeps it in a
+disk cache, so next boot skips the scan entirely.
+
+GlyphAtlas pre-renders a small charset so texts made only of those
+characters (temps, arrows, mode labels) are drawn by blitting glyphs
+instead of rasterizing again.
+"""
+
+import os
+import json
+import pathlib
+from typing import Dict, Tuple, Union
+
+import pygame
+from pygame import SurfaceType
+from pygame.font import FontType
+
+
+__all__ = ["FontRegistry", "GlyphAtlas", "FONTS"]
+
+
+def _default_cache_path() -> pathlib.Path:
+    base = os.environ.get("XDG_CACHE_HOME") or pathlib.Path.home() / ".cache"
+    return pathlib.Path(base) / "basic_ui_framework" / "fonts.json"
+
+
+class GlyphAtlas:
+    def __init__(
+        self,
+        font: FontType,
+        charset: str,
+        color: Tuple[int, int, int, int],
+        antialias: bool = True,
+    ):
+        """Pre-rendered glyphs of given charset in single color.
+
+        Glyphs are placed by their own width - no kerning, which doesn't
+        matter for digits and monospace fonts this is meant for.
+        """
+
+        self.color = tuple(color)
+        self.glyphs: Dict[str, SurfaceType] = {
+            char: font.render(char, antialias, self.color) for char in set(charset)
+        }
+        self.height = max((glyph.get_height() for glyph in self.glyphs.values()), default=0)
+
+    def covers(self, text: str) -> bool:
+        glyphs = self.glyphs
+        return all(char in glyphs for char in text)
+
+    def width(self, text: str) -> int:
+        glyphs = self.glyphs
+        return sum(glyphs[char].get_width() for char in text)
+
+    def blit(self, surface: SurfaceType, text: str, pos: Tuple[int, int]):
+        """Draws text on surface starting at pos. Text must be covered by atlas."""
+
+        x, y = pos
+        glyphs = self.glyphs
+
+        for char in text:
+            glyph = glyphs[char]
+            surface.blit(glyph, (x, y))
+            x += glyph.get_width()
+
+
+class FontRegistry:
+    def __init__(self, cache_path: Union[str, os.PathLike, None] = None):
+        """Resolves fonts by name once and shares Font objects.
+
+        Args:
+            cache_path: Json file keeping name -> font path. Defaults to
+                $XDG_CACHE_HOME/basic_ui_framework/fonts.json.
+        """
+
+        self.cache_path = pathlib.Path(cache_path) if cache_path else _default_cache_path()
+
+        # loaded on first resolve
+        self._paths: Union[Dict[str, Union[str, None]], None] = None
+        self._fonts: Dict[Tuple[str, int], FontType] = {}
+        self._atlases: Dict[tuple, GlyphAtlas] = {}
+
+    def _load(self):
+        try:
+            self._paths = json.loads(self.cache_path.read_text(encoding="utf8"))
+        except (OSError, ValueError):
+            self._paths = {}
+
+    def _save(self):
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self.cache_path.write_text(json.dumps(self._paths, indent=2), encoding="utf8")
+        except OSError:
+            # read-only fs is fine, we'll just scan again next time
+            pass
+
+    def resolve(self, name: str) -> Union[str, None]:
+        """Returns font file path for name, None for pygame default font."""
+
+        if self._paths is None:
+            self._load()
+
+        if name in self._paths:
+            path = self._paths[name]
+
+            # font could've been uninstalled since
+            if path is None or os.path.exists(path):
+                return path
+
+        # this is the slow fontconfig scan we want to do only once
+        path = pygame.font.match_font(name)
+
+        self._paths[name] = path
+        self._save()
+
+        return path
+
+    def get(self, name: Union[str, None], size: int) -> FontType:
+        """Returns shared Font. None name is pygame default font."""
+
+        key = (name, size)
+
+        if key not in self._fonts:
+            if not pygame.font.get_init():
+                pygame.font.init()
+
+            path = self.resolve(name) if name else None
+            self._fonts[key] = pygame.font.Font(path, size)
+
+        return self._fonts[key]
+
+    def atlas(
+        self,
+        font: FontType,
+        charset: str,
+        color: Tuple[int, int, int, int],
+        antialias: bool = True,
+    ) -> GlyphAtlas:
+        """Returns shared glyph atlas, rendering it on first request."""
+
+        key = (font, charset, tuple(color), antialias)
+
+        if key not in self._atlases:
+            self._atlases[key] = GlyphAtlas(font, charset, color, antialias)
+
+        return self._atlases[key]
+
+
+# Shared registry.
+FONTS = FontRegistry()
@@ -0,0 +1,191 @@
+"""
+Declarative layout loading.
+
+Layout is a json file describing elements in reference resolution, i.e.:
+
+    {
+      "reference": [480, 320],
+      "fonts": {"symbol": ["freeserif", 50]},
+      "charsets": {"temp": "0123456789"},
+      "elements": {
+        "Power": {"type": "TextButton", "rect": [10, 250, 70, 310], "text": "⚡",
+                  "color": [100, 100, 100, 255], "font": "symbol"}
+      }
+    }
+
+Rects and font sizes are scaled to the target surface once on load,
+so the same file serves LCD35 (480x320) and LCD28 (320x240).
+Element order in file is draw order.
+
+Multiple pages go under "pages" instead of "elements", see build_layout.
+"""
+
+import json
+import os
+from typing import Dict, Tuple, Union
+
+from pygame import Surface, SurfaceType
+
+from .primitives import *
+from .combined import *
+from .ui_manager import Page, UIManager
+from .fonts import FONTS, FontRegistry
+from .global_settings import GlobalSetting
+
+
+__all__ = ["ELEMENT_TYPES", "load_layout", "build_layout"]
+
+
+# type name in layout file -> element class
+ELEMENT_TYPES = {
+    "Box": Box,
+    "TextBox": TextBox,
+    "TextButton": TextButton,
+    "ImageBox": ImageBox,
+    "ImageButton": ImageButton,
+    "Graph": Graph,
+}
+
+
+def _scale_rect(rect, sx: float, sy: float) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    x1, y1, x2, y2 = rect
+    return (round(x1 * sx), round(y1 * sy)), (round(x2 * sx), round(y2 * sy))
+
+
+def _build_element(name: str, elem_spec: Dict, screen: SurfaceType, ctx: Dict) -> Box:
+    elem_spec = dict(elem_spec)
+
+    type_name = elem_spec.pop("type", "Box")
+    try:
+        elem_type = ELEMENT_TYPES[type_name]
+    except KeyError:
+        raise ValueError(f"Unknown element type {type_name} of {name}") from None
+
+    p1, p2 = _scale_rect(elem_spec.pop("rect"), ctx["sx"], ctx["sy"])
+    kwargs = {"screen": screen}
+
+    for key in ("color", "text_color", "line_color"):
+        if key in elem_spec:
+            kwargs[key] = tuple(elem_spec.pop(key))
+
+    if "font" in elem_spec:
+        font_ref = elem_spec.pop("font")
+        if font_ref not in ctx["font_specs"]:
+            raise ValueError(f"Unknown font {font_ref} of {name}")
+
+        font_name, size = ctx["font_specs"][font_ref]
+        kwargs["font"] = ctx["fonts"].get(font_name, max(1, round(size * ctx["font_scale"])))
+
+    if "charset" in elem_spec:
+        charset_ref = elem_spec.pop("charset")
+        if charset_ref not in ctx["charsets"]:
+            raise ValueError(f"Unknown charset {charset_ref} of {name}")
+
+        kwargs["charset"] = ctx["charsets"][charset_ref]
+
+    args = (p1, p2)
+    if "text" in elem_spec:
+        args += (elem_spec.pop("text"),)
+
+    elif "image" in elem_spec:
+        # relative to layout file
+        args += (os.path.join(ctx["base_dir"], elem_spec.pop("image")),)
+
+    # anything left goes as-is, i.e. antialias
+    kwargs.update(elem_spec)
+    return elem_type(*args, **kwargs)
+
+
+def build_layout(
+    spec: Dict,
+    surface: SurfaceType = None,
+    fonts: FontRegistry = FONTS,
+    base_dir: Union[str, os.PathLike] = ".",
+) -> UIManager:
+    """Builds UIManager from already parsed layout spec.
+
+    Spec has either "elements" for single page named 'main', or "pages" of
+    {"background": color, "elements": {...}}. Elements with "static": true are
+    pre-rendered into page background, ones with "goto": page switch to that page.
+
+    Args:
+        spec: Layout dict.
+        surface: Surface to draw on and scale to. Defaults to global surface.
+        fonts: Registry to take fonts from.
+        base_dir: Directory image paths are relative to.
+
+    Raises:
+        ValueError: On unknown element type, font/charset reference or goto page.
+    """
+
+    surface = surface if surface else GlobalSetting.surface
+    assert surface is not None, "You must set global surface or provide surface argument."
+
+    ref_w, ref_h = spec.get("reference", surface.get_size())
+    width, height = surface.get_size()
+    sx, sy = width / ref_w, height / ref_h
+
+    ctx = {
+        "sx": sx,
+        "sy": sy,
+        # text has to fit both ways, so fonts follow the smaller axis
+        "font_scale": min(sx, sy),
+        "font_specs": spec.get("fonts", {}),
+        "charsets": spec.get("charsets", {}),
+        "fonts": fonts,
+        "base_dir": base_dir,
+    }
+
+    page_specs = spec.get("pages") or {"main": {"elements": spec["elements"]}}
+
+    ui = UIManager(surface)
+    links = {}
+
+    for page_name, page_spec in page_specs.items():
+        # same pixel format as screen, so blitting it is plain copy
+        background = Surface(surface.get_size(), 0, surface)
+
+        elements, static = {}, {}
+
+        for name, elem_spec in page_spec["elements"].items():
+            elem_spec = dict(elem_spec)
+            is_static = elem_spec.pop("static", False)
+
+            if "goto" in elem_spec:
+                links[name] = elem_spec.pop("goto")
+
+            if is_static:
+                static[name] = _build_element(name, elem_spec, background, ctx)
+            else:
+                elements[name] = _build_element(name, elem_spec, surface, ctx)
+
+        ui.add_page(
+            Page(
+                page_name,
+                elements,
+                static,
+                background,
+                tuple(page_spec.get("background", (0, 0, 0, 255))),
+            )
+        )
+
+    for name, page_name in links.items():
+        if page_name not in ui.pages:
+            raise ValueError(f"Unknown page {page_name} for {name}")
+
+        ui.link(name, page_name)
+
+    return ui
+
+
+def load_layout(
+    path: Union[str, os.PathLike],
+    surface: SurfaceType = None,
+    fonts: FontRegistry = FONTS,
+) -> UIManager:
+    """Loads layout json file and builds UIManager. See build_layout."""
+
+    with open(path, encoding="utf8") as fp:
+        spec = json.load(fp)
+
+    return build_layout(spec, surface, fonts, os.path.dirname(path))
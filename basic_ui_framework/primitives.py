@@ -5,17 +5,20 @@ Tried using typing.Protocol but seems like not much of use.
 Maybe will be needed when using protocol-based type checks when iterating UI elements.
 """
 
-from typing import Tuple, Callable, Protocol
+from collections import deque
+from typing import Iterable, Tuple, Protocol, Union
 from functools import partial
 
-from pygame import SurfaceType, Rect
+import pygame
+from pygame import Surface, SurfaceType, Rect
 from pygame.font import FontType
 
 from .global_settings import GlobalSetting
+from .fonts import FONTS, GlyphAtlas
+from .assets import ASSETS, AssetCache
 
 
-# TODO: add ImageBox
-__all__ = ["Box", "ButtonMixin", "TextBox", "ButtonType"]
+__all__ = ["Box", "ButtonMixin", "TextBox", "ImageBox", "Graph", "ButtonType"]
 
 
 class ButtonType(Protocol):
@@ -56,6 +59,9 @@ class Box:
         # defaults to white
         self.color = color
 
+        # whether look changed since last draw
+        self.dirty = True
+
         # bake render method
         self._render = partial(self.screen.fill, self.color, self.pos_full)
 
@@ -63,11 +69,13 @@ class Box:
         """Sets color."""
 
         self.color = r, g, b, a
+        self.dirty = True
         self._render = partial(self.screen.fill, self.color, self.pos_full)
 
     def draw(self) -> Rect:
         """Draws UI. Returns drawn area"""
 
+        self.dirty = False
         return self._render()
 
 
@@ -97,8 +105,14 @@ class TextBox(Box):
         font: FontType = None,
         antialias: bool = True,
         screen=None,
+        charset: str = None,
     ):
-        """Static Text Box Element"""
+        """Static Text Box Element
+
+        Args:
+            charset: Characters to pre-render in glyph atlas. Texts made only of these
+                are drawn by blitting glyphs, no rasterizing on text change.
+        """
 
         super().__init__(p1, p2, color, screen)
 
@@ -106,37 +120,262 @@ class TextBox(Box):
         self.text_color = text_color
         self.aa = antialias
         self.font = font if font else GlobalSetting.font
+        self.charset = charset
 
         assert (
             self.font is not None
         ), "You must set global font or provide font argument."
 
-        self._render_txt: Callable[[], SurfaceType]
-        self._render_txt = partial(
-            self.font.render, self.text, self.aa, self.text_color
-        )
+        # rendered text is kept until text or color changes
+        self._rendered: SurfaceType | None = None
+        self._atlas: GlyphAtlas | None = None
+        self._load_atlas()
+
+    def _load_atlas(self):
+        if self.charset:
+            self._atlas = FONTS.atlas(self.font, self.charset, self.text_color, self.aa)
 
     def set_text(self, text: str):
+        if text == self.text:
+            return
+
         self.text = text
-        self._render_txt = partial(
-            self.font.render, self.text, self.aa, self.text_color
-        )
+        self.dirty = True
+        self._rendered = None
 
     def set_text_color(self, r, g, b, a=255):
         """Sets color."""
 
         self.text_color = r, g, b, a
-        self._render_txt = partial(
-            self.font.render, self.text, self.aa, self.text_color
-        )
+        self.dirty = True
+        self._rendered = None
+        self._load_atlas()
 
     def draw(self):
+        self.dirty = False
         rect = self._render()
 
-        rendered: SurfaceType = self._render_txt()
+        atlas = self._atlas
+        if atlas is not None and atlas.covers(self.text):
+            new_x = ((self.width - atlas.width(self.text)) // 2) + self.x1
+            new_y = ((self.height - atlas.height) // 2) + self.y1
+
+            atlas.blit(self.screen, self.text, (new_x, new_y))
+            return rect
+
+        if self._rendered is None:
+            self._rendered = self.font.render(self.text, self.aa, self.text_color)
+
+        rendered: SurfaceType = self._rendered
         new_x = ((self.width - rendered.get_width()) // 2) + self.x1
         new_y = ((self.height - rendered.get_height()) // 2) + self.y1
 
-        self.screen.blit(self._render_txt(), (new_x, new_y))
+        self.screen.blit(rendered, (new_x, new_y))
 
         return rect
+
+
+class ImageBox(Box):
+    def __init__(
+        self,
+        p1,
+        p2,
+        image: str = None,
+        /,
+        color: Tuple[int, int, int, int] = (0, 0, 0, 255),
+        scale: bool = True,
+        screen=None,
+        assets: AssetCache = ASSETS,
+    ):
+        """Image Box Element, image centered in box over box color.
+
+        Args:
+            image: Image file path. None to show only box color until set_image.
+            scale: Whether to fit image into the box, keeping aspect ratio.
+            assets: Cache to take prepared images from.
+        """
+
+        super().__init__(p1, p2, color, screen)
+
+        self.scale = scale
+        self.assets = assets
+
+        self.image: str | None = None
+        self._surface: SurfaceType | None = None
+
+        # encoded data of in-memory image, kept to re-prepare it on color change
+        self._data: bytes | None = None
+
+        if image is not None:
+            self.set_image(image)
+
+    @property
+    def _fit_size(self):
+        return (self.width, self.height) if self.scale else None
+
+    def set_image(self, path: str):
+        """Sets image file to show."""
+
+        if path == self.image:
+            return
+
+        self._surface = self.assets.get(path, self.screen, self._fit_size, self.color)
+        self.image = path
+        self.dirty = True
+        self._data = None
+
+    def set_image_bytes(self, source: str, data: bytes = None):
+        """Sets in-memory image to show. See AssetCache.get_bytes."""
+
+        if source == self.image:
+            return
+
+        self._surface = self.assets.get_bytes(
+            source, data, self.screen, self._fit_size, self.color
+        )
+        self.image = source
+        self.dirty = True
+        self._data = data
+
+    def set_color(self, r, g, b, a=255):
+        """Sets color. Image is flattened over color, so it's re-fetched too."""
+
+        super().set_color(r, g, b, a)
+
+        if self.image is None:
+            return
+
+        image, self.image = self.image, None
+
+        if self._data is not None:
+            self.set_image_bytes(image, self._data)
+        else:
+            self.set_image(image)
+
+    def draw(self):
+        self.dirty = False
+        rect = self._render()
+
+        surface = self._surface
+        if surface is not None:
+            new_x = ((self.width - surface.get_width()) // 2) + self.x1
+            new_y = ((self.height - surface.get_height()) // 2) + self.y1
+            self.screen.blit(surface, (new_x, new_y))
+
+        return rect
+
+
+class Graph(Box):
+    def __init__(
+        self,
+        p1,
+        p2,
+        /,
+        color: Tuple[int, int, int, int] = (0, 0, 0, 255),
+        line_color: Tuple[int, int, int, int] = (0, 200, 255, 255),
+        value_range: Tuple[float, float] = (20, 35),
+        step: int = 2,
+        screen=None,
+    ):
+        """Scrolling sparkline. Newest value at right edge.
+
+        Graph is kept on its own surface. push() scrolls it left by step pixels
+        and draws only the new segment, so cost per sample doesn't depend on how
+        many values are shown. Whole graph is re-rendered only on color or range change.
+
+        Args:
+            line_color: Color of line.
+            value_range: Values mapped to bottom & top edge, ones outside are clamped.
+            step: Horizontal pixels per value.
+        """
+
+        super().__init__(p1, p2, color, screen)
+
+        self.line_color = line_color
+        self.value_range = tuple(value_range)
+        self.step = step
+
+        # values fitting in width, to re-render from. None is a gap.
+        self.values: deque = deque(maxlen=self.width // step + 1)
+
+        self._canvas = Surface((self.width, self.height), 0, self.screen)
+        self._canvas.fill(self.color)
+
+    @property
+    def capacity(self) -> int:
+        """Number of values visible at once."""
+
+        return self.values.maxlen
+
+    def _y(self, value: float) -> int:
+        low, high = self.value_range
+        ratio = (value - low) / (high - low) if high != low else 0.5
+        ratio = min(1.0, max(0.0, ratio))
+
+        return round((self.height - 1) * (1 - ratio))
+
+    def _segment(self, x: int, prev: Union[float, None], value: Union[float, None]):
+        """Draws value at column x, connected to prev one step left."""
+
+        if value is None:
+            return
+
+        if prev is None:
+            self._canvas.set_at((x, self._y(value)), self.line_color)
+        else:
+            pygame.draw.line(
+                self._canvas, self.line_color, (x - self.step, self._y(prev)), (x, self._y(value))
+            )
+
+    def _render_all(self):
+        self._canvas.fill(self.color)
+
+        right = self.width - 1
+        values = list(self.values)
+        prev = None
+
+        for idx, value in enumerate(values):
+            self._segment(right - (len(values) - 1 - idx) * self.step, prev, value)
+            prev = value
+
+        self.dirty = True
+
+    def push(self, value: Union[float, None]):
+        """Appends value. None leaves a gap."""
+
+        prev = self.values[-1] if self.values else None
+        self.values.append(value)
+
+        right = self.width - 1
+
+        self._canvas.scroll(-self.step, 0)
+        self._canvas.fill(self.color, (self.width - self.step, 0, self.step, self.height))
+        self._segment(right, prev, value)
+
+        self.dirty = True
+
+    def set_values(self, values: Iterable[Union[float, None]]):
+        """Replaces all values, i.e. with ones loaded from history."""
+
+        self.values.clear()
+        self.values.extend(values)
+        self._render_all()
+
+    def set_range(self, low: float, high: float):
+        if (low, high) == self.value_range:
+            return
+
+        self.value_range = low, high
+        self._render_all()
+
+    def set_color(self, r, g, b, a=255):
+        super().set_color(r, g, b, a)
+        self._render_all()
+
+    def set_line_color(self, r, g, b, a=255):
+        self.line_color = r, g, b, a
+        self._render_all()
+
+    def draw(self):
+        self.dirty = False
+        return self.screen.blit(self._canvas, (self.x1, self.y1))
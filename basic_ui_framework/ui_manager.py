@@ -1,31 +1,221 @@
 """
 Manages UI events
+
+UI is split into pages, only one shown at a time. Elements that never change
+are drawn once into page's background surface, so showing a page is one blit
+plus drawing its dynamic elements. After that only elements marked dirty
+(text/color changed) are redrawn.
 """
 
-from typing import Tuple, Dict
+from typing import Awaitable, Callable, List, Tuple, Dict
 
 import trio
 from loguru import logger
+from pygame import SurfaceType, Rect
 
 from .primitives import *
 from .combined import *
+from .global_settings import GlobalSetting
+
+
+__all__ = ["Page", "UIManager"]
+
+
+class Page:
+    def __init__(
+        self,
+        name: str,
+        elements: Dict[str, Box],
+        static: Dict[str, Box] = None,
+        background: SurfaceType = None,
+        color: Tuple[int, int, int, int] = (0, 0, 0, 255),
+    ):
+        """Single screen of UI.
+
+        Args:
+            name: Page name
+            elements: Dynamic elements, drawn on screen in given order.
+            static: Elements drawn on background once. Must be created with background as screen.
+            background: Surface for static elements, same size as screen.
+                If None, page is just filled with color on show.
+            color: Background fill color.
+        """
+
+        self.name = name
+        self.elements = elements
+        self.static = static if static else {}
+        self.background = background
+        self.color = color
+
+        # background needs redrawing - first show or static element changed
+        self._background_dirty = True
+
+        self.all_uis: Dict[str, Box] = {**self.static, **self.elements}
+
+        self._draw_list: List[Box]
+        self._hit_table: List[Tuple[int, int, int, int, str, ButtonMixin]]
+        self.compile()
+
+    def compile(self):
+        """Flattens elements into draw list and hit-test table.
+        Elements don't move after creation, so this is done once."""
+
+        self._draw_list = list(self.elements.values())
+        self._hit_table = [
+            (elem.x1, elem.y1, elem.x2, elem.y2, name, elem)
+            for name, elem in self.all_uis.items()
+            if isinstance(elem, ButtonMixin)
+        ]
+
+    def hit(self, coordinate: Tuple[int, int]) -> Tuple[str, ButtonMixin] | Tuple[None, None]:
+        """Returns (name, element) of button at coordinate."""
+
+        x, y = coordinate
+
+        for x1, y1, x2, y2, name, ui_element in self._hit_table:
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                return name, ui_element
+
+        return None, None
+
+    def add(self, name: str, element: Box, static: bool = False):
+        """Adds element built at runtime, i.e. one per configured room.
+        Static element must be created with page's background as screen."""
+
+        if static:
+            self.static[name] = element
+            self._background_dirty = True
+        else:
+            self.elements[name] = element
+
+        self.all_uis[name] = element
+        self.compile()
+
+    def remove(self, name: str) -> Box:
+        """Removes element, returns it."""
+
+        element = self.all_uis.pop(name)
+
+        if self.static.pop(name, None) is not None:
+            self._background_dirty = True
+        else:
+            del self.elements[name]
+
+        self.compile()
+        return element
+
+    def _render_background(self):
+        self.background.fill(self.color)
+
+        for ui_elem in self.static.values():
+            ui_elem.draw()
+
+        self._background_dirty = False
+
+    def draw_all(self, screen: SurfaceType) -> List[Rect]:
+        """Draws whole page."""
+
+        if self.background is None:
+            screen.fill(self.color)
+        else:
+            if self._background_dirty or any(elem.dirty for elem in self.static.values()):
+                self._render_background()
+
+            screen.blit(self.background, (0, 0))
+
+        return [screen.get_rect()] + [ui_elem.draw() for ui_elem in self._draw_list]
 
+    def draw_dirty(self, screen: SurfaceType) -> List[Rect]:
+        """Draws only elements changed since last draw. Returns drawn areas."""
 
-__all__ = ["UIManager"]
+        if any(elem.dirty for elem in self.static.values()):
+            return self.draw_all(screen)
+
+        return [ui_elem.draw() for ui_elem in self._draw_list if ui_elem.dirty]
 
 
 class UIManager:
-    def __init__(self, **ui_elements: Box):
+    def __init__(self, screen: SurfaceType = None, **ui_elements: Box):
+        """Holds pages and routes clicks to shown one.
+
+        Elements given as keyword arguments become page named 'main'.
+        """
+
+        self.screen = screen if screen else GlobalSetting.surface
+
+        self.pages: Dict[str, Page] = {}
+        self.all_uis: Dict[str, Box] = {}
+        self.current: Page | None = None
+
+        # next draw must redraw whole page
+        self._switched = True
+
+        # called after page switch by button link, i.e. to draw & flush
+        self.on_page_switch: Callable[[Page], Awaitable] | None = None
+
+        if ui_elements:
+            self.add_page(Page("main", ui_elements))
+
+    def add_page(self, page: Page):
+        """Adds page. First added page is shown first."""
+
+        duplicates = self.all_uis.keys() & page.all_uis.keys()
+        assert not duplicates, f"Element names must be unique across pages: {duplicates}"
+
+        self.pages[page.name] = page
+        self.all_uis.update(page.all_uis)
+
+        if self.current is None:
+            self.current = page
+
+    def add_element(self, page_name: str, name: str, element: Box, static: bool = False):
+        """Adds element to page. Name must be unique across pages, same as layout's."""
+
+        assert name not in self.all_uis, f"Element names must be unique across pages: {name}"
+
+        self.pages[page_name].add(name, element, static)
+        self.all_uis[name] = element
+
+        if self.pages[page_name] is self.current:
+            self._switched = True
 
-        self.all_uis = ui_elements
-        self.button_type: Dict[str, Box | ButtonMixin] = {}
-        self.static_type: Dict[str, Box] = {}
+    def remove_element(self, name: str) -> Box:
+        """Removes element from whichever page has it."""
 
-        for name, ui_elem in ui_elements.items():
-            if isinstance(ui_elem, ButtonMixin):
-                self.button_type[name] = ui_elem
+        for page in self.pages.values():
+            if name in page.all_uis:
+                if page is self.current:
+                    self._switched = True
+
+                del self.all_uis[name]
+                return page.remove(name)
+
+        raise KeyError(name)
+
+    def switch_page(self, name: str):
+        """Shows page on next draw."""
+
+        page = self.pages[name]
+
+        if page is not self.current:
+            logger.debug("Page {} -> {}", self.current.name, name)
+            self.current = page
+            self._switched = True
+
+    def link(self, button_name: str, page_name: str):
+        """Makes button switch to page on click."""
+
+        assert page_name in self.pages, f"No page named {page_name}"
+
+        async def goto(*_):
+            self.switch_page(page_name)
+
+            if self.on_page_switch is not None:
+                await self.on_page_switch(self.current)
             else:
-                self.static_type[name] = ui_elem
+                self.draw()
+
+        self.all_uis[button_name].on_click = goto
 
     def __getitem__(self, key) -> Box | TextBox | TextButton:
         return self.all_uis[key]
@@ -43,17 +233,28 @@ class UIManager:
         Returns True if there was match, otherwise False.
         """
 
-        for name, ui_element in self.button_type.items():
-            if coordinate in ui_element:
-                logger.debug("Element {} click at {}", name, coordinate)
-                await ui_element.on_click(ui_element, coordinate)
-                return True
+        name, ui_element = self.current.hit(coordinate)
 
-        return False
+        if ui_element is None:
+            return False
 
-    def draw_all(self):
-        for ui_elem in self.values():
-            ui_elem.draw()
+        logger.debug("Element {} click at {}", name, coordinate)
+        await ui_element.on_click(ui_element, coordinate)
+        return True
+
+    def draw_all(self) -> List[Rect]:
+        """Draws whole current page."""
+
+        self._switched = False
+        return self.current.draw_all(self.screen)
+
+    def draw(self) -> List[Rect]:
+        """Draws whole page if just switched, otherwise only dirty elements."""
+
+        if self._switched:
+            return self.draw_all()
+
+        return self.current.draw_dirty(self.screen)
 
     async def poll_touch(self, touch_driver, interval=0.1):
         """Due to lack of trio support in evdev, using loop temporarily."""
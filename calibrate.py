@@ -0,0 +1,69 @@
+"""
+3-point touch calibration.
+
+Shows crosshair at 3 spots, reads raw touch on each and writes resulting
+affine calibration to touch_driver/lcd_data.json.
+"""
+
+from argparse import ArgumentParser
+
+import pygame
+import trio
+
+from framebuffer_driver import *
+from touch_driver import *
+
+
+# relative target positions - spread out and not on a line
+TARGETS = ((0.1, 0.1), (0.9, 0.5), (0.3, 0.9))
+
+
+def draw_target(screen, pos):
+    screen.fill((0, 0, 0))
+    x, y = pos
+    pygame.draw.line(screen, (255, 255, 255), (x - 15, y), (x + 15, y), 2)
+    pygame.draw.line(screen, (255, 255, 255), (x, y - 15), (x, y + 15), 2)
+    pygame.draw.circle(screen, (255, 0, 0), pos, 5)
+
+
+async def main(args):
+    framebuffer_init(args.fb)
+
+    fb_driver = FramebufferDriver()
+    input_driver = TouchDriver(args.display, args.device)
+
+    width, height = fb_driver.width, fb_driver.height
+    screen_points = [(int(width * x), int(height * y)) for x, y in TARGETS]
+    raw_points = []
+
+    for pos in screen_points:
+        draw_target(fb_driver.screen, pos)
+        await fb_driver.update()
+
+        while (raw := input_driver.receive_raw_touch()) is None:
+            await trio.sleep(0.05)
+
+        print(f"Target {pos} -> raw {raw}")
+        raw_points.append(raw)
+
+        # give a moment to lift finger
+        await trio.sleep(0.5)
+
+    calibration = Calibration.from_points((width, height), raw_points, screen_points)
+    print(calibration)
+
+    save_lcd_entry(args.display, calibration.to_entry())
+    print(f"Saved to {LCD_DATA_PATH}")
+
+    fb_driver.blank()
+    await fb_driver.update()
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+
+    parser.add_argument("display", type=str, help="Display type in lcd_data.json")
+    parser.add_argument("-d", "--device", type=str, default="event0", help="Touch device name")
+    parser.add_argument("-f", "--fb", type=str, default=None, help="Framebuffer device")
+
+    trio.run(main, parser.parse_args())
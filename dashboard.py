@@ -0,0 +1,295 @@
+"""
+Multi-room dashboard.
+
+One panel watching many rooms: RoomPool polls every room's ACManager each round
+with at most max_parallel requests in flight, so 30+ rooms neither flood the
+network nor starve touch handling on 1B+ - trio runs touch & redraws in between.
+Dashboard shows a tile per room and only touches tiles whose manager version
+moved since last shown, so a round where nothing changed draws nothing.
+
+Rooms file maps room name to its controller login, missing keys fall back to
+the ones given on command line:
+
+    {
+      "Room 101": {"id": "club101", "pw": "..."},
+      "Room 102": {"ip": "10.0.0.12", "id": "club102", "pw": "..."}
+    }
+"""
+
+import json
+import math
+import os
+from typing import Awaitable, Callable, Dict, List, Set, Tuple, Union
+
+import trio
+from loguru import logger
+from pygame import Rect
+
+from basic_ui_framework import FONTS, TextButton, UIManager
+from api import ACManager
+
+
+__all__ = ["RoomPool", "RoomTile", "Dashboard", "load_rooms"]
+
+
+# tile colors by room state
+ON_COLOR = (0, 110, 0, 255)
+OFF_COLOR = (60, 60, 60, 255)
+FAILED_COLOR = (140, 0, 0, 255)
+
+DETAIL_CHARSET = "0123456789-/ °"
+
+
+def load_rooms(path: Union[str, os.PathLike]) -> Dict[str, Dict[str, str]]:
+    """Loads rooms file, room name -> {"ip", "id", "pw"} with any of them left out.
+
+    Raises:
+        ValueError: On malformed file.
+    """
+
+    with open(path, encoding="utf8") as fp:
+        rooms = json.load(fp)
+
+    if not isinstance(rooms, dict) or not rooms:
+        raise ValueError(f"{path} must map room names to logins")
+
+    for name, login in rooms.items():
+        if not isinstance(login, dict) or login.keys() - {"ip", "id", "pw"}:
+            raise ValueError(f"Room {name} must only have ip, id and pw")
+
+    return rooms
+
+
+class RoomPool:
+    def __init__(
+        self,
+        rooms: Dict[str, ACManager],
+        max_parallel: int = 4,
+        interval_sec: float = 60,
+    ):
+        """ACManagers of many rooms, polled together.
+
+        Args:
+            rooms: Room name -> ACManager. Managers are logged in on first poll.
+            max_parallel: Requests in flight at once across all rooms.
+            interval_sec: Seconds between end of one round and start of next.
+        """
+
+        self.rooms = rooms
+        self.interval_sec = interval_sec
+
+        self._limiter = trio.CapacityLimiter(max_parallel)
+
+        # rooms to log in again on next poll - never logged in, or last poll failed
+        self._logged_out: Set[str] = set(rooms)
+
+        # rooms whose last poll failed
+        self.failed: Set[str] = set()
+
+        # stats
+        self.rounds = 0
+        self.last_round_sec = 0.0
+
+    async def _poll(self, name: str, manager: ACManager):
+        async with self._limiter:
+            try:
+                if name in self._logged_out:
+                    await manager.login()
+                else:
+                    await manager.update()
+
+            except Exception as err:
+                # one unreachable room shouldn't take the rest down. Session could've
+                # expired too, so it's logged in again next time.
+                if name not in self.failed:
+                    logger.warning("Room {} failed - {}: {}", name, type(err).__name__, err)
+
+                self.failed.add(name)
+                self._logged_out.add(name)
+
+            else:
+                self.failed.discard(name)
+                self._logged_out.discard(name)
+
+    async def poll_all(self):
+        """Updates every room once, logging in ones that aren't."""
+
+        start = trio.current_time()
+
+        async with trio.open_nursery() as nursery:
+            for name, manager in self.rooms.items():
+                nursery.start_soon(self._poll, name, manager)
+
+        self.rounds += 1
+        self.last_round_sec = trio.current_time() - start
+
+        logger.debug(
+            "Polled {} rooms in {:.2f} s, {} failed",
+            len(self.rooms), self.last_round_sec, len(self.failed),
+        )
+
+    async def run(self, on_round: Callable[[], Awaitable] = None):
+        """Polls all rooms every interval, awaiting on_round after each round.
+        Run inside a nursery."""
+
+        while True:
+            await self.poll_all()
+
+            if on_round is not None:
+                await on_round()
+
+            await trio.sleep(self.interval_sec)
+
+
+class RoomTile(TextButton):
+    def __init__(
+        self,
+        p1,
+        p2,
+        title: str,
+        /,
+        color: Tuple[int, int, int, int] = OFF_COLOR,
+        text_color: Tuple[int, int, int, int] = (255, 255, 255, 255),
+        font=None,
+        detail_font=None,
+        screen=None,
+    ):
+        """Button with room name on top and temps below.
+
+        Temps are drawn from glyph atlas, so updating them doesn't rasterize text.
+        """
+
+        super().__init__(p1, p2, title, text_color=text_color, color=color, font=font, screen=screen)
+
+        self.detail = "--"
+        self.detail_font = detail_font if detail_font else self.font
+        self._detail_atlas = FONTS.atlas(self.detail_font, DETAIL_CHARSET, self.text_color, self.aa)
+
+    def set_detail(self, detail: str):
+        if detail == self.detail:
+            return
+
+        self.detail = detail
+        self.dirty = True
+
+    def draw(self) -> Rect:
+        self.dirty = False
+        rect = self._render()
+
+        if self._rendered is None:
+            self._rendered = self.font.render(self.text, self.aa, self.text_color)
+
+        # long names are cut at tile edges
+        title = self._rendered
+        width = min(title.get_width(), self.width)
+        x = self.x1 + (self.width - width) // 2
+        y = self.y1 + self.height // 2 - title.get_height()
+        self.screen.blit(title, (x, y), (0, 0, width, title.get_height()))
+
+        atlas, detail = self._detail_atlas, self.detail
+        y = self.y1 + self.height // 2
+
+        if atlas.covers(detail):
+            atlas.blit(self.screen, detail, (self.x1 + (self.width - atlas.width(detail)) // 2, y))
+        else:
+            rendered = self.detail_font.render(detail, self.aa, self.text_color)
+            self.screen.blit(rendered, (self.x1 + (self.width - rendered.get_width()) // 2, y))
+
+        return rect
+
+
+def grid(
+    count: int, size: Tuple[int, int], margin: int = 4
+) -> List[Tuple[Tuple[int, int], Tuple[int, int]]]:
+    """Splits area of size into count cells, as square as area's aspect allows.
+    Returns (p1, p2) of each cell, row by row."""
+
+    width, height = size
+    cols = max(1, math.ceil(math.sqrt(count * width / height)))
+    rows = max(1, math.ceil(count / cols))
+
+    cell_w, cell_h = width / cols, height / rows
+
+    return [
+        (
+            (round(col * cell_w) + margin, round(row * cell_h) + margin),
+            (round((col + 1) * cell_w) - margin, round((row + 1) * cell_h) - margin),
+        )
+        for row, col in (divmod(idx, cols) for idx in range(count))
+    ]
+
+
+class Dashboard:
+    def __init__(
+        self,
+        ui: UIManager,
+        pool: RoomPool,
+        on_open: Callable[[str], Awaitable],
+        page_name: str = "rooms",
+    ):
+        """Tiles of pool's rooms on given page, filling whole screen.
+
+        Args:
+            ui: UIManager having the page.
+            pool: Rooms to show.
+            on_open: Awaited with room name when its tile is tapped.
+            page_name: Page to put tiles on.
+        """
+
+        self.ui = ui
+        self.pool = pool
+        self.page_name = page_name
+
+        rects = grid(len(pool.rooms), ui.screen.get_size())
+        tile_h = rects[0][1][1] - rects[0][0][1]
+
+        title_font = FONTS.get(None, max(8, round(tile_h * 0.3)))
+        detail_font = FONTS.get(None, max(8, round(tile_h * 0.36)))
+
+        self.tiles: Dict[str, RoomTile] = {}
+
+        for name, (p1, p2) in zip(pool.rooms, rects):
+            tile = RoomTile(p1, p2, name, font=title_font, detail_font=detail_font, screen=ui.screen)
+            tile.on_click = self._open_action(name, on_open)
+
+            ui.add_element(page_name, f"Tile {name}", tile)
+            self.tiles[name] = tile
+
+        # room -> (version, failed) last shown on its tile
+        self._shown: Dict[str, Tuple[int, bool]] = {}
+
+    @staticmethod
+    def _open_action(name: str, on_open: Callable[[str], Awaitable]):
+        async def action(*_):
+            await on_open(name)
+
+        return action
+
+    def refresh(self) -> bool:
+        """Updates tiles of rooms changed since last refresh. Returns whether any did."""
+
+        changed = False
+
+        for name, manager in self.pool.rooms.items():
+            shown = manager.version, name in self.pool.failed
+
+            if self._shown.get(name) == shown:
+                continue
+
+            self._shown[name] = shown
+            changed = True
+
+            tile = self.tiles[name]
+
+            if shown[1]:
+                tile.set_color(*FAILED_COLOR)
+
+            else:
+                tile.set_color(*(ON_COLOR if manager.is_powered else OFF_COLOR))
+
+            if manager.state is None:
+                tile.set_detail("--")
+            else:
+                tile.set_detail(f"{manager.state.current_temp}° / {manager.target_temp}°")
+
+        return changed
@@ -7,4 +7,5 @@ Uses trio to await for extra stability & safety.
 """
 
 from .driver import *
+from .backends import *
 from .global_settings import framebuffer_init
@@ -0,0 +1,148 @@
+"""
+Where flushed frames go.
+
+DeviceBackend writes to actual /dev/fbN, MemoryBackend keeps frames in memory
+(optionally mirrored to a plain file) so the whole app runs without a panel.
+"""
+
+import os
+import time
+from collections import deque
+from typing import Callable, Deque, Tuple, Union
+
+from .fb_info import FBInfo, get_fb_info, read_var_screeninfo, pan_display
+
+
+__all__ = ["DeviceBackend", "MemoryBackend"]
+
+
+class DeviceBackend:
+    def __init__(self, fb: Union[str, os.PathLike]):
+        """Framebuffer device. File is opened on first write and left open.
+
+        Args:
+            fb: Framebuffer path i.e. /dev/fb1
+        """
+
+        self.fb = os.fspath(fb)
+        self.info: FBInfo = get_fb_info(self.fb)
+
+        self._fd: Union[int, None] = None
+        self._var_raw = b""
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.fb})"
+
+    @property
+    def fd(self) -> int:
+        # leaving file open is not safe usually, but for framebuffer why not.
+        if self._fd is None:
+            self._fd = os.open(self.fb, os.O_RDWR)
+
+        return self._fd
+
+    @property
+    def can_pan(self) -> bool:
+        """Whether 2 pages fit in virtual resolution and driver can pan."""
+
+        if self.info.ypanstep == 0 or self.info.yres_virtual < self.info.height * 2:
+            return False
+
+        if not self._var_raw:
+            try:
+                self._var_raw = read_var_screeninfo(self.fd)
+            except OSError:
+                return False
+
+        return True
+
+    def write(self, data, offset: int = 0):
+        """Writes data at given byte offset. Blocking."""
+
+        os.pwrite(self.fd, data, offset)
+
+    def pan(self, yoffset: int):
+        """Shows page starting at given line. Blocking."""
+
+        pan_display(self.fd, self._var_raw, yoffset)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class MemoryBackend:
+    def __init__(
+        self,
+        width: int = 480,
+        height: int = 320,
+        bits: int = 16,
+        path: Union[str, os.PathLike, None] = None,
+        max_frames: int = 64,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """In-memory framebuffer recording every flush.
+
+        Args:
+            width: Screen width
+            height: Screen height
+            bits: Bit depth. 16 is RGB565, else 8 bit per channel.
+            path: If given, memory is mirrored to this file like real framebuffer.
+            max_frames: Number of last frames to keep in `frames`.
+            clock: Timestamp source for recorded frames.
+        """
+
+        bpp = (bits + 7) // 8
+
+        if bits == 16:
+            bitfields = (11, 5), (5, 6), (0, 5), (0, 0)
+        elif bits == 32:
+            bitfields = (16, 8), (8, 8), (0, 8), (24, 8)
+        else:
+            bitfields = (16, 8), (8, 8), (0, 8), (0, 0)
+
+        self.info = FBInfo(width, height, bits, width * bpp, width, height, 0, 0, *bitfields)
+
+        self.path = os.fspath(path) if path else None
+        self.clock = clock
+
+        self.memory = bytearray(self.info.line_length * height)
+
+        # (timestamp, full frame) of last max_frames flushes
+        self.frames: Deque[Tuple[float, bytes]] = deque(maxlen=max_frames)
+
+        self.flush_count = 0
+        self.bytes_written = 0
+
+        if self.path:
+            with open(self.path, "wb") as fp:
+                fp.write(self.memory)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.info.width}x{self.info.height}x{self.info.bits})"
+
+    @property
+    def can_pan(self) -> bool:
+        return False
+
+    def write(self, data, offset: int = 0):
+        """Writes data at given byte offset & records resulting frame."""
+
+        data = memoryview(data).cast("B")
+        self.memory[offset:offset + len(data)] = data
+
+        self.flush_count += 1
+        self.bytes_written += len(data)
+        self.frames.append((self.clock(), bytes(self.memory)))
+
+        if self.path:
+            with open(self.path, "r+b") as fp:
+                fp.seek(offset)
+                fp.write(data)
+
+    def pan(self, yoffset: int):
+        raise OSError("MemoryBackend doesn't support panning")
+
+    def close(self):
+        pass
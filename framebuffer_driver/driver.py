@@ -10,75 +10,219 @@ Following is referenced from:
 https://stackoverflow.com/a/54986161/10909029
 """
 
-import subprocess
-from typing import Tuple
+import time
+import logging
+from typing import Union
 
 import pygame
 import trio
 
-from .global_settings import GlobalSetting
+from .fb_info import FBInfo
+from .backends import DeviceBackend, MemoryBackend
+from .global_settings import GlobalSetting, get_splash
 
 
-__all__ = ["FramebufferDriver"]
-# __all__ = [k for k, v in dir() if not k.startswith("_")]
-
+# stdlib logging as it's loaded anyway, loguru comes after splash. log_config forwards it.
+logger = logging.getLogger(__name__)
 
-def get_fb_info(fb="/dev/fb0") -> Tuple[int, int, int]:
-    """Gets frame buffer info. Returns (width, height, bit_depth)"""
 
-    cmd = f"fbset -fb {fb} | grep geometry"
-    returned = subprocess.run(cmd, capture_output=True, shell=True)
-    assert returned.returncode == 0, f"Return code from command '{cmd}' was {returned.returncode}"
-
-    # result format is '   geometry 480 320 480 320 16'
-    x, y, _, _, bits = map(int, returned.stdout.decode().strip().split(" ")[1:])
-    return x, y, bits
+__all__ = ["FramebufferDriver"]
+# __all__ = [k for k, v in dir() if not k.startswith("_")]
 
 
 class FramebufferDriver:
-    def __init__(self, fb: str = None):
+    def __init__(
+        self,
+        fb: str = None,
+        double_buffer=False,
+        backend: Union[DeviceBackend, MemoryBackend] = None,
+    ):
         """Initializes a new pygame screen using the Frame Buffer.
 
         Args:
             fb: Framebuffer name. Defaults to /dev/fb0 if None.
+            double_buffer: Render on back surface and flush snapshot of it, so panel
+                never scans half-drawn frame. Flips page via FBIOPAN_DISPLAY
+                if virtual resolution has room for 2 pages, else writes changed rows only.
+            backend: Where frames go. Defaults to one set by framebuffer_init(),
+                or device at `fb` if there's none.
 
         Raises:
             NoUsableDriverError: If there's no usable framebuffer drivers
         """
 
-        if fb is None:
-            fb = GlobalSetting.fb
+        if backend is None:
+            if fb is None and GlobalSetting.backend is not None:
+                backend = GlobalSetting.backend
+            else:
+                backend = DeviceBackend(fb if fb is not None else GlobalSetting.fb)
 
-        self.fb: trio.Path = trio.Path(fb)
-        print("Using", self.fb)
-        # leaving file open is not safe usually, but for framebuffer why not.
+        self.backend = backend
+        logger.debug("Using %s", self.backend)
 
         # Safe to call init multiple time anyway!
         pygame.init()
 
-        self.width, self.height, self.depth = get_fb_info(fb)
-        self.screen = pygame.Surface((self.width, self.height), depth=self.depth)
+        self.info: FBInfo = backend.info
+        self.width, self.height, self.depth = self.info.width, self.info.height, self.info.bits
+
+        # Some panels pad each line - make backing surface as wide as line length,
+        # then draw on visible part only. That way buffer is written as-is.
+        bpp = self.info.bytes_per_pixel
+        self.line_length = max(self.info.line_length, self.width * bpp)
+        stride_px = self.line_length // bpp
+
+        self._surface = pygame.Surface(
+            (stride_px, self.height), 0, self.depth, self.info.masks
+        )
+
+        if stride_px == self.width:
+            self.screen = self._surface
+        else:
+            self.screen = self._surface.subsurface((0, 0, self.width, self.height))
+
+        # if pygame aligned pitch differently after all, rows need copying one by one.
+        self._row_copy = self._surface.get_pitch() != self.line_length
+
+        # flush stats
+        self.frames_flushed = 0
+        self.bytes_flushed = 0
+        self.last_flush_sec = 0.0
+
+        # double buffer states
+        self.double_buffer = double_buffer
+        self._page_flip = double_buffer and backend.can_pan
+        self._page = self.info.yoffset // self.height if self._page_flip else 0
+        self._front: Union[bytes, None] = None
+        self._pending: Union[bytes, None] = None
+        self._flush_lock = trio.Lock()
+
+        if double_buffer:
+            logger.debug("Double buffering via %s", "page flip" if self._page_flip else "row diff")
+
+    @property
+    def pending_frames(self) -> int:
+        """Number of snapshots waiting for flush, 0 or 1 as they're coalesced."""
+
+        return int(self._pending is not None)
+
+    def _frame_bytes(self):
+        """Returns buffer matching framebuffer memory layout."""
+
+        if not self._row_copy:
+            return self._surface.get_buffer()
+
+        pitch = self._surface.get_pitch()
+        row = self.width * self.info.bytes_per_pixel
+        padding = bytes(self.line_length - row)
+        raw = self._surface.get_buffer().raw
+
+        return b"".join(
+            raw[offset:offset + row] + padding
+            for offset in range(0, pitch * self.height, pitch)
+        )
+
+    def _write(self, data, offset: int = 0):
+        """Writes to backend & counts. Blocking."""
+
+        start = time.perf_counter()
+        self.backend.write(data, offset)
+
+        self.last_flush_sec = time.perf_counter() - start
+        self.frames_flushed += 1
+        self.bytes_flushed += memoryview(data).nbytes
+
+    def _write_frame(self):
+        """Writes current surface. Blocking.
+
+        Buffer proxy locks surface until it's freed, so it's taken and dropped here -
+        passing it to worker thread keeps it alive in thread cache after the write."""
+
+        self._write(self._frame_bytes())
+
+    def _flip(self, frame: bytes):
+        """Writes snapshot to framebuffer. Blocking, meant to run in worker thread."""
+
+        page_size = self.line_length * self.height
+
+        if self._page_flip:
+            back = 1 - self._page
+            self._write(frame, back * page_size)
+            self.backend.pan(back * self.height)
+            self._page = back
+            return
+
+        # no room for 2nd page - only write rows that changed since last flush.
+        front = self._front
+        self._front = frame
+
+        if front is None:
+            self._write(frame)
+            return
+
+        if front == frame:
+            return
+
+        ll = self.line_length
+        top, bottom = 0, self.height - 1
+
+        while front[top * ll:(top + 1) * ll] == frame[top * ll:(top + 1) * ll]:
+            top += 1
+
+        while front[bottom * ll:(bottom + 1) * ll] == frame[bottom * ll:(bottom + 1) * ll]:
+            bottom -= 1
+
+        self._write(frame[top * ll:(bottom + 1) * ll], top * ll)
 
     def update_sync(self):
         """Synchronous framebuffer."""
 
-        with open(self.fb, "wb") as fp:
-            # noinspection PyTypeChecker
-            fp.write(self.screen.get_buffer())
+        if self.double_buffer:
+            self._flip(bytes(self._frame_bytes()))
+            return
+
+        self._write_frame()
 
     async def update(self):
         """Update framebuffer."""
 
-        # there's option to set pygame in 16bit, might need to check that out
-        await self.fb.write_bytes(self.screen.get_buffer())
+        if not self.double_buffer:
+            # there's option to set pygame in 16bit, might need to check that out
+            await trio.to_thread.run_sync(self._write_frame)
+            return
+
+        self.snapshot()
+        await self.flush_snapshot()
+
+    def snapshot(self):
+        """Copies back surface for next flush_snapshot, so rendering next frame can
+        continue during flush. Newer snapshot replaces one still waiting for flush.
+        Double buffering only."""
+
+        self._pending = bytes(self._frame_bytes())
+
+    async def flush_snapshot(self):
+        """Writes latest snapshot to framebuffer, if not already written."""
+
+        async with self._flush_lock:
+            frame, self._pending = self._pending, None
+
+            # already flushed by caller that got lock earlier
+            if frame is None:
+                return
+
+            await trio.to_thread.run_sync(self._flip, frame)
 
     def __del__(self):
         """Destructor to make sure pygame shuts down, etc."""
 
+        if getattr(self, "backend", None) is not None:
+            self.backend.close()
+
     def show_splash(self):
         """Shows splash image"""
 
-        self.screen.blit(GlobalSetting.test_img, (0, 0))
+        self.screen.blit(get_splash(), (0, 0))
 
     def blank(self):
         self.screen.fill((0, 0, 0))
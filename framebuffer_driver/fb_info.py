@@ -0,0 +1,201 @@
+"""
+Framebuffer geometry query.
+
+Asks kernel directly via FBIOGET_VSCREENINFO / FBIOGET_FSCREENINFO ioctl,
+falling back to sysfs then fbset when ioctl isn't available.
+
+Struct layouts are from linux/fb.h.
+"""
+
+import fcntl
+import os
+import re
+import pathlib
+import struct
+import subprocess
+from typing import NamedTuple, Tuple, Union
+
+
+__all__ = ["FBInfo", "get_fb_info", "read_var_screeninfo", "pan_display"]
+
+
+FBIOGET_VSCREENINFO = 0x4600
+FBIOGET_FSCREENINFO = 0x4602
+FBIOPAN_DISPLAY = 0x4606
+
+# struct fb_var_screeninfo - 40 x __u32.
+# xres, yres, xres_virtual, yres_virtual, xoffset, yoffset, bits_per_pixel, grayscale,
+# red, green, blue, transp bitfields (offset, length, msb_right each), then 20 we don't use.
+_VAR_FMT = "=8I12I20I"
+
+# byte offset of yoffset in fb_var_screeninfo
+_VAR_YOFFSET = 5 * 4
+
+# struct fb_fix_screeninfo - contains unsigned long, so native alignment is needed.
+# id, smem_start, smem_len, type, type_aux, visual, xpanstep, ypanstep, ywrapstep,
+# line_length, mmio_start, mmio_len, accel, capabilities, reserved[2]
+_FIX_FMT = "@16sL4I3HIL2IH2H"
+
+# resolution in sysfs video mode, i.e. 'U:480x320p-0'
+_MODE_SIZE = re.compile(r"(\d+)x(\d+)")
+
+# Bitfield is (offset, length) - msb_right is always 0 on anything we care.
+Bitfield = Tuple[int, int]
+
+
+class FBInfo(NamedTuple):
+    width: int
+    height: int
+    bits: int
+    line_length: int
+    xres_virtual: int
+    yres_virtual: int
+    xoffset: int
+    yoffset: int
+    red: Bitfield = (0, 0)
+    green: Bitfield = (0, 0)
+    blue: Bitfield = (0, 0)
+    transp: Bitfield = (0, 0)
+    ypanstep: int = 0
+
+    @property
+    def bytes_per_pixel(self) -> int:
+        return (self.bits + 7) // 8
+
+    @property
+    def masks(self) -> Union[Tuple[int, int, int, int], None]:
+        """Pygame compatible RGBA masks, None if bitfields are unknown."""
+
+        if not (self.red[1] and self.green[1] and self.blue[1]):
+            return None
+
+        return tuple(
+            ((1 << length) - 1) << offset
+            for offset, length in (self.red, self.green, self.blue, self.transp)
+        )
+
+
+def _ioctl_info(fb: str) -> FBInfo:
+    """Queries framebuffer via ioctl. Raises OSError on failure."""
+
+    fd = os.open(fb, os.O_RDONLY)
+
+    try:
+        # pass immutable bytes, so fcntl copies it into its own 1KiB buffer.
+        # Protects us from kernel struct being larger than what we calculated.
+        var = fcntl.ioctl(fd, FBIOGET_VSCREENINFO, bytes(struct.calcsize(_VAR_FMT)))
+        fix = fcntl.ioctl(fd, FBIOGET_FSCREENINFO, bytes(struct.calcsize(_FIX_FMT) + 8))
+    finally:
+        os.close(fd)
+
+    v = struct.unpack_from(_VAR_FMT, var)
+    f = struct.unpack_from(_FIX_FMT, fix)
+
+    return FBInfo(
+        width=v[0],
+        height=v[1],
+        bits=v[6],
+        line_length=f[9],
+        xres_virtual=v[2],
+        yres_virtual=v[3],
+        xoffset=v[4],
+        yoffset=v[5],
+        red=(v[8], v[9]),
+        green=(v[11], v[12]),
+        blue=(v[14], v[15]),
+        transp=(v[17], v[18]),
+        ypanstep=f[7],
+    )
+
+
+def _sysfs_info(fb: str) -> FBInfo:
+    """Reads /sys/class/graphics/fbN. No bitfields there.
+    Raises OSError on failure, ValueError if visible size can't be told."""
+
+    sys_dir = pathlib.Path("/sys/class/graphics") / pathlib.Path(fb).name
+
+    def read(name) -> str:
+        return (sys_dir / name).read_text().strip()
+
+    # virtual_size is 'x,y', and is taller than the screen when sized for page flipping.
+    vx, vy = map(int, read("virtual_size").split(","))
+    bits = int(read("bits_per_pixel"))
+    stride = int(read("stride"))
+
+    # visible size only comes with video mode, i.e. 'U:480x320p-0'. Current one is in
+    # 'mode', some drivers leave it empty and only list it first in 'modes'.
+    for name in ("mode", "modes"):
+        try:
+            found = _MODE_SIZE.search(read(name))
+        except OSError:
+            continue
+
+        if found:
+            x, y = map(int, found.groups())
+            return FBInfo(x, y, bits, stride, vx, vy, 0, 0)
+
+    raise ValueError(f"No video mode in {sys_dir}, visible size unknown")
+
+
+def _fbset_info(fb: str) -> FBInfo:
+    """Parses `fbset` output - last resort."""
+
+    returned = subprocess.run(["fbset", "-fb", str(fb)], capture_output=True)
+    assert returned.returncode == 0, f"Return code from fbset was {returned.returncode}"
+
+    x = y = vx = vy = bits = None
+    bitfields = [(0, 0)] * 4
+
+    for line in returned.stdout.decode().splitlines():
+        key, _, value = line.strip().partition(" ")
+
+        if key == "geometry":
+            # format is 'geometry 480 320 480 320 16'
+            x, y, vx, vy, bits = map(int, value.split())
+
+        elif key == "rgba":
+            # format is 'rgba 5/11,6/5,5/0,0/0' - length/offset
+            bitfields = [
+                tuple(reversed(tuple(map(int, field.split("/")))))
+                for field in value.strip().split(",")
+            ]
+
+    assert x is not None, "fbset output has no geometry"
+
+    return FBInfo(x, y, bits, vx * ((bits + 7) // 8), vx, vy, 0, 0, *bitfields)
+
+
+def get_fb_info(fb: Union[str, os.PathLike] = "/dev/fb0") -> FBInfo:
+    """Gets frame buffer info. Tries ioctl, sysfs, then fbset in order."""
+
+    fb = os.fspath(fb)
+
+    try:
+        return _ioctl_info(fb)
+    except OSError:
+        pass
+
+    try:
+        return _sysfs_info(fb)
+    except (OSError, ValueError):
+        pass
+
+    return _fbset_info(fb)
+
+
+def read_var_screeninfo(fd: int) -> bytes:
+    """Returns raw fb_var_screeninfo, to be reused by pan_display()."""
+
+    return fcntl.ioctl(fd, FBIOGET_VSCREENINFO, bytes(struct.calcsize(_VAR_FMT)))
+
+
+def pan_display(fd: int, var_raw: bytes, yoffset: int):
+    """Pans visible area to given y offset within virtual resolution.
+
+    Raises:
+        OSError: If driver doesn't support panning
+    """
+
+    buf = bytearray(var_raw)
+    struct.pack_into("=I", buf, _VAR_YOFFSET, yoffset)
+    fcntl.ioctl(fd, FBIOPAN_DISPLAY, bytes(buf))
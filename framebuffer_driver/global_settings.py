@@ -5,10 +5,8 @@ Deals with global settings
 from os import environ
 import pathlib
 
-import pygame
 
-
-__all__ = ["GlobalSetting", "framebuffer_init"]
+__all__ = ["GlobalSetting", "framebuffer_init", "get_splash"]
 
 
 SPLASH_IMG_PATH = pathlib.Path(__file__).parent / "splash.png"
@@ -18,9 +16,24 @@ class GlobalSetting:
     """Settings singleton"""
     fb: pathlib.Path | None = None
 
+    # set when running headless, FramebufferDriver uses this instead of device.
+    backend = None
+
     # Splash file to show up on framebuffer for testing - merely 26 KiB on memory.
     # Probably a tiny bit intended to keep Hina loaded on memory.
-    test_img = pygame.image.load(SPLASH_IMG_PATH.as_posix())
+    # Loaded on first show_splash() call, decoding png at import costs a lot on 1B+.
+    test_img = None
+
+
+def get_splash():
+    """Loads splash image on first call, returns cached one afterward."""
+
+    if GlobalSetting.test_img is None:
+        import pygame
+
+        GlobalSetting.test_img = pygame.image.load(SPLASH_IMG_PATH.as_posix())
+
+    return GlobalSetting.test_img
 
 
 # could also test screen via
@@ -29,8 +42,23 @@ class GlobalSetting:
 # sudo fbi -T 2 -d /dev/fb1 -noverbose -a splash.png
 
 
-def framebuffer_init(fb: str = None):
-    """Sets global configuration. Optional."""
+def framebuffer_init(fb: str = None, headless=False, geometry=(480, 320, 16)):
+    """Sets global configuration. Optional.
+
+    Args:
+        fb: Framebuffer path. When headless, optional file to mirror frames to.
+        headless: Use in-memory framebuffer instead of device.
+        geometry: (width, height, bits) of in-memory framebuffer.
+    """
+
+    if headless:
+        from .backends import MemoryBackend
+
+        GlobalSetting.fb = pathlib.Path(fb) if fb else None
+        GlobalSetting.backend = MemoryBackend(*geometry, path=fb)
+        return
+
+    GlobalSetting.backend = None
 
     if fb:
         GlobalSetting.fb = pathlib.Path(fb)
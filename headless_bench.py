@@ -0,0 +1,188 @@
+"""
+Headless end-to-end run of ACApp.
+
+Stand-in controller, in-memory framebuffer and scripted touch - runs on any Linux box.
+Reports frames flushed and input-to-pixel latency for each tap.
+
+With --rooms N the panel runs in dashboard mode over N stand-in controllers,
+polled every --poll-interval so taps land while rounds are running, i.e.
+python headless_bench.py --rooms 30 -b "Tile Room 7" "Rooms"
+
+--worker moves the managers into ac_worker process, like the panel's --worker.
+"""
+
+import os
+import statistics
+from argparse import ArgumentParser
+
+import trio
+from evdev.ecodes import EV_KEY, BTN_TOUCH
+from loguru import logger
+
+from framebuffer_driver import FramebufferDriver, MemoryBackend
+from touch_driver import TouchDriver, ScriptedTouchSource, Calibration, load_lcd_data
+from basic_ui_framework import ui_framework_init
+from stand_in_server import StandInController
+from tiny_http import serve
+from api import ACManager
+from app import ACApp
+from dashboard import RoomPool
+from ac_worker import ACWorker
+from tracing import TRACER
+
+
+async def measure_lag(lags: list, interval: float = 0.005):
+    """Records how late each short sleep wakes up - time trio loop was busy elsewhere."""
+
+    while True:
+        target = trio.current_time() + interval
+        await trio.sleep_until(target)
+        lags.append(trio.current_time() - target)
+
+
+async def main(args):
+    TRACER.enabled = bool(args.trace)
+
+    backend = MemoryBackend(max_frames=args.taps * 32 + 16)
+    fb_d = FramebufferDriver(double_buffer=args.double_buffer, backend=backend)
+
+    source = ScriptedTouchSource([])
+    touch_d = TouchDriver(args.display, "scripted", source)
+
+    controllers = [StandInController() for _ in range(max(1, args.rooms))]
+
+    async with trio.open_nursery() as nursery:
+        logins = {}
+
+        for idx, controller in enumerate(controllers):
+            listeners = await nursery.start(serve, controller.handle, 0)
+            port = listeners[0].socket.getsockname()[1]
+
+            logins[f"Room {idx}"] = {
+                "ip": f"127.0.0.1:{port}", "id": controller.id, "pw": controller.password
+            }
+
+        if args.worker:
+            worker = ACWorker(logins, log_level="WARNING", log_changes_only=True)
+            await nursery.start(worker.run)
+            managers = dict(worker.managers)
+
+        else:
+            managers = {
+                name: ACManager(login["ip"], login["id"], login["pw"], log_changes_only=True)
+                for name, login in logins.items()
+            }
+
+        ui_framework_init(fb_d.screen)
+        ac_mgr = next(iter(managers.values()))
+
+        pool = None
+        if args.rooms:
+            pool = RoomPool(managers, args.rooms_parallel, args.poll_interval)
+
+        app = ACApp(ac_mgr, touch_d, fb_d, pool=pool)
+
+        await app.init()
+        await app.draw_ui()
+
+        # tap buttons round-robin, in raw coordinates like real panel would report
+        calibration = Calibration.from_entry(load_lcd_data()[args.display])
+        buttons = [app.ui[name] for name in args.buttons]
+        points = [
+            calibration.to_raw((btn.x1 + btn.x2) // 2, (btn.y1 + btn.y2) // 2)
+            for btn in (buttons[idx % len(buttons)] for idx in range(args.taps))
+        ]
+        source.trace = ScriptedTouchSource.taps(points, interval=args.interval)
+        releases = [offset for offset, *ev in source.trace if ev == [EV_KEY, BTN_TOUCH, 0]]
+
+        flushed_before = backend.flush_count
+        lags = []
+        nursery.start_soon(measure_lag, lags)
+        nursery.start_soon(app.poll_touch)
+        nursery.start_soon(app.run_animations)
+        nursery.start_soon(app.watch_changes)
+
+        if pool:
+            nursery.start_soon(app.update_temp_loop)
+
+        while not source.done:
+            await trio.sleep(0.1)
+
+        await trio.sleep(args.interval)
+        nursery.cancel_scope.cancel()
+
+    # match flushed frames to the tap they follow
+    release_times = [source.timestamp(offset) for offset in releases] + [float("inf")]
+    latencies, frame_counts = [], []
+
+    for idx, released in enumerate(release_times[:-1]):
+        frames = [ts for ts, _ in backend.frames if released <= ts < release_times[idx + 1]]
+        frame_counts.append(len(frames))
+
+        if frames:
+            # later frames are animations settling, first one is the response to input
+            latencies.append((frames[0] - released) * 1000)
+            logger.info(
+                "Tap {:>3}: {} frames, first {:.1f} ms, last {:.1f} ms",
+                idx, len(frames), latencies[-1], (frames[-1] - released) * 1000,
+            )
+        else:
+            logger.info("Tap {:>3}: no frame", idx)
+
+    logger.info("Frames flushed during taps: {}", backend.flush_count - flushed_before)
+    logger.info("Bytes flushed total      : {}", backend.bytes_written)
+    logger.info("Touches accepted/rejected: {}/{}", touch_d.filter.accepted, touch_d.filter.rejected)
+    logger.info("Controller stats         : {}", controllers[0].stats)
+
+    if pool:
+        logger.info(
+            "Poll rounds              : {}, last took {:.2f} s for {} rooms",
+            pool.rounds, pool.last_round_sec, len(pool.rooms),
+        )
+    logger.info("Animation frames         : {}", app.animator.frames)
+
+    if lags:
+        logger.info(
+            "Event loop lag ms        : mean {:.2f} / p99 {:.1f} / max {:.1f}",
+            statistics.mean(lags) * 1000,
+            sorted(lags)[int(len(lags) * 0.99)] * 1000,
+            max(lags) * 1000,
+        )
+
+    if latencies:
+        logger.info(
+            "Input-to-pixel ms        : mean {:.1f} / median {:.1f} / max {:.1f}",
+            statistics.mean(latencies), statistics.median(latencies), max(latencies),
+        )
+        logger.info("Frames per action        : mean {:.2f}", statistics.mean(frame_counts))
+
+    if args.trace:
+        TRACER.dump(args.trace)
+
+        for line in TRACER.summary():
+            logger.info(line)
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    parser = ArgumentParser("Headless ACApp benchmark")
+
+    parser.add_argument("-n", "--taps", type=int, default=10, help="Number of taps")
+    parser.add_argument("-i", "--interval", type=float, default=1.0, help="Seconds between taps")
+    parser.add_argument("-d", "--display", type=str, default="LCD35", help="Display type")
+    parser.add_argument(
+        "-b", "--buttons", nargs="+", default=["Temp up", "Temp down"], help="Buttons to tap"
+    )
+    parser.add_argument("--rooms", type=int, default=0, help="Run dashboard over this many rooms")
+    parser.add_argument(
+        "--rooms-parallel", type=int, default=4, help="Max rooms polled at once"
+    )
+    parser.add_argument(
+        "--poll-interval", type=float, default=1.0, help="Seconds between room poll rounds"
+    )
+    parser.add_argument("--worker", action="store_true", help="Run managers in worker process")
+    parser.add_argument("--double-buffer", action="store_true", help="Use double buffering")
+    parser.add_argument("--trace", type=str, default="", help="Write chrome trace json here")
+
+    trio.run(main, parser.parse_args())
@@ -0,0 +1,369 @@
+"""
+Persistent history of AC state samples.
+
+Each room gets three fixed size ring files - raw samples, hourly and daily
+rollups - of fixed width binary records, memory mapped. Appending is a
+struct.pack_into at a computed offset, reading last n records is one slice,
+and disk & memory use stay the same no matter how long it runs: oldest
+records are simply overwritten. Pages are left to kernel to write back,
+so SD card isn't hit on every sample.
+
+Rollups are accumulated in memory as samples come in and written when their
+hour/day (UTC) ends. On reopen the unfinished ones are rebuilt from raw samples.
+
+Temps are stored in tenths of degree, so fractional readings fit too.
+"""
+
+import os
+import re
+import mmap
+import struct
+import time
+from typing import Dict, Iterator, List, NamedTuple, Union
+
+from loguru import logger
+
+
+__all__ = ["Sample", "Rollup", "Ring", "RoomHistory", "HistoryStore"]
+
+
+# magic, record size, capacity, records written so far
+_HEADER = struct.Struct("<4sHxxIQ")
+_MAGIC = b"ACH1"
+
+# epoch sec, current & target temp in 0.1 degrees, mode, wind speed, wind angle, power
+_SAMPLE = struct.Struct("<IhhBBBB")
+
+# bucket start epoch sec, sample count, min/max/mean temp & mean target in 0.1 degrees,
+# powered percentage
+_ROLLUP = struct.Struct("<IHhhhhBx")
+
+# mode/wind value that couldn't be mapped to index
+UNKNOWN = 255
+
+RESOLUTIONS = {"raw": 0, "1h": 3600, "1d": 86400}
+
+
+class Sample(NamedTuple):
+    at: int
+    current_temp: float
+    target_temp: float
+    mode: int
+    wind_speed: int
+    wind_angle: int
+    powered: bool
+
+
+class Rollup(NamedTuple):
+    at: int
+    count: int
+    min_temp: float
+    max_temp: float
+    mean_temp: float
+    mean_target: float
+    powered_ratio: float
+
+
+def _tenths(value: float) -> int:
+    return round(value * 10)
+
+
+def _index(options, value: str) -> int:
+    try:
+        return options.index(value)
+    except ValueError:
+        return UNKNOWN
+
+
+class Ring:
+    def __init__(self, path: Union[str, os.PathLike], record: struct.Struct, capacity: int):
+        """Fixed size ring of fixed width records in memory mapped file.
+
+        File created with different record size or capacity is started over.
+
+        Args:
+            path: Ring file path.
+            record: Record format.
+            capacity: Max records kept.
+        """
+
+        self.path = path
+        self.record = record
+        self.capacity = capacity
+
+        size = _HEADER.size + record.size * capacity
+        new = not os.path.exists(path) or os.path.getsize(path) != size
+
+        self._fp = open(path, "r+b" if not new else "w+b")
+        if new:
+            self._fp.truncate(size)
+
+        self._map = mmap.mmap(self._fp.fileno(), size)
+
+        magic, record_size, file_capacity, written = _HEADER.unpack_from(self._map)
+
+        if new or (magic, record_size, file_capacity) != (_MAGIC, record.size, capacity):
+            if not new:
+                logger.warning("History file {} has different format, starting over", path)
+
+            written = 0
+            _HEADER.pack_into(self._map, 0, _MAGIC, record.size, capacity, 0)
+
+        self.written = written
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    def _offset(self, idx: int) -> int:
+        return _HEADER.size + (idx % self.capacity) * self.record.size
+
+    def append(self, *values):
+        self.record.pack_into(self._map, self._offset(self.written), *values)
+        self.written += 1
+
+        # header last, so torn write loses at most the new record
+        _HEADER.pack_into(self._map, 0, _MAGIC, self.record.size, self.capacity, self.written)
+
+    def recent(self, count: int) -> Iterator[tuple]:
+        """Yields last count records, oldest first."""
+
+        count = min(count, len(self))
+        if not count:
+            return
+
+        start = self._offset(self.written - count)
+        end = start + count * self.record.size
+        limit = _HEADER.size + self.capacity * self.record.size
+
+        # two slices if range wraps around end of file
+        yield from self.record.iter_unpack(self._map[start:min(end, limit)])
+
+        if end > limit:
+            yield from self.record.iter_unpack(self._map[_HEADER.size:_HEADER.size + end - limit])
+
+    def last(self) -> Union[tuple, None]:
+        return next(self.recent(1), None)
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        self._map.flush()
+        self._map.close()
+        self._fp.close()
+
+
+class _Accumulator:
+    """Rollup of bucket still in progress."""
+
+    def __init__(self, bucket: int):
+        self.bucket = bucket
+        self.count = 0
+        self.min = 0
+        self.max = 0
+        self.temp_sum = 0
+        self.target_sum = 0
+        self.powered = 0
+
+    def add(self, current: int, target: int, powered: int):
+        if not self.count:
+            self.min = self.max = current
+        else:
+            self.min = min(self.min, current)
+            self.max = max(self.max, current)
+
+        self.count += 1
+        self.temp_sum += current
+        self.target_sum += target
+        self.powered += powered
+
+    def values(self) -> tuple:
+        return (
+            self.bucket,
+            min(self.count, 0xFFFF),
+            self.min,
+            self.max,
+            round(self.temp_sum / self.count),
+            round(self.target_sum / self.count),
+            round(self.powered * 100 / self.count),
+        )
+
+
+class RoomHistory:
+    def __init__(
+        self,
+        directory: Union[str, os.PathLike],
+        room: str,
+        raw_capacity: int = 60 * 24 * 90,
+        hourly_capacity: int = 24 * 365 * 2,
+        daily_capacity: int = 365 * 10,
+    ):
+        """History of one room. Get it from HistoryStore.room().
+
+        Defaults keep 90 days of minute samples, 2 years hourly and 10 years daily,
+        ~2MB on disk per room.
+        """
+
+        self.room = room
+
+        # file names from room name, whatever it contains
+        stem = os.path.join(directory, re.sub(r"[^\w-]", "_", room))
+
+        self._raw = Ring(f"{stem}.raw", _SAMPLE, raw_capacity)
+        self._rollups = {
+            3600: Ring(f"{stem}.1h", _ROLLUP, hourly_capacity),
+            86400: Ring(f"{stem}.1d", _ROLLUP, daily_capacity),
+        }
+
+        self._pending: Dict[int, Union[_Accumulator, None]] = {
+            period: self._rebuild(period) for period in self._rollups
+        }
+
+    def _rebuild(self, period: int) -> Union[_Accumulator, None]:
+        """Re-accumulates unfinished bucket from raw samples after restart."""
+
+        last = self._raw.last()
+        if last is None:
+            return None
+
+        acc = _Accumulator(last[0] - last[0] % period)
+
+        # reading further back until records older than bucket show up
+        count = 64
+        while count < len(self._raw) and next(self._raw.recent(count))[0] >= acc.bucket:
+            count *= 2
+
+        for rec in self._raw.recent(count):
+            if rec[0] >= acc.bucket:
+                acc.add(rec[1], rec[2], rec[6])
+
+        return acc
+
+    def record(
+        self,
+        snapshot: "api.ACSnapshot",
+        powered: bool,
+        at: Union[float, None] = None,
+    ):
+        """Appends sample, closing hourly/daily rollups when their bucket ends.
+
+        Args:
+            snapshot: State to record.
+            powered: Whether unit is on.
+            at: Epoch seconds. Defaults to now.
+        """
+
+        # imported here so history can be read without httpx & bs4 around
+        from api import OPERATION_MODE, WIND_SPEED_MODE, WIND_DIRECTION_MODE
+
+        at = int(time.time() if at is None else at)
+        current = _tenths(snapshot.current_temp)
+        target = _tenths(snapshot.target_temp)
+
+        self._raw.append(
+            at,
+            current,
+            target,
+            _index(OPERATION_MODE, snapshot.operation_mode),
+            _index(WIND_SPEED_MODE, snapshot.wind_speed),
+            _index(WIND_DIRECTION_MODE, snapshot.wind_angle),
+            int(powered),
+        )
+
+        for period, ring in self._rollups.items():
+            bucket = at - at % period
+            acc = self._pending[period]
+
+            if acc is not None and acc.bucket != bucket:
+                ring.append(*acc.values())
+                acc = None
+
+            if acc is None:
+                acc = self._pending[period] = _Accumulator(bucket)
+
+            acc.add(current, target, int(powered))
+
+    def recent(self, count: int, resolution: str = "raw") -> Union[List[Sample], List[Rollup]]:
+        """Returns last count records, oldest first.
+
+        Args:
+            count: Max records to return.
+            resolution: 'raw' for samples, '1h' or '1d' for rollups. Rollups include the
+                bucket in progress as last record.
+
+        Raises:
+            KeyError: On unknown resolution.
+        """
+
+        period = RESOLUTIONS[resolution]
+
+        if not period:
+            return [
+                Sample(at, cur / 10, tgt / 10, mode, speed, angle, bool(powered))
+                for at, cur, tgt, mode, speed, angle, powered in self._raw.recent(count)
+            ]
+
+        records = list(self._rollups[period].recent(count))
+
+        acc = self._pending[period]
+        if acc is not None and acc.count:
+            records.append(acc.values())
+
+        return [
+            Rollup(at, num, low / 10, high / 10, mean / 10, target / 10, powered / 100)
+            for at, num, low, high, mean, target, powered in records[-count:]
+        ]
+
+    def temps(self, count: int, resolution: str = "raw") -> List[float]:
+        """Last count room temps, oldest first. Mean temp for rollups."""
+
+        if resolution == "raw":
+            return [sample.current_temp for sample in self.recent(count)]
+
+        return [rollup.mean_temp for rollup in self.recent(count, resolution)]
+
+    def flush(self):
+        self._raw.flush()
+        for ring in self._rollups.values():
+            ring.flush()
+
+    def close(self):
+        self._raw.close()
+        for ring in self._rollups.values():
+            ring.close()
+
+
+class HistoryStore:
+    def __init__(self, directory: Union[str, os.PathLike], **capacities):
+        """Histories of all rooms under one directory.
+
+        Args:
+            directory: Directory ring files are kept in. Created if missing.
+            capacities: raw_capacity, hourly_capacity, daily_capacity passed to RoomHistory.
+        """
+
+        self.directory = directory
+        self.capacities = capacities
+
+        self._rooms: Dict[str, RoomHistory] = {}
+
+        os.makedirs(directory, exist_ok=True)
+
+    def room(self, name: str) -> RoomHistory:
+        """Returns room's history, opening its files on first use."""
+
+        try:
+            return self._rooms[name]
+        except KeyError:
+            history = self._rooms[name] = RoomHistory(self.directory, name, **self.capacities)
+            return history
+
+    def flush(self):
+        for history in self._rooms.values():
+            history.flush()
+
+    def close(self):
+        for history in self._rooms.values():
+            history.close()
+
+        self._rooms.clear()
@@ -0,0 +1,188 @@
+"""
+Local control API of the panel.
+
+Served from panel's own trio nursery over tiny_http, sharing its ACManager.
+Reads are answered from manager's last known state - encoded once per change -
+so any number of local clients polling at any rate cause no request to
+controller. Only commands go upstream.
+
+    GET  /status          last known state as json
+    POST /temp            {"temp": 26}
+    POST /power           {"on": true}
+    GET  /subscribe       websocket, status json pushed on every change
+
+Subscribers always get latest state rather than every change in between,
+so slow client can't pile up messages.
+"""
+
+import json
+from typing import Any, Dict, Union
+
+import trio
+from loguru import logger
+
+from tiny_http import Request, Response, WebSocket, serve
+from api import ACManager, ACTempOutOfBound, ACRequestFailed, ACPermissionDenied
+
+
+__all__ = ["LocalAPI"]
+
+
+class LocalAPI:
+    def __init__(self, manager: ACManager, max_subscribers: int = 32):
+        """
+        Args:
+            manager: Manager shared with the panel.
+            max_subscribers: Websocket clients allowed at once.
+        """
+
+        self.manager = manager
+        self.max_subscribers = max_subscribers
+
+        self.subscribers = 0
+
+        # (version, encoded status) - re-encoded only when manager's version moves
+        self._cached = (-1, b"")
+
+        # stats
+        self.reads = 0
+        self.commands = 0
+
+    def status(self) -> Dict[str, Any]:
+        """Manager's last known state. Doesn't make any request."""
+
+        manager = self.manager
+        state = manager.state
+
+        status = {
+            "version": manager.version,
+            "updated_at": manager.updated_at,
+            "powered": manager.is_powered,
+            "target_temp": manager.target_temp,
+            "wind_speed": manager.speed,
+            "wind_angle": manager.angle,
+            "bounds": [manager.lower_bound, manager.upper_bound - 1],
+            "can_power_on": state.can_power_on if state else None,
+            "can_power_off": state.can_power_off if state else None,
+        }
+
+        if state is not None:
+            status["state"] = state.snapshot._asdict()
+
+        return status
+
+    def _encoded_status(self) -> bytes:
+        version, data = self._cached
+
+        if version != self.manager.version:
+            version = self.manager.version
+            data = json.dumps(self.status()).encode()
+            self._cached = version, data
+
+        return data
+
+    @staticmethod
+    def _param(request: Request, name: str) -> Any:
+        """Value from json body, or from query string if there's no body."""
+
+        if request.body:
+            body = request.json()
+            if not isinstance(body, dict) or name not in body:
+                raise ValueError(f"Missing {name}")
+
+            return body[name]
+
+        if name not in request.query:
+            raise ValueError(f"Missing {name}")
+
+        return request.query[name]
+
+    async def handle(self, request: Request) -> Union[Response, None]:
+        path, method = request.path, request.method
+
+        if path == "/status":
+            self.reads += 1
+            return Response(self._encoded_status(), content_type="application/json")
+
+        if path == "/subscribe":
+            return await self._subscribe(request)
+
+        if path not in ("/temp", "/power"):
+            return Response("Not Found", 404)
+
+        if method != "POST":
+            return Response("Method Not Allowed", 405, headers={"Allow": "POST"})
+
+        try:
+            if path == "/temp":
+                await self.manager.set_temp(int(self._param(request, "temp")))
+
+            else:
+                on = self._param(request, "on")
+                if isinstance(on, str):
+                    on = on.lower() in ("1", "true", "on")
+
+                if on:
+                    await self.manager.power_on()
+                else:
+                    await self.manager.power_off()
+
+        except (ValueError, ACTempOutOfBound) as err:
+            return Response.json({"error": f"{type(err).__name__}: {err}"}, 400)
+
+        except ACPermissionDenied as err:
+            return Response.json({"error": str(err)}, 403)
+
+        except ACRequestFailed as err:
+            # don't pass transport error text, may have controller's address in it
+            logger.warning("API {} failed - {}: {}", path, type(err).__name__, err)
+            return Response.json({"error": "Controller request failed"}, 502)
+
+        self.commands += 1
+        return Response(self._encoded_status(), content_type="application/json")
+
+    async def _subscribe(self, request: Request) -> Union[Response, None]:
+        if self.subscribers >= self.max_subscribers:
+            return Response("Too many subscribers", 503)
+
+        try:
+            ws = await WebSocket.accept(request)
+        except ValueError as err:
+            return Response(str(err), 400)
+
+        self.subscribers += 1
+        logger.debug("API subscriber connected, {} total", self.subscribers)
+
+        try:
+            async with trio.open_nursery() as nursery:
+                nursery.start_soon(self._push_changes, ws)
+
+                # only reading to notice close & answer pings
+                while await ws.receive() is not None:
+                    pass
+
+                nursery.cancel_scope.cancel()
+
+        except (trio.BrokenResourceError, trio.ClosedResourceError, ValueError):
+            pass
+
+        finally:
+            self.subscribers -= 1
+            logger.debug("API subscriber left, {} total", self.subscribers)
+
+        # connection was taken over
+        return None
+
+    async def _push_changes(self, ws: WebSocket):
+        version = self.manager.version
+
+        while True:
+            await ws.send(self._encoded_status().decode())
+            version = await self.manager.wait_changed(version)
+
+    async def serve(
+        self, port: int, host: str = "127.0.0.1", *, task_status=trio.TASK_STATUS_IGNORED
+    ):
+        """Serves API. Run inside a nursery."""
+
+        await serve(self.handle, port, host, task_status=task_status)
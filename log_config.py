@@ -0,0 +1,76 @@
+"""
+Loguru configuration for long-running deployments.
+
+Loguru checks level before formatting, so messages passed as
+`logger.debug("{}", value)` cost nothing when filtered out - use that
+over f-strings. File sink is written from background thread (enqueue),
+keeping SD card writes off the event loop.
+
+Modules loaded before loguru - framebuffer_driver, imported ahead of splash -
+log through stdlib logging, forwarded here.
+"""
+
+import sys
+import logging
+
+from loguru import logger
+
+
+__all__ = ["setup_logging"]
+
+
+# stdlib loggers forwarded to loguru. Not root - httpx logs every request at INFO.
+FORWARDED_LOGGERS = ("framebuffer_driver",)
+
+
+class _ToLoguru(logging.Handler):
+    def emit(self, record: logging.LogRecord):
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+
+        logger.opt(exception=record.exc_info).patch(
+            lambda r: r.update(name=record.name, function=record.funcName, line=record.lineno)
+        ).log(level, record.getMessage())
+
+
+def setup_logging(
+    level: str = "INFO",
+    json: bool = False,
+    file: str = None,
+    rotation: str = "1 MB",
+    retention: int = 3,
+):
+    """Replaces loguru's default stderr handler.
+
+    Args:
+        level: Minimum level to emit.
+        json: Emit serialized json records instead of text.
+        file: Also log to this file, rotated by size.
+        rotation: Size to rotate file at, i.e. '1 MB'.
+        retention: Number of rotated files to keep.
+    """
+
+    logger.remove()
+
+    # diagnose=False - variable dump in tracebacks is slow, and would print password.
+    logger.add(sys.stderr, level=level, serialize=json, backtrace=False, diagnose=False)
+
+    if file:
+        logger.add(
+            file,
+            level=level,
+            serialize=json,
+            rotation=rotation,
+            retention=retention,
+            enqueue=True,
+            backtrace=False,
+            diagnose=False,
+        )
+
+    for name in FORWARDED_LOGGERS:
+        stdlib_logger = logging.getLogger(name)
+        stdlib_logger.handlers = [_ToLoguru()]
+        stdlib_logger.setLevel(logging.DEBUG)
+        stdlib_logger.propagate = False
@@ -0,0 +1,304 @@
+"""
+Tiny Prometheus-style metrics.
+
+Counters, gauges and histograms rendered in plain-text exposition format,
+served over local HTTP from the trio nursery. Nothing is computed until scraped
+other than plain additions.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Sequence, Tuple, Union
+
+import trio
+
+from tiny_http import Request, Response, serve
+
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Registry",
+    "REGISTRY",
+    "ACMetrics",
+    "PanelMetrics",
+    "serve_metrics",
+]
+
+
+# default latency buckets in seconds - controller is slow, Pi is slower.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_ = ""
+
+    def __init__(self, name: str, help_: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_
+        self.labelnames = tuple(labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_}"]
+
+    def samples(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type_ = "counter"
+
+    def __init__(self, name: str, help_: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Gauge(_Metric):
+    type_ = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_: str,
+        labelnames: Sequence[str] = (),
+        func: Callable[[], Union[float, Dict[LabelValues, float]]] = None,
+        type_: str = "gauge",
+    ):
+        """Gauge. If func is given, value is read from it on scrape -
+        for exposing counters other modules already keep, type_ can be 'counter' then.
+        """
+
+        super().__init__(name, help_, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+        self.func = func
+        self.type_ = type_
+
+    def set(self, value: float, *label_values: str):
+        self.values[label_values] = value
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        values = self.values
+
+        if self.func is not None:
+            value = self.func()
+            values = value if isinstance(value, dict) else {(): value}
+
+        for labels, value in values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram(_Metric):
+    type_ = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+        # label values -> [bucket counts..., sum, count]
+        self.values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        data = self.values.get(label_values)
+        if data is None:
+            data = self.values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+
+        # non-cumulative on observe, summed up on scrape
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                data[idx] += 1
+                break
+
+        data[-2] += value
+        data[-1] += 1
+
+    @contextmanager
+    def time(self, *label_values: str):
+        """Observes duration of the block."""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def samples(self):
+        for labels, data in self.values.items():
+            cumulative = 0
+
+            for bound, count in zip(self.buckets, data):
+                cumulative += count
+                le = _labels(self.labelnames, labels, f'le="{_number(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(data[-2])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {data[-1]}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Registers metric. Returns already registered one if name exists."""
+
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_, labelnames))
+
+    def gauge(
+        self, name: str, help_: str, labelnames: Sequence[str] = (), func=None, type_="gauge"
+    ) -> Gauge:
+        return self.register(Gauge(name, help_, labelnames, func, type_))
+
+    def histogram(
+        self, name: str, help_: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, help_, labelnames, buckets))
+
+    def render(self) -> str:
+        """Returns text exposition of all metrics."""
+
+        lines = []
+
+        for metric in self.metrics.values():
+            lines += metric.header()
+            lines += metric.samples()
+
+        return "\n".join(lines) + "\n"
+
+
+# Shared registry.
+REGISTRY = Registry()
+
+
+class ACMetrics:
+    def __init__(self, registry: Registry = REGISTRY):
+        """Metrics ACManager reports into."""
+
+        self.http_seconds = registry.histogram(
+            "ac_http_request_seconds", "Controller request latency", ("operation",)
+        )
+        self.failures = registry.counter(
+            "ac_http_failures_total", "Failed controller requests", ("operation",)
+        )
+        self.in_flight = registry.gauge("ac_requests_in_flight", "Controller requests in flight")
+        self.logins = registry.counter("ac_logins_total", "Logins performed")
+        self.parse_seconds = registry.histogram(
+            "ac_parse_seconds", "Controller page parse time"
+        )
+        self.coalesced = registry.counter(
+            "ac_requests_coalesced_total",
+            "Calls served by identical request already in flight",
+            ("operation",),
+        )
+        self.throttled = registry.counter(
+            "ac_requests_throttled_total", "Requests delayed by rate limit", ("operation",)
+        )
+        self.throttle_seconds = registry.histogram(
+            "ac_throttle_wait_seconds", "Time requests waited for rate limit"
+        )
+
+
+class PanelMetrics:
+    def __init__(self, fb_driver, touch_driver, registry: Registry = REGISTRY):
+        """Metrics of the panel side. Driver counters are read on scrape."""
+
+        self.flush_seconds = registry.histogram(
+            "panel_frame_flush_seconds", "Time spent writing frames to framebuffer"
+        )
+
+        registry.gauge(
+            "panel_frames_flushed_total", "Frames written to framebuffer",
+            func=lambda: fb_driver.frames_flushed, type_="counter",
+        )
+        registry.gauge(
+            "panel_frame_bytes_total", "Bytes written to framebuffer",
+            func=lambda: fb_driver.bytes_flushed, type_="counter",
+        )
+        registry.gauge(
+            "panel_frames_pending", "Frames waiting for flush in progress",
+            func=lambda: fb_driver.pending_frames,
+        )
+        registry.gauge(
+            "panel_touch_events_total", "Touches seen by touch filter", ("result",),
+            func=lambda: {
+                ("accepted",): touch_driver.filter.accepted,
+                ("rejected",): touch_driver.filter.rejected,
+            },
+            type_="counter",
+        )
+
+
+def _trio_gauges(registry: Registry):
+    """Event loop queue depths - high runnable count means Pi can't keep up."""
+
+    def stats():
+        return trio.lowlevel.current_statistics()
+
+    registry.gauge("trio_tasks_living", "Living trio tasks", func=lambda: stats().tasks_living)
+    registry.gauge(
+        "trio_tasks_runnable", "Trio tasks waiting to run", func=lambda: stats().tasks_runnable
+    )
+    registry.gauge(
+        "trio_run_sync_soon_queue_size", "Pending thread callbacks",
+        func=lambda: stats().run_sync_soon_queue_size,
+    )
+
+
+async def serve_metrics(
+    port: int,
+    registry: Registry = REGISTRY,
+    host: str = "127.0.0.1",
+    *,
+    task_status=trio.TASK_STATUS_IGNORED,
+):
+    """Serves /metrics. Run inside a nursery."""
+
+    _trio_gauges(registry)
+
+    async def handle(request: Request) -> Response:
+        if request.path != "/metrics":
+            return Response("Not Found", 404)
+
+        return Response(registry.render(), content_type="text/plain; version=0.0.4")
+
+    await serve(handle, port, host, task_status=task_status)
@@ -0,0 +1,494 @@
+"""
+Local schedule of AC actions.
+
+Recurring rules use cron syntax (minute hour day-of-month month day-of-week,
+with *, lists, ranges and steps), one-shots fire once at given time.
+Each entry targets a room, so one scheduler can drive several units.
+
+Next fire times are kept in a heap and the loop sleeps until the earliest one -
+nothing runs in between. Sleep is capped so wall clock jumps (Pi has no RTC,
+time is set by NTP some time after boot) are noticed within MAX_SLEEP_SEC.
+
+Schedule file can be edited with this module's CLI while the panel runs - it's
+checked for changes every FILE_CHECK_SEC and before every write, and reloaded,
+so neither side overwrites the other's entries.
+
+Wall clock is injectable, so with clock derived from trio's MockClock firing is
+fully deterministic.
+"""
+
+import os
+import json
+import heapq
+import secrets
+import time
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Tuple, Union
+
+import trio
+from loguru import logger
+
+
+__all__ = ["Cron", "ScheduleEntry", "Scheduler", "ACTIONS"]
+
+
+# ACManager methods entries can call, and whether they take a value.
+ACTIONS = {
+    "power_on": False,
+    "power_off": False,
+    "set_temp": True,
+    "set_wind_speed": True,
+    "set_wind_angle": True,
+}
+
+# longest single sleep, to catch up with wall clock changes
+MAX_SLEEP_SEC = 900
+
+# one-shots found this late on load still fire, older ones are dropped
+ONE_SHOT_GRACE_SEC = 300
+
+# how often schedule file is checked for outside edits
+FILE_CHECK_SEC = 10
+
+
+def _parse_field(field: str, low: int, high: int) -> FrozenSet[int]:
+    """Parses one cron field into set of allowed values."""
+
+    values = set()
+
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/")
+            step = int(step_str)
+
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = map(int, part.split("-"))
+        else:
+            start = end = int(part)
+
+        if not (low <= start <= high and low <= end <= high) or step < 1:
+            raise ValueError(f"Cron field {field} out of range {low}-{high}")
+
+        values.update(range(start, end + 1, step))
+
+    return frozenset(values)
+
+
+class Cron:
+    def __init__(self, expr: str):
+        """Cron expression 'minute hour day-of-month month day-of-week'.
+
+        Day of week is 0-6 from Sunday, 7 is also Sunday.
+        Like cron, if both day fields are restricted either one matching is enough.
+
+        Raises:
+            ValueError: On malformed expression.
+        """
+
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got '{expr}'")
+
+        self.expr = expr
+
+        self.minutes = sorted(_parse_field(fields[0], 0, 59))
+        self.hours = sorted(_parse_field(fields[1], 0, 23))
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12)
+        self.weekdays = frozenset(day % 7 for day in _parse_field(fields[4], 0, 7))
+
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def __repr__(self):
+        return f"Cron('{self.expr}')"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        if dt.month not in self.months:
+            return False
+
+        # python's monday is 0, cron's sunday is 0
+        dom = dt.day in self.days
+        dow = (dt.weekday() + 1) % 7 in self.weekdays
+
+        if self._any_day:
+            return dow
+        if self._any_weekday:
+            return dom
+
+        return dom or dow
+
+    def next_after(self, dt: datetime) -> Union[datetime, None]:
+        """Returns first matching minute strictly after dt, None if there's none in 5 years."""
+
+        start = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+
+        # checking day by day, then only the allowed hours & minutes of it
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+
+            day += timedelta(days=1)
+
+        return None
+
+
+class ScheduleEntry(NamedTuple):
+    """Single scheduled action. Either cron or at is set."""
+
+    id: str
+    room: str
+    action: str
+    value: Union[int, None] = None
+    cron: Union[str, None] = None
+    at: Union[float, None] = None
+
+    def describe(self) -> str:
+        when = self.cron if self.cron else datetime.fromtimestamp(self.at).strftime("%m-%d %H:%M")
+        value = "" if self.value is None else f" {self.value}"
+        return f"[{self.room}] {when} {self.action}{value}"
+
+
+class Scheduler:
+    def __init__(
+        self,
+        rooms: Dict[str, "ACManager"],
+        path: Union[str, os.PathLike, None] = None,
+        wall_clock: Callable[[], float] = time.time,
+    ):
+        """Fires scheduled actions on rooms' ACManagers.
+
+        Args:
+            rooms: Room name -> ACManager.
+            path: Json file schedule is loaded from & saved to. None to keep in memory only.
+            wall_clock: Epoch seconds source. Fire times are in this clock.
+        """
+
+        self.rooms = rooms
+        self.path = path
+        self.wall_clock = wall_clock
+
+        self.entries: Dict[str, ScheduleEntry] = {}
+
+        # (fire epoch, entry id). Entries removed or replaced are skipped when popped.
+        self._heap: List[Tuple[float, str]] = []
+        self._next: Dict[str, float] = {}
+
+        self._crons: Dict[str, Cron] = {}
+        self._changed = trio.Event()
+
+        # stats
+        self.fired = 0
+        self.failed = 0
+
+        # (mtime, size) of file as last loaded or saved, to notice outside edits
+        self._file_stamp: Union[Tuple[int, int], None] = None
+
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    # --- persistence ---
+
+    def _stamp(self) -> Union[Tuple[int, int], None]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload_if_changed(self) -> bool:
+        """Loads file again if it was changed since last load or save. Returns whether it was.
+        Unreadable file is logged and current entries kept."""
+
+        if self.path is None:
+            return False
+
+        stamp = self._stamp()
+        if stamp is None or stamp == self._file_stamp:
+            return False
+
+        logger.info("Schedule file changed, reloading")
+
+        try:
+            self.load()
+
+        except (OSError, ValueError, TypeError) as err:
+            # don't warn again until it changes again
+            self._file_stamp = stamp
+            logger.warning("Couldn't reload schedule - {}: {}", type(err).__name__, err)
+            return False
+
+        return True
+
+    def load(self):
+        """Loads entries from path, replacing current ones. Unchanged entries keep
+        their pending fire times, so reloading right when one is due doesn't skip it."""
+
+        stamp = self._stamp()
+
+        with open(self.path, encoding="utf8") as fp:
+            data = json.load(fp)
+
+        pending = {
+            entry_id: (self.entries[entry_id], at) for entry_id, at in self._next.items()
+        }
+
+        self.entries.clear()
+        self._crons.clear()
+        self._heap.clear()
+        self._next.clear()
+
+        now = self.wall_clock()
+        dropped = 0
+
+        for raw in data.get("entries", []):
+            entry = ScheduleEntry(**raw)
+            prev, fire_at = pending.get(entry.id, (None, None))
+
+            if prev == entry:
+                self._add(entry, fire_at)
+                continue
+
+            if entry.at is not None and entry.at < now - ONE_SHOT_GRACE_SEC:
+                logger.warning("Dropping missed one-shot {}", entry.describe())
+                dropped += 1
+                continue
+
+            self._add(entry)
+
+        self._file_stamp = stamp
+        logger.info("Loaded {} schedule entries", len(self.entries))
+
+        # so dropped ones aren't warned about again on every start
+        if dropped:
+            self.save()
+
+    def save(self):
+        """Writes entries to path atomically. No-op without path."""
+
+        if self.path is None:
+            return
+
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf8") as fp:
+            json.dump({"entries": [entry._asdict() for entry in self.entries.values()]}, fp, indent=2)
+
+        os.replace(tmp, self.path)
+        self._file_stamp = self._stamp()
+
+    # --- entries ---
+
+    def _validate(self, room: str, action: str, value):
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action {action}, must be one of {list(ACTIONS)}")
+
+        if ACTIONS[action] and value is None:
+            raise ValueError(f"Action {action} needs value")
+
+        if self.rooms and room not in self.rooms:
+            logger.warning("Schedule for unknown room {}", room)
+
+    def _add(self, entry: ScheduleEntry, fire_at: float = None):
+        if entry.cron is not None:
+            self._crons[entry.id] = Cron(entry.cron)
+
+        self.entries[entry.id] = entry
+        self._push(entry, self.wall_clock(), fire_at)
+
+    def _push(self, entry: ScheduleEntry, now: float, fire_at: float = None):
+        """Pushes entry's next fire time after now, or given one."""
+
+        if fire_at is None and entry.cron is not None:
+            next_dt = self._crons[entry.id].next_after(datetime.fromtimestamp(now))
+            if next_dt is None:
+                return
+
+            fire_at = next_dt.timestamp()
+
+        elif fire_at is None:
+            fire_at = entry.at
+
+        self._next[entry.id] = fire_at
+        heapq.heappush(self._heap, (fire_at, entry.id))
+
+        # loop may be sleeping for later event
+        self._changed.set()
+
+    def add_rule(self, cron: str, action: str, value: int = None, room: str = "default") -> str:
+        """Adds recurring entry. Returns its id.
+
+        Raises:
+            ValueError: On malformed cron or unknown action.
+        """
+
+        self._validate(room, action, value)
+        Cron(cron)
+
+        self.reload_if_changed()
+        entry = ScheduleEntry(secrets.token_hex(4), room, action, value, cron=cron)
+        self._add(entry)
+        self.save()
+
+        return entry.id
+
+    def add_once(self, at: float, action: str, value: int = None, room: str = "default") -> str:
+        """Adds one-shot entry firing at epoch seconds. Returns its id.
+
+        Raises:
+            ValueError: On unknown action.
+        """
+
+        self._validate(room, action, value)
+
+        self.reload_if_changed()
+        entry = ScheduleEntry(secrets.token_hex(4), room, action, value, at=at)
+        self._add(entry)
+        self.save()
+
+        return entry.id
+
+    def remove(self, entry_id: str):
+        """Removes entry. Its pending heap item is skipped when it comes up.
+
+        Raises:
+            KeyError: If there's no such entry.
+        """
+
+        self.reload_if_changed()
+
+        del self.entries[entry_id]
+        self._crons.pop(entry_id, None)
+        self._next.pop(entry_id, None)
+        self.save()
+
+    def upcoming(self, count: int = 5) -> List[Tuple[float, ScheduleEntry]]:
+        """Returns next (fire epoch, entry) pairs, earliest first."""
+
+        pending = sorted((at, entry_id) for entry_id, at in self._next.items())
+        return [(at, self.entries[entry_id]) for at, entry_id in pending[:count]]
+
+    # --- loop ---
+
+    async def _fire(self, entry: ScheduleEntry):
+        manager = self.rooms.get(entry.room)
+        if manager is None:
+            logger.warning("No AC for room {}, skipping {}", entry.room, entry.describe())
+            return
+
+        logger.info("Schedule firing {}", entry.describe())
+        method = getattr(manager, entry.action)
+
+        try:
+            if ACTIONS[entry.action]:
+                await method(entry.value)
+            else:
+                await method()
+
+        except Exception as err:
+            # one failing unit or request shouldn't stop the schedule
+            self.failed += 1
+            logger.warning("Scheduled {} failed - {}: {}", entry.describe(), type(err).__name__, err)
+            return
+
+        self.fired += 1
+
+    async def run(self, *, task_status=trio.TASK_STATUS_IGNORED):
+        """Schedule loop. Run inside a nursery."""
+
+        async with trio.open_nursery() as nursery:
+            task_status.started()
+
+            while True:
+                self._changed = trio.Event()
+                self.reload_if_changed()
+                heap = self._heap
+
+                # drop removed/replaced entries off the top
+                while heap and self._next.get(heap[0][1]) != heap[0][0]:
+                    heapq.heappop(heap)
+
+                # file is polled, as nothing tells when it's edited
+                max_sleep = MAX_SLEEP_SEC if self.path is None else FILE_CHECK_SEC
+
+                if not heap:
+                    with trio.move_on_after(max_sleep):
+                        await self._changed.wait()
+
+                    continue
+
+                fire_at, entry_id = heap[0]
+                delay = fire_at - self.wall_clock()
+
+                if delay > 0:
+                    with trio.move_on_after(min(delay, max_sleep)):
+                        await self._changed.wait()
+
+                    continue
+
+                heapq.heappop(heap)
+                del self._next[entry_id]
+                entry = self.entries[entry_id]
+
+                nursery.start_soon(self._fire, entry)
+
+                if entry.cron is not None:
+                    # from fire time, so late wakeup doesn't fire same minute twice
+                    self._push(entry, max(fire_at, self.wall_clock()))
+                else:
+                    del self.entries[entry_id]
+                    self.save()
+
+
+def _cli():
+    parser = ArgumentParser("Edit AC schedule file")
+    parser.add_argument("path", type=str, help="Schedule json file")
+    parser.add_argument("-r", "--room", type=str, default="default", help="Room of new entry")
+
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="List entries & next fire times")
+
+    rule = sub.add_parser("add", help="Add recurring entry")
+    rule.add_argument("cron", type=str, help="i.e. '0 9 * * 1-5'")
+    rule.add_argument("action", type=str, choices=list(ACTIONS))
+    rule.add_argument("value", type=int, nargs="?", default=None)
+
+    once = sub.add_parser("once", help="Add one-shot entry")
+    once.add_argument("at", type=str, help="Local time, i.e. '2024-05-01 09:00'")
+    once.add_argument("action", type=str, choices=list(ACTIONS))
+    once.add_argument("value", type=int, nargs="?", default=None)
+
+    remove = sub.add_parser("remove", help="Remove entry")
+    remove.add_argument("id", type=str)
+
+    args = parser.parse_args()
+
+    scheduler = Scheduler({}, args.path)
+
+    if args.command == "add":
+        print(scheduler.add_rule(args.cron, args.action, args.value, args.room))
+
+    elif args.command == "once":
+        at = datetime.fromisoformat(args.at).timestamp()
+        print(scheduler.add_once(at, args.action, args.value, args.room))
+
+    elif args.command == "remove":
+        scheduler.remove(args.id)
+
+    else:
+        for at, entry in scheduler.upcoming(len(scheduler.entries)):
+            print(f"{entry.id}  {datetime.fromtimestamp(at):%Y-%m-%d %H:%M}  {entry.describe()}")
+
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,370 @@
+"""
+Local stand-in for the campus AC web remote controller.
+
+Mimics what api.py talks to - login page, webremo page with state images and
+hidden fields, command POSTs - so the app can run end-to-end on any machine.
+
+Like the real one, __VIEWSTATE is bound to login: re-login invalidates
+viewstate every other in-flight request was built with.
+"""
+
+import secrets
+import time
+from argparse import ArgumentParser
+from typing import Callable, Dict
+
+import trio
+from loguru import logger
+
+from tiny_http import Request, Response, serve
+
+
+__all__ = ["StandInController", "RoomModel"]
+
+
+SESSION_COOKIE = "ASP.NET_SessionId"
+
+# btnSubmit (x, y) -> action, mirrors ACManager.btn_action
+BUTTONS = {
+    (94, 40): "on",
+    (108, 40): "off",
+    (95, 35): "temp_down",
+    (41, 37): "temp_up",
+}
+
+# 1x1 gif, served for every state image
+BLANK_GIF = (
+    b"GIF89a\x01\x00\x01\x00\x80\x00\x00\xff\xff\xff\x00\x00\x00!\xf9\x04\x01\x00\x00\x00\x00"
+    b",\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;"
+)
+
+HIDDEN = (
+    '<input type="hidden" name="{0}" id="{0}" value="{1}" />'
+)
+
+LOGIN_PAGE = """<html><body>
+<form method="post" action="./" id="form1">
+{hidden}
+<input name="txtId" type="text" id="txtId" />
+<input name="txtPwd" type="password" id="txtPwd" />
+<input type="submit" name="btnLogin" value="Login" id="btnLogin" />
+</form>
+</body></html>"""
+
+REMOTE_PAGE = """<html><body>
+<form method="post" action="webremo" id="form1">
+{hidden}
+<img id="Image_1" src="images/nn_{mode}.gif" />
+<img id="Image_2" src="images/Tem_{current}.gif" />
+<img id="Image_3" src="images/Tem_{target}.gif" />
+<img id="Image_4" src="images/mm_{speed}.gif" />
+<img id="Image_5" src="images/kk_{angle}.gif" />
+<input type="image" name="btnSubmit" id="btnSubmit" src="images/remo.gif" />
+</form>
+</body></html>"""
+
+
+class RoomModel:
+    def __init__(
+        self,
+        temperature: float = 28.0,
+        ambient: float = 31.0,
+        cooling_rate: float = 0.15,
+        drift_rate: float = 0.05,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Crude room temperature model.
+
+        While unit runs, room cools toward target at cooling_rate degree/min.
+        Otherwise it warms toward ambient at drift_rate degree/min.
+
+        Args:
+            clock: Time source in seconds. Pass virtual clock for deterministic runs.
+        """
+
+        self.temperature = temperature
+        self.ambient = ambient
+        self.cooling_rate = cooling_rate
+        self.drift_rate = drift_rate
+        self.clock = clock
+
+        self._last = clock()
+
+    def advance(self, powered: bool, target: int) -> float:
+        """Integrates temperature up to now with unit state held since last call."""
+
+        now = self.clock()
+        minutes = (now - self._last) / 60
+        self._last = now
+
+        if powered and self.temperature > target:
+            self.temperature = max(target, self.temperature - self.cooling_rate * minutes)
+
+        elif self.temperature < self.ambient:
+            self.temperature = min(self.ambient, self.temperature + self.drift_rate * minutes)
+
+        return self.temperature
+
+
+class StandInController:
+    def __init__(
+        self,
+        id_="test",
+        password="test",
+        session_timeout=0.0,
+        auto_off=0.0,
+        room: RoomModel = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Single AC unit with web remote.
+
+        Args:
+            id_: Login id
+            password: Login password
+            session_timeout: Seconds until session logs out. 0 to never.
+            auto_off: Seconds until unit turns itself off after power on. 0 to never.
+            room: Room model current temp follows. Fixed current_temp if None.
+            clock: Time source for session timeout & auto off.
+        """
+
+        self.id = id_
+        self.password = password
+        self.session_timeout = session_timeout
+        self.auto_off = auto_off
+
+        # hdnNo fields as the page carries them
+        self.fields: Dict[str, int] = {
+            "hdnNo_1": 0,
+            "hdnNo_2": 25,
+            "hdnNo_3": 1,
+            "hdnNo_4": 26,
+            "hdnNo_5": 0,
+            "hdnNo_6": 0,
+            "hdnNo_7": 0,
+            "hdnNo_8": 1,
+            "hdnNo_10": 2,
+            "hdnNo_11": 1,
+            "hdnNo_12": 29,
+            "hdnNo_13": 25,
+            "hdnNo_14": 1,
+            "hdnNo_15": 1,
+            "hdnNo_16": 1,
+            "hdnNo_17": 1,
+            "hdnNo_18": 1,
+        }
+        self.room = room
+        self.clock = clock
+        self._current_temp = 28
+        self.powered_at = 0.0
+
+        # session id -> {"logged_in", "viewstate", "seen"}
+        self.sessions: Dict[str, dict] = {}
+
+        self.stats = {"login": 0, "page": 0, "command": 0, "rejected": 0}
+
+    # --- state ---
+
+    @property
+    def current_temp(self) -> int:
+        if self.room is None:
+            return self._current_temp
+
+        return round(self.room.advance(self.is_powered, self.fields["hdnNo_4"]))
+
+    @current_temp.setter
+    def current_temp(self, value: int):
+        self._current_temp = value
+
+    @property
+    def is_powered(self) -> bool:
+        if self.auto_off and self.fields["hdnNo_1"] and self.clock() - self.powered_at > self.auto_off:
+            self.fields["hdnNo_1"] = 0
+
+        return bool(self.fields["hdnNo_1"])
+
+    def apply(self, form: Dict[str, str]):
+        """Applies command. Raises ValueError if it's not allowed."""
+
+        action = BUTTONS.get((int(form.get("btnSubmit.x", 0)), int(form.get("btnSubmit.y", 0))))
+
+        # room evolved with old state until now
+        if self.room is not None:
+            self.room.advance(self.is_powered, self.fields["hdnNo_4"])
+        target = int(form.get("hdnNo_4", self.fields["hdnNo_4"]))
+        power_perm = self.fields["hdnNo_6"]
+
+        if action == "on":
+            if power_perm != 0:
+                raise ValueError("No permission to power on")
+
+            self.fields["hdnNo_1"] = 1
+            self.powered_at = self.clock()
+
+        elif action == "off":
+            if power_perm not in (0, 2):
+                raise ValueError("No permission to power off")
+
+            self.fields["hdnNo_1"] = 0
+
+        if not self.fields["hdnNo_13"] <= target < self.fields["hdnNo_12"]:
+            raise ValueError(f"Target temp {target} out of range")
+
+        self.fields["hdnNo_4"] = target
+
+        # wind speed & angle are taken as sent
+        for key, modes in (("hdnNo_10", 4), ("hdnNo_11", 3)):
+            value = int(form.get(key, self.fields[key]))
+            if not 0 <= value < modes:
+                raise ValueError(f"{key} {value} out of range")
+
+            self.fields[key] = value
+
+    # --- sessions ---
+
+    def _session(self, request: Request):
+        """Returns (session id, session), creating new one if needed."""
+
+        sid = request.cookies.get(SESSION_COOKIE)
+        session = self.sessions.get(sid)
+
+        if session is None:
+            sid = secrets.token_hex(12)
+            session = self.sessions[sid] = {
+                "logged_in": False,
+                "viewstate": secrets.token_urlsafe(24),
+                "seen": self.clock(),
+            }
+
+        if self.session_timeout and self.clock() - session["seen"] > self.session_timeout:
+            session["logged_in"] = False
+
+        session["seen"] = self.clock()
+        return sid, session
+
+    @staticmethod
+    def _hidden(session, extra: Dict[str, int] = None) -> str:
+        values = {
+            "__VIEWSTATE": session["viewstate"],
+            "__VIEWSTATEGENERATOR": "CA0B0334",
+            "__EVENTVALIDATION": session["viewstate"][::-1],
+            **(extra or {}),
+        }
+        return "\n".join(HIDDEN.format(k, v) for k, v in values.items())
+
+    def _login_page(self, sid, session) -> Response:
+        return Response(
+            LOGIN_PAGE.format(hidden=self._hidden(session)),
+            content_type="text/html; charset=utf-8",
+            headers={"Set-Cookie": f"{SESSION_COOKIE}={sid}; path=/; HttpOnly"},
+        )
+
+    def _remote_page(self, session) -> Response:
+        self.stats["page"] += 1
+        self.fields["hdnNo_1"] = int(self.is_powered)
+
+        return Response(
+            REMOTE_PAGE.format(
+                hidden=self._hidden(session, self.fields),
+                mode=self.fields["hdnNo_3"],
+                current=self.current_temp,
+                target=self.fields["hdnNo_4"],
+                speed=self.fields["hdnNo_10"],
+                angle=self.fields["hdnNo_11"],
+            ),
+            content_type="text/html; charset=utf-8",
+        )
+
+    # --- routes ---
+
+    async def handle(self, request: Request) -> Response:
+        sid, session = self._session(request)
+
+        if request.path == "/_stats":
+            return Response.json(self.stats)
+
+        if request.path.startswith("/images/"):
+            return Response(BLANK_GIF, content_type="image/gif")
+
+        if request.path == "/":
+            if request.method == "POST":
+                return self._login(sid, session, request.form())
+
+            if session["logged_in"]:
+                return Response.redirect("/webremo")
+
+            return self._login_page(sid, session)
+
+        if request.path == "/webremo":
+            if not session["logged_in"]:
+                return Response.redirect("/")
+
+            if request.method == "POST":
+                return self._command(session, request.form())
+
+            return self._remote_page(session)
+
+        return Response("Not Found", 404)
+
+    def _login(self, sid, session, form) -> Response:
+        if form.get("__VIEWSTATE") != session["viewstate"]:
+            self.stats["rejected"] += 1
+            return Response("Invalid viewstate", 500)
+
+        if (form.get("txtId"), form.get("txtPwd")) != (self.id, self.password):
+            return self._login_page(sid, session)
+
+        # new login, new viewstate - whatever was built with old one is now stale.
+        self.stats["login"] += 1
+        session["logged_in"] = True
+        session["viewstate"] = secrets.token_urlsafe(24)
+
+        return Response.redirect(
+            "/webremo", {"Set-Cookie": f"{SESSION_COOKIE}={sid}; path=/; HttpOnly"}
+        )
+
+    def _command(self, session, form) -> Response:
+        if form.get("__VIEWSTATE") != session["viewstate"]:
+            self.stats["rejected"] += 1
+            return Response("Invalid viewstate", 500)
+
+        try:
+            self.apply(form)
+        except (ValueError, KeyError) as err:
+            self.stats["rejected"] += 1
+            return Response(f"Rejected: {err}", 500)
+
+        self.stats["command"] += 1
+        return self._remote_page(session)
+
+
+async def main(args):
+    controller = StandInController(args.id, args.pw, args.session_timeout, args.auto_off)
+    controller.current_temp = args.current_temp
+    controller.fields["hdnNo_6"] = args.power_permission
+
+    logger.info("Stand-in controller at http://{}:{}/", args.host, args.port)
+    await serve(controller.handle, args.port, args.host)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser("Stand-in AC web remote")
+
+    parser.add_argument("-p", "--port", type=int, default=8080, help="Port to listen")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to bind")
+    parser.add_argument("--id", type=str, default="test", help="Login ID")
+    parser.add_argument("--pw", type=str, default="test", help="Login PW")
+    parser.add_argument("-c", "--current-temp", type=int, default=28, help="Room temp")
+    parser.add_argument(
+        "--power-permission",
+        type=int,
+        default=0,
+        help="hdnNo_6 - 0 on/off allowed, 2 off only, else none",
+    )
+    parser.add_argument(
+        "--session-timeout", type=float, default=0, help="Seconds until logout, 0 to never"
+    )
+    parser.add_argument(
+        "--auto-off", type=float, default=0, help="Seconds until unit turns off, 0 to never"
+    )
+
+    trio.run(main, parser.parse_args())
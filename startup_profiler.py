@@ -0,0 +1,88 @@
+"""
+Startup phase timer, to keep time-to-first-frame visible on weak devices.
+
+Imports nothing heavy on purpose - it's imported before anything else.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import List, Tuple, Union
+
+
+__all__ = ["StartupProfiler"]
+
+
+def _process_age() -> Union[float, None]:
+    """Seconds since process creation, read from procfs.
+    Includes interpreter boot which perf_counter can't see. None if unavailable."""
+
+    try:
+        with open("/proc/self/stat") as fp:
+            # comm field may contain spaces, so split after closing parenthesis
+            start_ticks = int(fp.read().rsplit(")", 1)[1].split()[19])
+
+        with open("/proc/uptime") as fp:
+            uptime = float(fp.read().split()[0])
+
+    except (OSError, IndexError, ValueError):
+        return None
+
+    import os
+
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+
+class StartupProfiler:
+    def __init__(self, enabled=True):
+        """Records duration of each startup phase.
+
+        Args:
+            enabled: When False phase() does nothing and report() is empty.
+        """
+
+        self.enabled = enabled
+
+        self._origin = time.perf_counter()
+        self._boot_offset = _process_age() if enabled else None
+
+        self.phases: List[Tuple[str, float]] = []
+        self.marks: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times code within the block as a phase named `name`."""
+
+        if not self.enabled:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def mark(self, name: str):
+        """Records time elapsed since profiler creation, i.e. 'first frame'."""
+
+        if self.enabled:
+            self.marks.append((name, time.perf_counter() - self._origin))
+
+    def report(self) -> List[str]:
+        """Returns human-readable report lines."""
+
+        if not self.enabled:
+            return []
+
+        lines = [f"{name:<24} {sec * 1000:8.1f} ms" for name, sec in self.phases]
+        lines.append(f"{'total (phases)':<24} {sum(s for _, s in self.phases) * 1000:8.1f} ms")
+
+        if self._boot_offset is not None:
+            lines.append(f"{'before profiler':<24} {self._boot_offset * 1000:8.1f} ms")
+
+        # marks are counted from process creation when procfs is available
+        offset = self._boot_offset or 0.0
+        for name, sec in self.marks:
+            lines.append(f"{'until ' + name:<24} {(sec + offset) * 1000:8.1f} ms")
+
+        return lines
@@ -0,0 +1,184 @@
+"""
+Closed-loop room temperature control.
+
+Controller's own target is limited to a narrow range and units get turned off
+centrally every now and then, so this holds desired room temp by switching
+power with hysteresis and keeping target temp as close to setpoint as allowed.
+Unit cools room down to its target at best, so it's turned off once room reaches
+setpoint, and on again once room is hysteresis above it. Only cooling is
+controlled - while unit is set to heating or fan only, thermostat stands by.
+
+Commands are only sent when decision changes, and power isn't toggled again
+before minimum on/off dwell time passes - compressor doesn't like short cycles,
+and controller doesn't like request spam.
+
+decide() is pure, so control logic can be checked without any network or clock.
+"""
+
+from typing import Callable, Optional, Tuple, Union
+
+import trio
+from loguru import logger
+
+from api import ACPermissionDenied, ACRequestFailed
+
+
+__all__ = ["Thermostat"]
+
+
+Action = Tuple[str, Union[int, None]]
+
+
+class Thermostat:
+    def __init__(
+        self,
+        manager,
+        setpoint: float,
+        hysteresis: float = 1.0,
+        min_on_sec: float = 600,
+        min_off_sec: float = 300,
+        interval_sec: float = 60,
+        clock: Callable[[], float] = trio.current_time,
+    ):
+        """Cooling thermostat over ACManager.
+
+        Args:
+            manager: ACManager of the room.
+            setpoint: Desired room temp.
+            hysteresis: Unit turns on at setpoint + hysteresis, off at setpoint.
+            min_on_sec: Minimum time unit stays on once turned on.
+            min_off_sec: Minimum time unit stays off once turned off.
+            interval_sec: Seconds between readings.
+            clock: Time source for dwell times.
+        """
+
+        self.manager = manager
+        self.setpoint = setpoint
+        self.hysteresis = hysteresis
+        self.min_on_sec = min_on_sec
+        self.min_off_sec = min_off_sec
+        self.interval_sec = interval_sec
+        self.clock = clock
+
+        # time of last power change. -inf so first decision isn't held back.
+        self._switched_at = float("-inf")
+
+        # unit's mode while standing by, so it's logged once
+        self._standby_mode: Union[str, None] = None
+
+        # stats
+        self.commands = 0
+        self.switches = 0
+        self.readings = 0
+
+    def _target(self, bounds: Tuple[int, int]) -> int:
+        """Setpoint clamped into range controller accepts."""
+
+        lower, upper = bounds
+        return max(lower, min(upper - 1, round(self.setpoint)))
+
+    def decide(
+        self, now: float, current: int, powered: bool, target: int, bounds: Tuple[int, int]
+    ) -> Optional[Action]:
+        """Returns cooling action to take for given reading, or None. Pure, doesn't touch manager.
+
+        Args:
+            now: Current time in clock's domain.
+            current: Room temp.
+            powered: Whether unit is on.
+            target: Unit's current target temp.
+            bounds: Controller's (lower, upper) target temp bounds, upper exclusive.
+        """
+
+        dwell = now - self._switched_at
+        wanted = self._target(bounds)
+
+        if not powered:
+            if current >= self.setpoint + self.hysteresis and dwell >= self.min_off_sec:
+                # power on request carries target too, no separate set_temp needed
+                return "power_on", wanted
+
+            return None
+
+        if current <= self.setpoint and dwell >= self.min_on_sec:
+            return "power_off", None
+
+        # target only matters while running
+        if target != wanted:
+            return "set_temp", wanted
+
+        return None
+
+    async def step(self):
+        """Takes one reading and acts on it. Failures are logged and left to next reading."""
+
+        try:
+            state = await self.manager.update()
+
+        except ACRequestFailed as err:
+            logger.warning("Thermostat can't read room - {}: {}", type(err).__name__, err)
+            return
+
+        self.readings += 1
+
+        # switching power in heating or fan mode would work against holding temp
+        mode = state.operation_mode
+        if mode != "Cooling":
+            if mode != self._standby_mode:
+                logger.warning("Thermostat standing by, unit is in {} mode", mode)
+                self._standby_mode = mode
+
+            return
+
+        if self._standby_mode is not None:
+            logger.info("Thermostat resumed, unit is back in Cooling mode")
+            self._standby_mode = None
+
+        now = self.clock()
+        decision = self.decide(
+            now,
+            state.current_temp,
+            self.manager.is_powered,
+            self.manager.target_temp,
+            (self.manager.lower_bound, self.manager.upper_bound),
+        )
+
+        if decision is None:
+            return
+
+        action, value = decision
+        logger.info(
+            "Thermostat {} (room {} / setpoint {})", action, state.current_temp, self.setpoint
+        )
+
+        try:
+            if action == "set_temp":
+                await self.manager.set_temp(value)
+
+            elif action == "power_on":
+                await self.manager.power_on(value)
+                self._switched_at = now
+
+            else:
+                await self.manager.power_off()
+                self._switched_at = now
+
+        except (ACPermissionDenied, ACRequestFailed) as err:
+            # power switching is taken away centrally at times, controller drops off
+            # network at others. Either way retried on next reading.
+            logger.warning("Thermostat can't {} - {}: {}", action, type(err).__name__, err)
+            return
+
+        self.commands += 1
+
+        if action != "set_temp":
+            self.switches += 1
+
+    async def run(self):
+        """Control loop. Run inside a nursery."""
+
+        logger.debug("Thermostat started, setpoint {}", self.setpoint)
+
+        while True:
+            await self.step()
+            await trio.sleep(self.interval_sec)
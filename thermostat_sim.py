@@ -0,0 +1,95 @@
+"""
+Runs Thermostat against stand-in controller with simulated room.
+
+Room and controller follow a virtual clock advanced by this script, so hours of
+control run in seconds and results don't depend on machine speed - same
+arguments always give same output. Requests still go over local HTTP, through
+the real ACManager.
+"""
+
+import statistics
+from argparse import ArgumentParser
+
+import trio
+from loguru import logger
+
+from stand_in_server import StandInController, RoomModel
+from tiny_http import serve
+from api import ACManager
+from thermostat import Thermostat
+
+
+class VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def main(args):
+    clock = VirtualClock()
+
+    room = RoomModel(args.room_temp, args.ambient, clock=clock)
+    controller = StandInController(room=room, clock=clock)
+
+    async with trio.open_nursery() as nursery:
+        listeners = await nursery.start(serve, controller.handle, 0)
+        port = listeners[0].socket.getsockname()[1]
+
+        # rate limit runs on trio's clock, which doesn't move with virtual one
+        ac_mgr = ACManager(f"127.0.0.1:{port}", controller.id, controller.password, rate_limit=0)
+        await ac_mgr.login()
+
+        thermostat = Thermostat(
+            ac_mgr,
+            args.setpoint,
+            args.hysteresis,
+            args.min_on,
+            args.min_off,
+            args.interval,
+            clock=clock,
+        )
+
+        temps = []
+        steps = int(args.hours * 3600 / args.interval)
+
+        for _ in range(steps):
+            clock.now += args.interval
+            await thermostat.step()
+            temps.append(room.temperature)
+
+        nursery.cancel_scope.cancel()
+
+    in_band = sum(abs(temp - args.setpoint) <= args.hysteresis for temp in temps)
+
+    logger.info("Simulated {} h, {} readings", args.hours, thermostat.readings)
+    logger.info("Commands sent            : {}", thermostat.commands)
+    logger.info("Power on/off switches    : {}", thermostat.switches)
+    logger.info("Controller stats         : {}", controller.stats)
+    logger.info(
+        "Room temp                : min {:.2f} / mean {:.2f} / max {:.2f}",
+        min(temps), statistics.mean(temps), max(temps),
+    )
+    logger.info("Time within hysteresis   : {:.1f} %", in_band / len(temps) * 100)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser("Thermostat simulation")
+
+    parser.add_argument("--hours", type=float, default=24, help="Simulated duration")
+    parser.add_argument("-s", "--setpoint", type=float, default=26, help="Desired room temp")
+    parser.add_argument("--hysteresis", type=float, default=1.0, help="Hysteresis in degrees")
+    parser.add_argument("--min-on", type=float, default=600, help="Minimum on time in seconds")
+    parser.add_argument("--min-off", type=float, default=300, help="Minimum off time in seconds")
+    parser.add_argument("-i", "--interval", type=float, default=60, help="Seconds between readings")
+    parser.add_argument("--room-temp", type=float, default=30, help="Initial room temp")
+    parser.add_argument("--ambient", type=float, default=31, help="Temp room drifts toward")
+    parser.add_argument("--log-level", type=str, default="INFO", help="Minimum log level")
+
+    args_ = parser.parse_args()
+
+    logger.remove()
+    logger.add(lambda msg: print(msg, end=""), level=args_.log_level)
+
+    trio.run(main, args_)
@@ -0,0 +1,334 @@
+"""
+Minimal HTTP/1.1 server on trio.
+
+Just enough for local tooling - no chunked requests, no TLS.
+Handler receives Request and returns Response.
+
+WebSocket.accept() upgrades request's connection for handlers that push data,
+handler then returns None as it owns the stream.
+"""
+
+import json
+import struct
+import base64
+import hashlib
+from typing import Awaitable, Callable, Dict, Union
+from urllib.parse import parse_qsl, urlsplit
+
+import trio
+from loguru import logger
+
+
+__all__ = ["Request", "Response", "WebSocket", "serve"]
+
+
+MAX_HEADER_SIZE = 16 * 1024
+
+REASONS = {
+    200: "OK",
+    101: "Switching Protocols",
+    204: "No Content",
+    302: "Found",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    502: "Bad Gateway",
+    503: "Service Unavailable",
+}
+
+
+class Request:
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes, stream):
+        """Parsed request. Header names are lower-cased."""
+
+        self.method = method
+        self.target = target
+        self.headers = headers
+        self.body = body
+
+        # raw connection, for protocol upgrades
+        self.stream: trio.SocketStream = stream
+
+        split = urlsplit(target)
+        self.path = split.path
+        self.query = dict(parse_qsl(split.query))
+
+    @property
+    def cookies(self) -> Dict[str, str]:
+        pairs = (part.strip().partition("=") for part in self.headers.get("cookie", "").split(";"))
+        return {k: v for k, _, v in pairs if k}
+
+    def form(self) -> Dict[str, str]:
+        return dict(parse_qsl(self.body.decode(), keep_blank_values=True))
+
+    def json(self):
+        return json.loads(self.body or b"null")
+
+
+class Response:
+    def __init__(
+        self,
+        body: Union[bytes, str] = b"",
+        status: int = 200,
+        content_type: str = "text/plain; charset=utf-8",
+        headers: Dict[str, str] = None,
+    ):
+        self.body = body.encode() if isinstance(body, str) else body
+        self.status = status
+        self.headers = {"Content-Type": content_type, **(headers or {})}
+
+    @classmethod
+    def json(cls, obj, status: int = 200):
+        return cls(json.dumps(obj), status, "application/json")
+
+    @classmethod
+    def redirect(cls, location: str, headers: Dict[str, str] = None):
+        return cls(b"", 302, headers={"Location": location, **(headers or {})})
+
+    def encode(self) -> bytes:
+        lines = [f"HTTP/1.1 {self.status} {REASONS.get(self.status, '')}"]
+        lines += [f"{k}: {v}" for k, v in self.headers.items()]
+        lines.append(f"Content-Length: {len(self.body)}")
+
+        return ("\r\n".join(lines) + "\r\n\r\n").encode() + self.body
+
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# largest client frame accepted, clients here only send short control messages
+WS_MAX_FRAME = 64 * 1024
+
+WS_TEXT, WS_BINARY, WS_CLOSE, WS_PING, WS_PONG = 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+class WebSocket:
+    def __init__(self, stream: trio.SocketStream):
+        """Server side of RFC 6455 connection. Use accept() to create."""
+
+        self.stream = stream
+        self.closed = False
+
+        self._buffer = bytearray()
+        self._send_lock = trio.Lock()
+
+    @classmethod
+    async def accept(cls, request: Request) -> "WebSocket":
+        """Completes upgrade handshake of request.
+
+        Raises:
+            ValueError: If request isn't websocket upgrade.
+        """
+
+        key = request.headers.get("sec-websocket-key")
+        if request.headers.get("upgrade", "").lower() != "websocket" or not key:
+            raise ValueError("Not a websocket upgrade request")
+
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+
+        # written by hand, 101 must not carry Content-Length
+        await request.stream.send_all(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode()
+        )
+
+        return cls(request.stream)
+
+    async def _send_frame(self, opcode: int, payload: bytes):
+        length = len(payload)
+
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 65536:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+
+        async with self._send_lock:
+            await self.stream.send_all(header + payload)
+
+    async def _read_exact(self, size: int) -> bytes:
+        while len(self._buffer) < size:
+            chunk = await self.stream.receive_some()
+            if not chunk:
+                raise trio.BrokenResourceError("Connection closed")
+
+            self._buffer += chunk
+
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    async def _read_frame(self):
+        first, second = await self._read_exact(2)
+
+        opcode = first & 0x0F
+        length = second & 0x7F
+
+        if length == 126:
+            (length,) = struct.unpack("!H", await self._read_exact(2))
+        elif length == 127:
+            (length,) = struct.unpack("!Q", await self._read_exact(8))
+
+        if length > WS_MAX_FRAME:
+            raise ValueError(f"Frame of {length} bytes too large")
+
+        # client frames are always masked
+        mask = await self._read_exact(4) if second & 0x80 else b"\0\0\0\0"
+        payload = bytes(b ^ mask[idx % 4] for idx, b in enumerate(await self._read_exact(length)))
+
+        return bool(first & 0x80), opcode, payload
+
+    async def send(self, message: Union[str, bytes]):
+        """Sends text frame for str, binary for bytes."""
+
+        if isinstance(message, str):
+            await self._send_frame(WS_TEXT, message.encode())
+        else:
+            await self._send_frame(WS_BINARY, message)
+
+    async def receive(self) -> Union[str, bytes, None]:
+        """Returns next message, None once closed. Answers pings meanwhile."""
+
+        parts = []
+        kind = WS_TEXT
+
+        while not self.closed:
+            fin, opcode, payload = await self._read_frame()
+
+            if opcode == WS_CLOSE:
+                await self.close()
+                return None
+
+            if opcode == WS_PING:
+                await self._send_frame(WS_PONG, payload)
+                continue
+
+            if opcode == WS_PONG:
+                continue
+
+            # 0 is continuation of fragmented message
+            if opcode:
+                kind = opcode
+
+            parts.append(payload)
+
+            if fin:
+                data = b"".join(parts)
+                return data.decode() if kind == WS_TEXT else data
+
+        return None
+
+    async def close(self):
+        if self.closed:
+            return
+
+        self.closed = True
+
+        try:
+            await self._send_frame(WS_CLOSE, b"")
+        except (trio.BrokenResourceError, trio.ClosedResourceError):
+            pass
+
+
+# Handler returning None means it took over request.stream - connection isn't reused.
+Handler = Callable[[Request], Awaitable[Union[Response, None]]]
+
+
+async def _read_request(stream: trio.SocketStream, buffer: bytearray) -> Union[Request, None]:
+    """Reads one request. Leftover bytes stay in buffer for next one."""
+
+    while (end := buffer.find(b"\r\n\r\n")) < 0:
+        if len(buffer) > MAX_HEADER_SIZE:
+            raise ValueError("Header too large")
+
+        chunk = await stream.receive_some()
+        if not chunk:
+            return None
+
+        buffer += chunk
+
+    head = buffer[:end].decode("latin-1").split("\r\n")
+    del buffer[:end + 4]
+
+    method, target, _ = head[0].split(" ", 2)
+    headers = {}
+
+    for line in head[1:]:
+        key, _, value = line.partition(":")
+        headers[key.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0))
+
+    while len(buffer) < length:
+        chunk = await stream.receive_some()
+        if not chunk:
+            return None
+
+        buffer += chunk
+
+    body = bytes(buffer[:length])
+    del buffer[:length]
+
+    return Request(method, target, headers, body, stream)
+
+
+def _connection_handler(handler: Handler):
+    async def handle(stream: trio.SocketStream):
+        buffer = bytearray()
+
+        try:
+            async with stream:
+                while True:
+                    request = await _read_request(stream, buffer)
+                    if request is None:
+                        return
+
+                    try:
+                        response = await handler(request)
+                    except Exception as err:
+                        logger.exception("Handler failed on {} {}", request.method, request.path)
+                        response = Response(f"{type(err).__name__}: {err}", 500)
+
+                    if response is None:
+                        return
+
+                    await stream.send_all(response.encode())
+
+                    if request.headers.get("connection", "").lower() == "close":
+                        return
+
+        except (trio.BrokenResourceError, trio.ClosedResourceError, ValueError):
+            pass
+
+    return handle
+
+
+async def serve(
+    handler: Handler,
+    port: int,
+    host: str = "127.0.0.1",
+    *,
+    task_status=trio.TASK_STATUS_IGNORED,
+):
+    """Serves forever. Use nursery.start() to wait until it's listening.
+
+    Args:
+        handler: Async function receiving Request and returning Response
+        port: Port to listen. 0 picks a free one - actual port is in task_status value.
+        host: Address to bind.
+    """
+
+    listeners = await trio.open_tcp_listeners(port, host=host)
+    logger.debug("Listening on {}:{}", host, listeners[0].socket.getsockname()[1])
+
+    await trio.serve_listeners(
+        _connection_handler(handler), listeners, task_status=task_status
+    )
@@ -3,3 +3,6 @@ Touch driver
 """
 
 from .touch_driver import *
+from .calibration import *
+from .filters import *
+from .sources import *
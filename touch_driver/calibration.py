@@ -0,0 +1,128 @@
+"""
+Touch calibration.
+
+Raw touch coordinate is mapped to pixel with affine matrix:
+    px = a * x + b * y + c
+    py = d * x + e * y + f
+
+Coefficients are kept in integer fixed-point, so each conversion is
+4 multiplications and 2 shifts - no float division, no extra calls.
+Rotated or skewed panels are handled by 3-point calibration.
+"""
+
+from typing import Iterable, List, Sequence, Tuple, Dict, Any
+
+
+__all__ = ["Calibration"]
+
+
+FIXED_SHIFT = 16
+
+Point = Tuple[int, int]
+
+
+class Calibration:
+    def __init__(self, dim: Sequence[int], coefficients: Sequence[float]):
+        """Affine touch calibration.
+
+        Args:
+            dim: Screen (width, height) in pixels
+            coefficients: (a, b, c, d, e, f) of the affine matrix
+        """
+
+        self.dim = tuple(dim)
+        self.coefficients = tuple(coefficients)
+
+        a, b, c, d, e, f = (round(v * (1 << FIXED_SHIFT)) for v in self.coefficients)
+
+        # This need to be really fast - bind all in locals, no attribute lookups.
+        def convert(x: int, y: int) -> Point:
+            return (a * x + b * y + c) >> FIXED_SHIFT, (d * x + e * y + f) >> FIXED_SHIFT
+
+        def convert_many(samples: Iterable[Point]) -> List[Point]:
+            return [
+                ((a * x + b * y + c) >> FIXED_SHIFT, (d * x + e * y + f) >> FIXED_SHIFT)
+                for x, y in samples
+            ]
+
+        self.convert = convert
+        self.convert_many = convert_many
+
+    def to_raw(self, px: int, py: int) -> Point:
+        """Inverse of convert, for generating touch traces. Not meant to be fast."""
+
+        a, b, c, d, e, f = self.coefficients
+        det = a * e - b * d
+
+        x, y = px - c, py - f
+        return round((e * x - b * y) / det), round((a * y - d * x) / det)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.dim}, {self.coefficients})"
+
+    @classmethod
+    def from_linear(cls, dim: Sequence[int], hw_origin: Point, hw_end: Point):
+        """Creates axis-aligned calibration from HW origin & end coordinates.
+        origin & end is found in `xorg.conf.d/99-calibration.conf`'s Calibration.
+        Reversed axis (end < origin) is just negative scale.
+        """
+
+        x_ori, y_ori = hw_origin
+        x_end, y_end = hw_end
+
+        x_scale = dim[0] / (x_end - x_ori)
+        y_scale = dim[1] / (y_end - y_ori)
+
+        return cls(dim, (x_scale, 0.0, -x_ori * x_scale, 0.0, y_scale, -y_ori * y_scale))
+
+    @classmethod
+    def from_points(
+        cls, dim: Sequence[int], raw_points: Sequence[Point], screen_points: Sequence[Point]
+    ):
+        """Solves affine matrix from 3 raw touch points and their pixel positions.
+
+        Raises:
+            ValueError: If points are collinear
+        """
+
+        (x0, y0), (x1, y1), (x2, y2) = raw_points
+
+        det = x0 * (y1 - y2) + x1 * (y2 - y0) + x2 * (y0 - y1)
+        if det == 0:
+            raise ValueError("Calibration points must not be on a line.")
+
+        def solve(t0, t1, t2):
+            return (
+                (t0 * (y1 - y2) + t1 * (y2 - y0) + t2 * (y0 - y1)) / det,
+                (x0 * (t1 - t2) + x1 * (t2 - t0) + x2 * (t0 - t1)) / det,
+                (
+                    x0 * (y1 * t2 - y2 * t1)
+                    + x1 * (y2 * t0 - y0 * t2)
+                    + x2 * (y0 * t1 - y1 * t0)
+                ) / det,
+            )
+
+        xs, ys = zip(*screen_points)
+        return cls(dim, solve(*xs) + solve(*ys))
+
+    @classmethod
+    def from_entry(cls, entry):
+        """Creates calibration from lcd_data.json entry.
+
+        Accepts either legacy `[dim, [origin, end]]` or dict with `dim` and
+        one of `affine` (6 coefficients) or `linear` ([origin, end]).
+        """
+
+        if isinstance(entry, list):
+            dim, (origin, end) = entry
+            return cls.from_linear(dim, origin, end)
+
+        if "affine" in entry:
+            return cls(entry["dim"], entry["affine"])
+
+        return cls.from_linear(entry["dim"], *entry["linear"])
+
+    def to_entry(self) -> Dict[str, Any]:
+        """Returns lcd_data.json entry of this calibration."""
+
+        return {"dim": list(self.dim), "affine": list(self.coefficients)}
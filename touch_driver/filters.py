@@ -0,0 +1,140 @@
+"""
+Touch sample filtering.
+
+Resistive panels report noisy ABS_X/ABS_Y stream, especially right after
+touching down and right before lifting. This keeps median of last N samples
+and rejects touches that are too light, too short or too long.
+
+Fed one event at a time, so memory use is constant regardless of touch length.
+"""
+
+from collections import deque
+from typing import Tuple, Union
+
+from evdev.ecodes import EV_ABS, EV_KEY, EV_SYN, ABS_X, ABS_Y, ABS_PRESSURE, BTN_TOUCH, SYN_REPORT
+
+
+__all__ = ["TouchFilter"]
+
+
+class TouchFilter:
+    def __init__(
+        self,
+        median: int = 5,
+        min_pressure: int = 0,
+        min_duration_ms: int = 0,
+        max_duration_ms: Union[int, None] = None,
+        min_samples: int = 1,
+    ):
+        """Median & threshold filter over evdev event stream.
+
+        Args:
+            median: Number of last samples to take median from.
+            min_pressure: Samples with ABS_PRESSURE below this are ignored.
+                Ignored if device doesn't report pressure.
+            min_duration_ms: Touches shorter than this are rejected as bounce.
+            max_duration_ms: Touches longer than this are rejected. None to disable.
+            min_samples: Touches with fewer accepted samples than this are rejected.
+        """
+
+        self.min_pressure = min_pressure
+        self.min_duration = min_duration_ms / 1000
+        self.max_duration = max_duration_ms / 1000 if max_duration_ms else float("inf")
+        self.min_samples = min_samples
+
+        self._xs = deque(maxlen=median)
+        self._ys = deque(maxlen=median)
+
+        # latest axis values, paired up on every SYN_REPORT. Kept between touches -
+        # evdev only reports axes that changed, and may report them before BTN_TOUCH.
+        self._x: Union[int, None] = None
+        self._y: Union[int, None] = None
+        self._pressure: Union[int, None] = None
+
+        # axis reported since last release, so SYN_REPORT belongs to a touch
+        self._moved = False
+
+        self._down_at: Union[float, None] = None
+
+        # stats
+        self.accepted = 0
+        self.rejected = 0
+
+        # event timestamp of last accepted touch's release
+        self.last_release = 0.0
+
+    def reset(self):
+        """Ends current touch. Axis values are kept, see __init__."""
+
+        self._xs.clear()
+        self._ys.clear()
+        self._down_at = None
+        self._moved = False
+
+    def feed(self, ev) -> Union[Tuple[int, int], None]:
+        """Feeds one evdev event.
+
+        Returns:
+            Filtered raw (x, y) when touch is released and accepted, otherwise None.
+        """
+
+        if ev.type == EV_ABS:
+            if ev.code == ABS_X:
+                self._x = ev.value
+                self._moved = True
+            elif ev.code == ABS_Y:
+                self._y = ev.value
+                self._moved = True
+            elif ev.code == ABS_PRESSURE:
+                self._pressure = ev.value
+
+        elif ev.type == EV_SYN and ev.code == SYN_REPORT:
+            if self._x is None or self._y is None:
+                return None
+
+            # i.e. report carrying the release, nothing touched since
+            if self._down_at is None and not self._moved:
+                return None
+
+            if self._pressure is not None and self._pressure < self.min_pressure:
+                return None
+
+            # down event might be missing, so count from first sample then.
+            if self._down_at is None:
+                self._down_at = ev.timestamp()
+
+            self._xs.append(self._x)
+            self._ys.append(self._y)
+
+        elif ev.type == EV_KEY and ev.code == BTN_TOUCH:
+            if ev.value:
+                # samples before press in the same touch are kept too
+                if self._down_at is None:
+                    self._down_at = ev.timestamp()
+                return None
+
+            return self._release(ev.timestamp())
+
+        return None
+
+    def _release(self, timestamp: float) -> Union[Tuple[int, int], None]:
+        xs, ys = self._xs, self._ys
+        down_at = self._down_at
+
+        if (
+            down_at is None
+            or len(xs) < self.min_samples
+            or not (self.min_duration <= timestamp - down_at <= self.max_duration)
+        ):
+            self.rejected += 1
+            self.reset()
+            return None
+
+        mid = len(xs) // 2
+        touch = sorted(xs)[mid], sorted(ys)[mid]
+
+        self.reset()
+
+        self.accepted += 1
+        self.last_release = timestamp
+        return touch
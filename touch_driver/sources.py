@@ -0,0 +1,113 @@
+"""
+Touch event sources other than real evdev device.
+
+ScriptedTouchSource replays recorded or generated event trace, so touch
+handling can run on any machine - deterministically, same trace every time.
+"""
+
+import json
+import time
+from typing import Callable, Iterable, List, Sequence, Tuple, Union
+
+from evdev import InputEvent
+from evdev.ecodes import EV_ABS, EV_KEY, EV_SYN, ABS_X, ABS_Y, BTN_TOUCH, SYN_REPORT
+
+
+__all__ = ["ScriptedTouchSource"]
+
+
+# (seconds since replay start, type, code, value)
+TraceEntry = Tuple[float, int, int, int]
+
+
+class ScriptedTouchSource:
+    def __init__(self, trace: Iterable[Sequence], clock: Callable[[], float] = time.monotonic):
+        """Replays event trace. Mimics evdev.InputDevice's read/grab/ungrab.
+
+        Replay starts on first read(), so time spent on app init doesn't
+        make every event due at once.
+
+        Args:
+            trace: (seconds, type, code, value) entries
+            clock: Time source, events get timestamp from this too.
+        """
+
+        self.trace: List[TraceEntry] = sorted(tuple(entry) for entry in trace)
+        self.clock = clock
+
+        self._origin: Union[float, None] = None
+        self._idx = 0
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self.trace)} events)"
+
+    @classmethod
+    def from_file(cls, path, clock: Callable[[], float] = time.monotonic):
+        """Loads trace from json file containing list of [sec, type, code, value]."""
+
+        with open(path, encoding="utf8") as fp:
+            return cls(json.load(fp), clock)
+
+    @staticmethod
+    def taps(
+        raw_points: Iterable[Tuple[int, int]],
+        start: float = 0.5,
+        interval: float = 1.0,
+        hold: float = 0.1,
+        samples: int = 5,
+    ) -> List[TraceEntry]:
+        """Generates trace tapping on given raw coordinates one after another."""
+
+        trace = []
+        at = start
+
+        for x, y in raw_points:
+            trace.append((at, EV_KEY, BTN_TOUCH, 1))
+
+            for idx in range(samples):
+                t = at + hold * idx / samples
+                trace += [(t, EV_ABS, ABS_X, x), (t, EV_ABS, ABS_Y, y), (t, EV_SYN, SYN_REPORT, 0)]
+
+            trace.append((at + hold, EV_KEY, BTN_TOUCH, 0))
+            at += interval
+
+        return trace
+
+    @property
+    def done(self) -> bool:
+        return self._idx >= len(self.trace)
+
+    def timestamp(self, offset: float) -> float:
+        """Clock time of given trace offset, 0 until replay starts."""
+
+        return 0.0 if self._origin is None else self._origin + offset
+
+    def grab(self):
+        pass
+
+    def ungrab(self):
+        pass
+
+    def read(self):
+        """Yields events that are due. Raises BlockingIOError if none, like evdev."""
+
+        now = self.clock()
+
+        if self._origin is None:
+            self._origin = now
+
+        end = self._idx
+        while end < len(self.trace) and self._origin + self.trace[end][0] <= now:
+            end += 1
+
+        if end == self._idx:
+            raise BlockingIOError()
+
+        due, self._idx = self.trace[self._idx:end], end
+        return self._events(due)
+
+    def _events(self, due: List[TraceEntry]):
+        for offset, type_, code, value in due:
+            ts = self._origin + offset
+            sec = int(ts)
+            yield InputEvent(sec, int((ts - sec) * 1_000_000), type_, code, value)
@@ -6,58 +6,47 @@ https://stackoverflow.com/a/54986161/10909029
 """
 
 import json
+import time
 import pathlib
+import functools
 from typing import Tuple, Union
 
 import evdev
-from evdev.ecodes import EV_ABS, EV_KEY, ABS_X, ABS_Y, BTN_TOUCH
 
+from .calibration import Calibration
+from .filters import TouchFilter
 
-LCD_DATA = pathlib.Path(__file__).parent / "lcd_data.json"
-LCD_DATA = json.load(LCD_DATA.open(encoding="utf8"))
+
+LCD_DATA_PATH = pathlib.Path(__file__).parent / "lcd_data.json"
 DEFAULT_DEVICE = "event0"
 
 
-def _raw_coord_to_pixel_closure(pixel_dim, hw_origin, hw_end):
-    """Creates raw-2-pixel coordinate convertor from HW origin & end coordinates.
-    origin & end is found in `xorg.conf.d/99-calibration.conf`'s Calibration.
+@functools.cache
+def load_lcd_data() -> dict:
+    """Reads lcd_data.json on first call instead of at import."""
 
-    Returns:
-        Function converting HW coordination to Pixel Coordination
-    """
+    with LCD_DATA_PATH.open(encoding="utf8") as fp:
+        return json.load(fp)
 
-    # This need to be really fast - make all calc done in advance, no ifs.
-    x_ori, y_ori = hw_origin
-    x_end, y_end = hw_end
 
-    x_d = x_end - x_ori
-    y_d = y_end - y_ori
-    x_d_abs = abs(x_d)
-    y_d_abs = abs(y_d)
+def save_lcd_entry(display_type: str, entry: dict):
+    """Updates display_type's entry in lcd_data.json, keeping other keys of it."""
 
-    w_divider = x_d_abs / pixel_dim[0]
-    h_divider = y_d_abs / pixel_dim[1]
+    data = dict(load_lcd_data())
 
-    # could've reduced 2 call overheads if python3.10+ works with pygame on pi...
-    if x_d < 0:
-        def _x_convert(x):
-            return (x_d_abs - x + x_end) / w_divider
-    else:
-        def _x_convert(x):
-            return (x - x_ori) / w_divider
+    old = data.get(display_type, {})
+    if isinstance(old, list):
+        old = {}
 
-    if y_d < 0:
-        def _y_convert(y):
-            return (y_d_abs - y + y_end) / h_divider
-    else:
-        def _y_convert(y):
-            return (y - y_ori) / h_divider
+    # drop previous mapping so only the new one remains
+    merged = {k: v for k, v in old.items() if k not in ("linear", "affine")}
+    merged.update(entry)
+    data[display_type] = merged
 
-    # define inner and return
-    def converter(x, y):
-        return int(_x_convert(x)), int(_y_convert(y))
+    with LCD_DATA_PATH.open("w", encoding="utf8") as fp:
+        json.dump(data, fp, indent=2)
 
-    return converter
+    load_lcd_data.cache_clear()
 
 
 class TouchDeviceOccupied(Exception):
@@ -67,13 +56,15 @@ class TouchDeviceOccupied(Exception):
 class TouchDriver:
     active_device = set()
 
-    def __init__(self, display_type, touch_device: str):
+    def __init__(self, display_type, touch_device: str, source=None):
         """Touch driver. Grabs events upon initializing, so make sure to delete
         instance before creating another on same device.
 
         Args:
             display_type: Display type specified in lcd_data.json
             touch_device: Touch device name - find it via `udevadm`.
+            source: Event source instead of /dev/input/<touch_device>,
+                i.e. ScriptedTouchSource for running headless.
         """
 
         # fail-fast, check if touch_device is already grabbed.
@@ -87,48 +78,63 @@ class TouchDriver:
         self.display = display_type
 
         # touch area calibration
-        self.dim, (origin, end) = LCD_DATA[display_type]
-        self.converter = _raw_coord_to_pixel_closure(self.dim, origin, end)
+        entry = load_lcd_data()[display_type]
+        self.calibration = Calibration.from_entry(entry)
+        self.dim = self.calibration.dim
+        self.converter = self.calibration.convert
+
+        # jitter filter, legacy list entries get defaults
+        self.filter = TouchFilter(**({} if isinstance(entry, list) else entry.get("filter", {})))
 
         # start event manager
-        self._listener = evdev.InputDevice("/dev/input/" + touch_device)
+        if source is None:
+            source = evdev.InputDevice("/dev/input/" + touch_device)
+
+        self._listener = source
         self._listener.grab()
 
+        # clock event timestamps are based on - evdev uses wall clock by default.
+        self.event_clock = getattr(source, "clock", time.time)
+
     def __del__(self):
         self._listener.ungrab()
         self.active_device.remove(self.device_name)
 
-    def receive_touch(self) -> Union[Tuple[int, int], None]:
-        """Get one touch event.
-        Temporary measure until I re-implement evdev to support trio.
-        Will only return last touch event.
+    def receive_raw_touch(self) -> Union[Tuple[int, int], None]:
+        """Get one touch event in raw HW coordinate, without calibration.
+        Every pending event goes through filter, touch spanning multiple reads is fine.
+        Will only return last accepted touch.
 
         Returns:
             (x, y) or None if no input.
         """
 
-        # need to read 2 EV_ABS for x & y, 1 EV_KEY for touch
-        # EV_ABS = 3 / EV_KEY = 1
-        # but for long touch there could be lots of axis flags
+        touch = None
 
-        # could make this much simpler with match-case clause..
         try:
-            evs = list(self._listener.read())
-
-            abs_xs = [ev for ev in evs if ev.type == EV_ABS and ev.code == ABS_X]
-            abs_ys = [ev for ev in evs if ev.type == EV_ABS and ev.code == ABS_Y]
-            release_ev = [
-                ev for ev in evs
-                if ev.type == EV_KEY and ev.code == BTN_TOUCH and ev.value == 0
-            ]
+            for ev in self._listener.read():
+                accepted = self.filter.feed(ev)
 
-            # make sure there's release event - we'll ignore down event might be missing.
-            if not all((abs_xs, abs_ys, release_ev)):
-                return None
-
-            # if start_pos:
-            return self.converter(abs_xs[-1].value, abs_ys[-1].value)
+                if accepted is not None:
+                    touch = accepted
 
         except BlockingIOError:
             # Nothing to read in touch driver
+            pass
+
+        return touch
+
+    def receive_touch(self) -> Union[Tuple[int, int], None]:
+        """Get one touch event.
+        Temporary measure until I re-implement evdev to support trio.
+        Will only return last touch event.
+
+        Returns:
+            (x, y) or None if no input.
+        """
+
+        raw = self.receive_raw_touch()
+        if raw is None:
             return None
+
+        return self.converter(*raw)
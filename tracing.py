@@ -0,0 +1,183 @@
+"""
+Lightweight tracing spans for input-to-photon latency.
+
+Spans are kept in fixed-size ring buffer, so memory stays constant no matter
+how long the panel runs. Disabled tracer hands out shared no-op span -
+cost is one attribute check per span.
+
+Export is Chrome trace JSON (open in chrome://tracing or Perfetto),
+or text summary of per-span percentiles & log2 histogram.
+"""
+
+import json
+import time
+import contextvars
+from typing import Callable, Dict, List, Tuple
+
+
+__all__ = ["Tracer", "TRACER"]
+
+
+# Spans of one interaction share trace id, shown as one row in chrome trace.
+_trace_id = contextvars.ContextVar("trace_id", default=0)
+
+# histogram bucket upper bounds in ms
+BUCKETS_MS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, float("inf"))
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "trace_id", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: int):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *_):
+        self.tracer.record(self.name, self.start, time.perf_counter_ns(), self.trace_id)
+        return False
+
+
+class Tracer:
+    def __init__(self, capacity: int = 4096, enabled=False):
+        """Ring buffer of finished spans.
+
+        Args:
+            capacity: Number of spans kept. Oldest are overwritten.
+            enabled: Whether to record at all.
+        """
+
+        self.capacity = capacity
+        self.enabled = enabled
+
+        # parallel preallocated lists, recording is just 4 stores.
+        self._names: List[str] = [""] * capacity
+        self._starts = [0] * capacity
+        self._ends = [0] * capacity
+        self._ids = [0] * capacity
+
+        self._idx = 0
+        self._count = 0
+        self._last_id = 0
+
+    def new_trace(self) -> int:
+        """Starts new interaction. Spans in current task use this id from now."""
+
+        self._last_id += 1
+        _trace_id.set(self._last_id)
+        return self._last_id
+
+    def span(self, name: str):
+        """Context manager timing its block."""
+
+        if not self.enabled:
+            return _NULL_SPAN
+
+        return _Span(self, name, _trace_id.get())
+
+    def record(self, name: str, start_ns: int, end_ns: int, trace_id: int = None):
+        """Records finished span in perf_counter_ns domain."""
+
+        if not self.enabled:
+            return
+
+        idx = self._idx
+        self._names[idx] = name
+        self._starts[idx] = start_ns
+        self._ends[idx] = end_ns
+        self._ids[idx] = _trace_id.get() if trace_id is None else trace_id
+
+        self._idx = (idx + 1) % self.capacity
+        self._count += 1
+
+    def record_since(self, name: str, timestamp: float, clock: Callable[[], float] = time.time):
+        """Records span from timestamp of another clock (i.e. evdev event time) until now."""
+
+        if not self.enabled:
+            return
+
+        now_ns = time.perf_counter_ns()
+        start_ns = now_ns - int((clock() - timestamp) * 1e9)
+        self.record(name, start_ns, now_ns)
+
+    def spans(self) -> List[Tuple[str, int, int, int]]:
+        """Returns recorded (name, start_ns, end_ns, trace_id), oldest first."""
+
+        size = min(self._count, self.capacity)
+        first = (self._idx - size) % self.capacity
+
+        order = [(first + offset) % self.capacity for offset in range(size)]
+        return [(self._names[i], self._starts[i], self._ends[i], self._ids[i]) for i in order]
+
+    def chrome_trace(self) -> Dict:
+        """Returns Chrome trace event format dict."""
+
+        return {
+            "traceEvents": [
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": start / 1000,
+                    "dur": (end - start) / 1000,
+                    "pid": 1,
+                    "tid": trace_id,
+                }
+                for name, start, end, trace_id in self.spans()
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def dump(self, path):
+        """Writes Chrome trace json to path."""
+
+        with open(path, "w", encoding="utf8") as fp:
+            json.dump(self.chrome_trace(), fp)
+
+    def summary(self) -> List[str]:
+        """Per-span count, percentiles and log2 ms histogram, as text lines."""
+
+        durations: Dict[str, List[float]] = {}
+        for name, start, end, _ in self.spans():
+            durations.setdefault(name, []).append((end - start) / 1e6)
+
+        lines = []
+
+        for name, values in durations.items():
+            values.sort()
+
+            def pct(p):
+                return values[min(len(values) - 1, int(len(values) * p))]
+
+            counts = [0] * len(BUCKETS_MS)
+            for value in values:
+                counts[next(idx for idx, bound in enumerate(BUCKETS_MS) if value < bound)] += 1
+
+            histogram = " ".join(
+                f"<{bound:g}:{count}" for bound, count in zip(BUCKETS_MS, counts) if count
+            )
+
+            lines.append(
+                f"{name:<16} n={len(values):<5} p50={pct(0.5):8.2f} p90={pct(0.9):8.2f} "
+                f"p99={pct(0.99):8.2f} max={values[-1]:8.2f} ms | {histogram}"
+            )
+
+        return lines
+
+
+# Shared tracer, enabled from command line.
+TRACER = Tracer()
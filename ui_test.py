@@ -13,53 +13,6 @@ from touch_driver import *
 pygame.init()
 
 
-def bake_ui():
-    _trans = (25, 25, 25, 255)
-    symbol_font = pygame.font.SysFont("freeserif", 50)
-    temp_font = pygame.font.SysFont("notosansmono", 50)
-    state_font = pygame.font.SysFont("undotum", 40)
-
-    ui = {
-        "Temp up": TextButton(
-            (10, 10), (70, 70), "▲", color=(255, 0, 0, 255), font=symbol_font
-        ),
-        "Temp down": TextButton(
-            (10, 80), (70, 140), "▼", color=(0, 0, 255, 255), font=symbol_font
-        ),
-        "Power": TextButton(
-            (10, 250), (70, 310), "⚡", color=(100, 100, 100, 255), font=symbol_font
-        ),
-        "Temp target": TextBox(
-            (220, 10),
-            (470, 70),
-            "TGT --°C",
-            color=_trans,
-            text_color=(0, 255, 0, 255),
-            font=temp_font,
-        ),
-        "Temp current": TextBox(
-            (220, 80),
-            (470, 140),
-            "CUR --°C",
-            color=_trans,
-            text_color=(255, 255, 255, 255),
-            font=temp_font,
-        ),
-        # "Wind angle": TextBox((100, 80), (100, 130), "WC", color=_trans, text_color=(255, 255, 255, 255)),
-        # "Wind speed": TextBox((100, 80), (100, 130), "CUR: --'C", color=_trans, text_color=(255, 255, 255, 255)),
-        "Operation Mode": TextBox(
-            (370, 260),
-            (470, 310),
-            "꺼짐",
-            color=_trans,
-            text_color=(255, 255, 255, 255),
-            font=state_font,
-        ),
-    }
-
-    return UIManager(**ui)
-
-
 async def main():
     # init framebuffer
     framebuffer_init()
@@ -72,7 +25,7 @@ async def main():
 
     # init ui framework
     ui_framework_init(fb_d.screen)
-    ui = bake_ui()
+    ui = load_layout("layouts/main.json")
 
     # Power toggle example
     sample_flag = True